@@ -0,0 +1,226 @@
+"""Micro-benchmarks for the combat hot paths and menu rendering.
+
+    python bench.py                              # run everything, print a table
+    python bench.py -k ability                   # only benchmarks matching "ability"
+    python bench.py --save bench.json            # store results
+    python bench.py --compare bench.json         # flag regressions against a baseline
+
+Every number is the best-of-N time for one operation in nanoseconds. Combat
+benchmarks run with the null output sink; menus render into a CaptureSink and
+stop at their first prompt.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+
+import project
+from project import (ABILITY_SPECS, ENCOUNTERS, FORECAST_BOSS, AutoPolicy, BattleResult, CaptureSink,
+                     Enemy, EnemyTemplate, GameContext, Weather, battle_steps, cast_ability,
+                     check_critical_hit, create_player, forecast, get_game_context, get_skill_bonus,
+                     loot_table, muted_output, prestige_menu, talent_menu, using_game_context,
+                     using_output)
+
+BENCH_VERSION = 1
+DEFAULT_THRESHOLD = 0.10   # 10% slower than the baseline counts as a regression
+
+# Soaks up hits forever and never hits back, so a fight can be stepped indefinitely
+TRAINING_DUMMY = EnemyTemplate("Training Dummy", 10**12, 0)
+
+BENCHMARKS = {}
+
+def benchmark(name):
+    """Register a setup function that returns the callable to time"""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+class MenuExit(Exception):
+    pass
+
+def _stop_at_prompt(message=""):
+    raise MenuExit
+
+def bench_player():
+    """Level 10 Spellblade with a few skills: exercises most damage branches"""
+    with muted_output():
+        player = create_player("Bench", "Warrior")
+        player.add_multiclass("Mage")
+        player.level_up(9)
+    player.skill_levels.update({"Berserker Rage": 2, "Lucky Strike": 2, "Iron Skin": 1,
+                                "Elemental Mastery": 1})
+    player.refresh_skills()
+    player.hp = player.compute_max_hp()
+    return player
+
+@benchmark("compute_damage")
+def _compute_damage():
+    return bench_player().compute_damage
+
+@benchmark("compute_defense")
+def _compute_defense():
+    return bench_player().compute_defense
+
+@benchmark("compute_max_hp")
+def _compute_max_hp():
+    return bench_player().compute_max_hp
+
+@benchmark("check_critical_hit")
+def _check_critical_hit():
+    player = bench_player()
+    return lambda: check_critical_hit(player)
+
+@benchmark("get_skill_bonus")
+def _get_skill_bonus():
+    player = bench_player()
+    return lambda: get_skill_bonus(player, "Berserker Rage")
+
+def _ability(spec):
+    def setup():
+        player = bench_player()
+        max_hp = player.compute_max_hp()
+        enemies = [Enemy(TRAINING_DUMMY), Enemy(TRAINING_DUMMY)]
+
+        def cast():
+            player.hp = max_hp
+            cast_ability(player, spec, enemies)
+        return cast
+    return setup
+
+for _spec in ABILITY_SPECS.values():
+    benchmark(f"ability/{_spec.name}")(_ability(_spec))
+
+@benchmark("battle_turn")
+def _battle_turn():
+    """One full turn of battle_steps: companions, initiative, both phases, upkeep"""
+    player = bench_player()
+    policy = AutoPolicy()
+    result = BattleResult()
+    steps = battle_steps(player, [Enemy(TRAINING_DUMMY)], Weather.CLEAR, 1, result)
+    state = {"decision": next(steps)}
+
+    def turn():
+        start = result.turns
+        decision = state["decision"]
+        while result.turns == start:
+            decision = steps.send(policy.decide(player, decision))
+        state["decision"] = decision
+    return turn
+
+@benchmark("loot_roll")
+def _loot_roll():
+    """One boss kill's drops: two chance rolls and two alias-table picks"""
+    table = loot_table(FORECAST_BOSS)
+    return lambda: table.roll(get_game_context().loot)
+
+@benchmark("encounter_roll")
+def _encounter_roll():
+    """A solo regular encounter drawn from the bench player's bracket"""
+    player = bench_player()
+    return lambda: ENCOUNTERS.roll_for(player, 1)
+
+@benchmark("forecast")
+def _forecast():
+    """Closed-form expected fight against the menu preview boss"""
+    player = bench_player()
+    return lambda: forecast(player, FORECAST_BOSS)
+
+def _menu(menu):
+    def setup():
+        player = bench_player()
+        player.skill_points = 5
+
+        def render():
+            with using_output(CaptureSink()):
+                try:
+                    menu(player)
+                except MenuExit:
+                    pass
+        return render
+    return setup
+
+benchmark("menu/talent_menu")(_menu(talent_menu))
+benchmark("menu/prestige_menu")(_menu(prestige_menu))
+
+def measure(fn, repeat=7, min_time=0.1):
+    """Best time per call in nanoseconds"""
+    timer = timeit.Timer(fn)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 10
+    return min(timer.repeat(repeat, number)) / number * 1e9
+
+def run(pattern=None, repeat=7, min_time=0.1):
+    results = {}
+    project.input = _stop_at_prompt  # menus must never block on the keyboard
+    try:
+        with muted_output(), using_game_context(GameContext(0)):
+            for name, setup in BENCHMARKS.items():
+                if pattern and pattern not in name:
+                    continue
+                results[name] = {"ns": measure(setup(), repeat, min_time)}
+    finally:
+        del project.input
+    return results
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """(name, baseline ns, current ns, ratio, regressed) for benchmarks in both runs"""
+    rows = []
+    for name, current in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]["ns"]
+        ratio = current["ns"] / old if old else float("inf")
+        rows.append((name, old, current["ns"], ratio, ratio > 1 + threshold))
+    return rows
+
+def format_ns(ns):
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f} ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.2f} µs"
+    return f"{ns:.0f} ns"
+
+def main():
+    parser = argparse.ArgumentParser(description="Combat and menu benchmarks")
+    parser.add_argument("-k", dest="pattern", help="only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.1, help="seconds per timing batch")
+    parser.add_argument("--save", metavar="PATH", help="write results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown before a benchmark counts as regressed")
+    args = parser.parse_args()
+
+    results = run(args.pattern, args.repeat, args.min_time)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": BENCH_VERSION,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "results": results,
+            }, f, indent=2)
+
+    if not args.compare:
+        for name, result in results.items():
+            print(f"{name:<32} {format_ns(result['ns']):>12}")
+        return
+
+    with open(args.compare, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    rows = compare(results, baseline, args.threshold)
+    print(f"{'Benchmark':<32} {'Baseline':>12} {'Current':>12} {'Change':>8}")
+    for name, old, new, ratio, regressed in rows:
+        flag = "  ❌ REGRESSION" if regressed else ""
+        print(f"{name:<32} {format_ns(old):>12} {format_ns(new):>12} {(ratio - 1) * 100:>+7.1f}%{flag}")
+    if any(row[4] for row in rows):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
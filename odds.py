@@ -0,0 +1,151 @@
+"""Exact odds and a vectorized simulator for the gambling den.
+
+Every game in the den is a handful of equally likely draws, so its expected
+value and variance come out exactly by walking all of them through the
+game's own payout function: 36 x 36 dice pairs, 4 x 4 card guesses and
+5^3 slot reels. The numbers are net gold per play (payout minus bet), so a
+negative EV is the house edge the gold economy actually pays.
+
+The simulator plays the same rules on NumPy arrays, a chunk of spins at a
+time, so millions of plays take well under a second. Comparing it with the
+exact table checks that the vectorized rules still match the game after a
+payout constant changes.
+
+    python odds.py                      # exact table only
+    python odds.py --spins 5000000      # plus a simulation of each game
+"""
+import argparse
+import itertools
+import math
+import time
+from dataclasses import dataclass
+from fractions import Fraction
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for simulations
+    np = None
+
+from project import (CARD_BET, CARD_SUITS, CARD_WIN, DICE_BET, DICE_WIN, SLOT_SYMBOLS, SLOTS_BET,
+                     SLOTS_JACKPOTS, SLOTS_PAIR, SLOTS_TRIPLE, card_payout, dice_payout, slots_payout)
+
+CHUNK = 1_000_000   # spins per NumPy batch
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError("odds simulations need numpy: pip install numpy")
+
+@dataclass(frozen=True)
+class Odds:
+    """Exact distribution of the net gold from one play"""
+    game: str
+    bet: int
+    outcomes: int        # equally likely draws enumerated
+    ev: Fraction         # expected net gold per play
+    variance: Fraction
+    win_chance: Fraction # chance the payout beats the bet
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def house_edge(self):
+        """Share of each bet the den keeps on average"""
+        return -self.ev / self.bet
+
+def exact(game, bet, draws, payout):
+    """Odds of a game whose equally likely `draws` pay payout(draw) each"""
+    nets = [payout(draw) - bet for draw in draws]
+    n = len(nets)
+    ev = Fraction(sum(nets), n)
+    variance = Fraction(sum(net * net for net in nets), n) - ev * ev
+    return Odds(game, bet, n, ev, variance, Fraction(sum(net > 0 for net in nets), n))
+
+def dice_odds():
+    # Two dice each for the player and the dealer: 36 x 36 rolls
+    draws = itertools.product(range(1, 7), repeat=4)
+    return exact("dice", DICE_BET, draws, lambda d: dice_payout(d[0] + d[1], d[2] + d[3]))
+
+def card_odds():
+    draws = itertools.product(CARD_SUITS, repeat=2)
+    return exact("cards", CARD_BET, draws, lambda d: card_payout(*d))
+
+def slots_odds():
+    draws = itertools.product(SLOT_SYMBOLS, repeat=3)
+    return exact("slots", SLOTS_BET, draws, slots_payout)
+
+GAMES = {"dice": dice_odds, "cards": card_odds, "slots": slots_odds}
+
+def all_odds():
+    return [odds() for odds in GAMES.values()]
+
+# ── Vectorized rules: each maps (rng, n) to the net gold of n plays ─────────
+def dice_nets(rng, n):
+    rolls = rng.integers(1, 7, size=(4, n), dtype=np.int8)
+    player = rolls[0] + rolls[1]
+    dealer = rolls[2] + rolls[3]
+    payout = np.where(player > dealer, DICE_WIN, np.where(player == dealer, DICE_BET, 0))
+    return payout - DICE_BET
+
+def card_nets(rng, n):
+    guess, actual = rng.integers(0, len(CARD_SUITS), size=(2, n), dtype=np.int8)
+    return np.where(guess == actual, CARD_WIN, 0) - CARD_BET
+
+def slots_nets(rng, n):
+    first, second, third = rng.integers(0, len(SLOT_SYMBOLS), size=(3, n), dtype=np.int8)
+    triples = np.asarray([SLOTS_JACKPOTS.get(symbol, SLOTS_TRIPLE) for symbol in SLOT_SYMBOLS])
+    payout = np.where((first == second) | (second == third), SLOTS_PAIR, 0)
+    payout = np.where((first == second) & (second == third), triples[first], payout)
+    return payout - SLOTS_BET
+
+SIMULATORS = {"dice": dice_nets, "cards": card_nets, "slots": slots_nets}
+
+@dataclass(frozen=True)
+class SimResult:
+    game: str
+    spins: int
+    mean: float
+    variance: float
+    seconds: float
+
+    def z_score(self, odds):
+        """How many standard errors the simulated EV sits from the exact one"""
+        return (self.mean - float(odds.ev)) / (odds.std / math.sqrt(self.spins)) if odds.variance else 0.0
+
+def simulate(game, spins, seed=None):
+    """Play `game` `spins` times in chunks; returns the sample mean and variance"""
+    require_numpy()
+    rng = np.random.default_rng(seed)
+    nets = SIMULATORS[game]
+    total = squares = 0
+    start = time.perf_counter()
+    for done in range(0, spins, CHUNK):
+        chunk = nets(rng, min(CHUNK, spins - done)).astype(np.int64)
+        total += int(chunk.sum())
+        squares += int((chunk * chunk).sum())
+    mean = total / spins
+    return SimResult(game, spins, mean, squares / spins - mean * mean, time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="House edge of the gambling den")
+    parser.add_argument("--spins", type=int, default=0, help="also simulate this many plays of each game")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    print(f"{'Game':<6} {'Bet':>4} {'Draws':>6} {'EV/play':>9} {'Edge':>7} {'Std':>7} {'P(win)':>7}")
+    table = all_odds()
+    for o in table:
+        print(f"{o.game:<6} {o.bet:>4} {o.outcomes:>6} {float(o.ev):>+9.3f} {float(o.house_edge)*100:>6.2f}% "
+              f"{o.std:>7.2f} {float(o.win_chance)*100:>6.2f}%")
+    if not args.spins:
+        return
+
+    print(f"\n{'Game':<6} {'Spins':>10} {'Sim EV':>9} {'Sim std':>8} {'z':>6} {'Spins/s':>12}")
+    for o in table:
+        sim = simulate(o.game, args.spins, args.seed)
+        print(f"{o.game:<6} {sim.spins:>10} {sim.mean:>+9.3f} {math.sqrt(sim.variance):>8.2f} "
+              f"{sim.z_score(o):>+6.2f} {sim.spins / sim.seconds:>12,.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""Search gear, enchantments and skill levels for the strongest build.
+
+A build is a weapon, a weapon enchantment, one armor piece per slot and the
+skill levels bought with the player's skill points. It is scored by its
+margin against one boss: expected turns the player survives divided by the
+expected turns needed to kill the boss, so a margin above 1 means the build
+should outlast it.
+
+    margin = attack damage * max HP / (boss HP * damage taken per enemy hit)
+
+Both sides are the plain exchange of blows: the player's basic attack and
+the boss's basic hit, max(0, attack - defense) like the battle engine, less
+the parry chance. Abilities, their HP costs, stuns, damage over time and
+buffs such as Bear Form are not in the margin; the TTK column comes from
+forecast(), which does model them. Armor that absorbs the boss's whole
+attack makes a build untouchable and its margin infinite. Such builds, and
+any others with equal margins, rank by attack damage and then by gold left,
+since once the boss cannot hurt the player only a faster kill or a cheaper
+build still helps.
+
+Attack damage only depends on the weapon, the enchantment, Lucky Strike and
+Elemental Mastery; max HP and the damage of a hit only on armor, Iron Skin and
+Titan's Endurance. Each half is tabulated once from the player's own
+compute_damage(), compute_defense() and compute_max_hp(), with the player's
+state swapped for a moment rather than copied, and cut down to the options no
+other option beats on value, gold and skill points together. Branch and
+bound then pairs the halves best-first and stops as soon as no remaining pair
+can beat the K-th best build found so far.
+
+Skills: only the four skills above are searched, because they are the ones
+the margin can see. Whirlwind Strike and Shadow Clone have no effect in
+battle. Swift Strike only shortens ability cooldowns and Battle Trance only
+heals on a kill, so neither changes a one-boss exchange of basic blows.
+Life Drain heals a share of each hit and Berserker Rage adds damage below
+half HP. A build with either lasts longer or kills faster than its margin
+says, but both tie damage to survival, which the two independent halves
+cannot express. All six stay at the player's current levels, and the
+skill points a build leaves unspent are free for them.
+
+Prices: owned items are free, the weapon shop's catalogue is priced by
+rarity, and enchantments are the ones the blacksmith sells (ENCHANT_SHOP) at
+its gold fee; the materials each one needs are not counted.
+
+    python optimizer.py Warrior --secondary Mage --level 10 --gold 600 --points 9 --boss Dragon
+"""
+import argparse
+import copy
+import heapq
+import itertools
+import math
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+
+from project import (ARMOR_SETS, CLASS_NAMES, ENCHANT_SHOP, ENEMY_TEMPLATES, FORECAST_BOSS, SKILL_TREE,
+                     WEAPONS, SkillBonuses, Weather, create_player, critical_chance,
+                     expected_attack, forecast, muted_output, parry_chance)
+
+# Weapon shop prices are 50-60g for Common weapons and 120g for Flaming Blade
+WEAPON_PRICES = {"Common": 50, "Rare": 120, "Epic": 300}
+ARMOR_PRICES = {"Common": 40, "Rare": 100, "Epic": 250}
+ARMOR_SLOTS = ("head", "chest", "legs", "boots")
+
+# The skills the margin depends on; the rest of SKILL_TREE is left as it is (see above)
+DAMAGE_SKILLS = ("Lucky Strike", "Elemental Mastery")
+SURVIVAL_SKILLS = ("Iron Skin", "Titan's Endurance")
+
+@dataclass(frozen=True)
+class Option:
+    """One half of a build: its value and what it costs"""
+    value: float
+    gold: int
+    points: int
+    picks: tuple   # (slot, choice) pairs
+    stats: tuple = ()
+
+@dataclass(frozen=True)
+class Build:
+    margin: float
+    attack_damage: float
+    max_hp: int
+    hit_taken: float
+    gold: int
+    points: int
+    picks: tuple
+
+    def describe(self):
+        return ", ".join(f"{slot}: {choice}" for slot, choice in self.picks if choice)
+
+@contextmanager
+def swapped(player, **attrs):
+    """Temporarily set player attributes; the player is always at full HP"""
+    saved = {name: getattr(player, name) for name in (*attrs, "hp")}
+    try:
+        for name, value in attrs.items():
+            setattr(player, name, value)
+        player.hp = player.compute_max_hp()
+        yield player
+    finally:
+        for name, value in saved.items():
+            setattr(player, name, value)
+
+def skill_levels(player, skills, budget):
+    """(levels, points) for every way to raise `skills` within `budget` points"""
+    ranges = []
+    for name in skills:
+        current = player.skill_levels.get(name, 0)
+        ranges.append(range(current, SKILL_TREE[name].max_level + 1))
+    for levels in itertools.product(*ranges):
+        points = sum(SKILL_TREE[name].base_cost * (level - player.skill_levels.get(name, 0))
+                     for name, level in zip(skills, levels))
+        if points <= budget:
+            yield dict(zip(skills, levels)), points
+
+def weapon_choices(player):
+    """(weapon, price) for owned weapons and the shop catalogue"""
+    owned = [w for w in [player.weapon, *player.inventory_weapons] if w]
+    return [(w, 0) for w in owned] + [(w, WEAPON_PRICES[w.rarity]) for w in WEAPONS.values()]
+
+def enchant_choices(weapon):
+    """(enchantment or None, price): the weapon as it is, bare, or enchanted at the blacksmith"""
+    choices = {None: 0, weapon.enchantment: 0}
+    for offer in ENCHANT_SHOP:
+        choices.setdefault(offer.enchantment, offer.gold)
+    return list(choices.items())
+
+def armor_choices(player, slot):
+    """(armor or None, price) for one slot"""
+    owned = [a for a in [player.equipped_armor.get(slot), *player.inventory_armor] if a and a.slot == slot]
+    shop = [(a, ARMOR_PRICES[a.rarity]) for a in ARMOR_SETS.values() if a.slot == slot]
+    return [(None, 0)] + [(a, 0) for a in owned] + shop
+
+def pareto(options):
+    """Drop options another option matches or beats on value, gold and points"""
+    kept = []
+    cheapest = {}   # points -> least gold among kept options
+    for option in sorted(options, key=lambda o: (-o.value, o.gold, o.points)):
+        if any(gold <= option.gold for points, gold in cheapest.items() if points <= option.points):
+            continue
+        kept.append(option)
+        cheapest[option.points] = min(option.gold, cheapest.get(option.points, option.gold))
+    return kept
+
+def damage_options(player, boss, weather, gold, points):
+    """Expected basic attack damage for every weapon, enchantment and damage skill mix"""
+    lucky, mastery = (SKILL_TREE[name] for name in DAMAGE_SKILLS)
+    hybrid = player.hybrid_class_name
+    crit_multiplier = player.profile.crit_multiplier
+    levels = list(skill_levels(player, DAMAGE_SKILLS, points))
+    options = []
+    for weapon, price in weapon_choices(player):
+        for enchantment, enchant_cost in enchant_choices(weapon):
+            cost = price + enchant_cost
+            if cost > gold:
+                continue
+            with swapped(player, weapon=replace(weapon, enchantment=enchantment),
+                         skill_bonus=SkillBonuses({})) as p:
+                damage = p.compute_damage()
+                crit = critical_chance(p)
+            for skills, spent in levels:
+                value = expected_attack(damage, crit + lucky.bonus(skills[lucky.name]) / 100,
+                                        crit_multiplier, weapon.element, boss, weather,
+                                        mastery.bonus(skills[mastery.name]), hybrid == "Spellblade")
+                picks = (("weapon", weapon.name), ("enchantment", enchantment),
+                         *((name, level) for name, level in skills.items()))
+                options.append(Option(value, cost, spent, picks))
+    return pareto(options)
+
+def survival_options(player, boss, gold, points):
+    """Expected enemy hits survived for every armor set and survival skill mix"""
+    parry = parry_chance(player)
+    levels = list(skill_levels(player, SURVIVAL_SKILLS, points))
+    others = {name: level for name, level in player.skill_levels.items() if name not in SURVIVAL_SKILLS}
+    options = []
+    for pieces in itertools.product(*(armor_choices(player, slot) for slot in ARMOR_SLOTS)):
+        cost = sum(price for _, price in pieces)
+        if cost > gold:
+            continue
+        armor = {a.slot: a for a, _ in pieces if a}
+        for skills, spent in levels:
+            with swapped(player, equipped_armor=armor, skill_bonus=SkillBonuses({**others, **skills})) as p:
+                max_hp = p.compute_max_hp()
+                hit = (1 - parry) * max(0, boss.atk - p.compute_defense())
+            picks = (*((slot, a.name if a else None) for slot, (a, _) in zip(ARMOR_SLOTS, pieces)),
+                     *((name, level) for name, level in skills.items()))
+            options.append(Option(max_hp / hit if hit else math.inf, cost, spent, picks, (max_hp, hit)))
+    return pareto(options)
+
+def optimize(player, boss=FORECAST_BOSS, gold=None, points=None, top=5, weather=Weather.CLEAR):
+    """The `top` best builds for `player` against `boss`, best first.
+
+    gold and points default to what the player has. Builds rank by margin,
+    then attack damage, then gold left; a build another one matches or beats
+    on rank and skill points is never listed. Returns (builds, pairs scored),
+    where pairs scored counts the half-builds branch and bound actually
+    combined.
+    """
+    gold = player.gold if gold is None else gold
+    points = player.skill_points if points is None else points
+    damage = damage_options(player, boss, weather, gold, points)
+    survival = survival_options(player, boss, gold, points)
+    best_survival = survival[0].value if survival else 0.0
+
+    # A build's rank is (margin, attack damage, -gold). The bound for a pair
+    # uses -gold = 0, the best any build can do there.
+    heap = []      # (rank, tiebreak, Build), worst kept build first
+    scored = 0
+    floor = (0.0,)
+    for d in damage:
+        threshold = heap[0][0] if len(heap) == top else floor
+        if (d.value * best_survival / boss.hp, d.value, 0) <= threshold:
+            break    # damage only gets lower from here
+        for s in survival:
+            margin = d.value * s.value / boss.hp
+            if (margin, d.value, 0) <= threshold:
+                break
+            scored += 1
+            cost = d.gold + s.gold
+            if cost > gold or d.points + s.points > points:
+                continue
+            rank = (margin, d.value, -cost)
+            if rank <= threshold:
+                continue
+            build = Build(margin, d.value, *s.stats, cost, d.points + s.points, d.picks + s.picks)
+            entry = (rank, scored, build)
+            if len(heap) < top:
+                heapq.heappush(heap, entry)
+            else:
+                heapq.heappushpop(heap, entry)
+            threshold = heap[0][0] if len(heap) == top else floor
+    builds = [build for _, _, build in sorted(heap, reverse=True)]
+    return builds, scored
+
+def apply_build(player, build):
+    """A copy of `player` wearing `build`"""
+    player = copy.deepcopy(player)
+    picks = dict(build.picks)
+    owned = {w.name: w for w in [player.weapon, *player.inventory_weapons] if w}
+    weapon = owned.get(picks["weapon"]) or WEAPONS[picks["weapon"]]
+    player.weapon = replace(weapon, enchantment=picks["enchantment"])
+    armor = {a.name: a for a in [*player.equipped_armor.values(), *player.inventory_armor]}
+    player.equipped_armor = {slot: armor.get(picks[slot]) or ARMOR_SETS[picks[slot]]
+                             for slot in ARMOR_SLOTS if picks[slot]}
+    for name in DAMAGE_SKILLS + SURVIVAL_SKILLS:
+        player.skill_levels[name] = picks[name]
+    player.refresh_skills()
+    player.hp = player.compute_max_hp()
+    return player
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the strongest gear and skill builds")
+    parser.add_argument("class_name", choices=CLASS_NAMES)
+    parser.add_argument("--secondary", choices=CLASS_NAMES, default=None)
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--gold", type=int, default=500)
+    parser.add_argument("--points", type=int, default=None, help="skill points (default: level - 1)")
+    parser.add_argument("--boss", choices=sorted(ENEMY_TEMPLATES), default=FORECAST_BOSS.name)
+    parser.add_argument("--weather", choices=[w.value for w in Weather], default=Weather.CLEAR.value)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    with muted_output():
+        player = create_player(args.class_name, args.class_name)
+        if args.secondary:
+            player.add_multiclass(args.secondary)
+        if args.level > 1:
+            player.level_up(args.level - 1)
+    boss = ENEMY_TEMPLATES[args.boss]
+    weather = Weather(args.weather)
+
+    start = time.perf_counter()
+    builds, scored = optimize(player, boss, args.gold, args.points, args.top, weather)
+    elapsed = time.perf_counter() - start
+
+    print(f"{player.hybrid_class_name or player.class_name} level {player.level} vs {boss.name}: "
+          f"{scored} pairs scored in {elapsed:.2f}s")
+    print(f"{'#':>2} {'Margin':>7} {'Dmg':>6} {'HP':>5} {'Hit':>5} {'Gold':>5} {'Pts':>4} {'TTK':>4}  Build")
+    for i, build in enumerate(builds, 1):
+        ttk = forecast(apply_build(player, build), boss, weather).turns_to_kill
+        print(f"{i:>2} {build.margin:>7.2f} {build.attack_damage:>6.1f} {build.max_hp:>5} "
+              f"{build.hit_taken:>5.1f} {build.gold:>5} {build.points:>4} {ttk if ttk else '-':>4}  "
+              f"{build.describe()}")
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,271 @@
-import random, time, json, os
-from dataclasses import dataclass, field, asdict
-from typing import List, Dict, Optional
+import random, time, json, os, sys, re, signal, heapq, bisect
+from dataclasses import dataclass, field, asdict, fields, is_dataclass, replace
+from typing import Callable, List, Dict, Optional, Union, get_args, get_origin, get_type_hints
 from enum import Enum
+from contextlib import contextmanager
+from contextvars import ContextVar
 
-def slowprint(text, delay=0.005):
-    for ch in str(text):
-        print(ch, end="", flush=True)
-        time.sleep(delay)
-    print()
+class OutputSink:
+    """Where slowprint() sends its lines"""
+    enabled = True
+
+    def write(self, text, delay=None):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+class AnimatedSink(OutputSink):
+    """Types text out one character at a time"""
+
+    def __init__(self, delay=0.005):
+        self.delay = delay
+
+    def write(self, text, delay=None):
+        delay = self.delay if delay is None else delay
+        for ch in text:
+            print(ch, end="", flush=True)
+            time.sleep(delay)
+        print()
+
+class BufferedSink(OutputSink):
+    """Instant output, written to the terminal in one go before each prompt"""
+
+    def __init__(self, stream=None, limit=64 * 1024):
+        self.stream = stream
+        self.limit = limit
+        self.pending = []
+        self.size = 0
+
+    def write(self, text, delay=None):
+        self.pending.append(text)
+        self.pending.append("\n")
+        self.size += len(text) + 1
+        if self.size >= self.limit:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            stream = self.stream or sys.stdout
+            stream.write("".join(self.pending))
+            stream.flush()
+            self.pending.clear()
+            self.size = 0
+
+class NullSink(OutputSink):
+    """Discards everything; lazy messages are never built"""
+    enabled = False
+
+    def write(self, text, delay=None):
+        pass
+
+class CaptureSink(OutputSink):
+    """Keeps every line in a list, for tests and tooling"""
+
+    def __init__(self):
+        self.lines = []
+
+    def write(self, text, delay=None):
+        self.lines.append(text)
+
+    @property
+    def text(self):
+        return "\n".join(self.lines)
+
+OUTPUT_MODES = {
+    "animated": AnimatedSink,
+    "instant": BufferedSink,
+    "null": NullSink,
+    "capture": CaptureSink,
+}
+
+# A context variable, so every asyncio task (server session) can own a sink
+_sink = ContextVar("output_sink", default=AnimatedSink())
+
+def get_output():
+    return _sink.get()
+
+def set_output(sink):
+    """Install a sink for the current context and return the previous one"""
+    previous = _sink.get()
+    previous.flush()
+    _sink.set(sink)
+    return previous
+
+@contextmanager
+def using_output(sink):
+    previous = set_output(sink)
+    try:
+        yield sink
+    finally:
+        set_output(previous)
+
+def muted_output():
+    """Silence slowprint for headless runs"""
+    return using_output(NullSink())
+
+def slowprint(text, delay=None):
+    """Print through the active sink; pass a callable to build the text only when it is shown"""
+    sink = _sink.get()
+    if not sink.enabled:
+        return
+    if callable(text):
+        text = text()
+    sink.write(str(text), delay)
+
+def prompt(message=""):
+    _sink.get().flush()
+    return input(message)
+
+# ── RANDOMNESS ───────────────────────────────────────────────────────────────
+# Each subsystem draws from its own stream, so an extra roll in one place never
+# shifts the rolls of another, and the same seed plus the same inputs replays
+# the same game.
+
+class GameContext:
+    """Seeded random streams for one game"""
+    STREAMS = ("combat", "loot", "encounters", "weather", "gambling")
+
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = random.randrange(2**63)
+        self.seed = seed
+        for name in self.STREAMS:
+            setattr(self, name, random.Random(f"{seed}:{name}"))
+
+_game = ContextVar("game_context", default=GameContext())
+
+def get_game_context():
+    return _game.get()
+
+def set_game_context(context):
+    """Install a game context for the current context and return the previous one"""
+    previous = _game.get()
+    _game.set(context)
+    return previous
+
+@contextmanager
+def using_game_context(context):
+    previous = set_game_context(context)
+    try:
+        yield context
+    finally:
+        set_game_context(previous)
+
+# ── PHASE TIMING ─────────────────────────────────────────────────────────────
+# Optional per-phase latency histograms for the battle loop. The default timer
+# does nothing; install a PhaseTimer (RPG_PHASES=1, or server.py --phases) to
+# find out whether a slow session is spending its time rendering, recomputing
+# stats or ticking cooldowns.
+
+BATTLE_PHASES = ("status", "companions", "initiative", "action", "enemy",
+                 "status_effects", "cooldowns", "buffs")
+
+class PhaseStats:
+    """Latency histogram for one phase; bucket b holds samples below 2**b ns"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.buckets = [0] * 64
+
+    def add(self, ns):
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+        self.buckets[min(ns.bit_length(), 63)] += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile, in ns"""
+        if not self.count:
+            return 0
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(2 ** bucket, self.max)
+        return self.max
+
+class NullPhaseTimer:
+    """Default timer: every call is a no-op"""
+    enabled = False
+
+    def mark(self):
+        pass
+
+    def lap(self, phase):
+        pass
+
+class PhaseTimer(NullPhaseTimer):
+    """Times consecutive phases with a monotonic clock
+
+    mark() starts the clock; lap(phase) charges everything since the last mark
+    or lap to that phase and restarts it. Time spent waiting on the player is
+    never charged, as battle_steps marks again after every decision.
+    """
+    enabled = True
+
+    def __init__(self, clock=time.perf_counter_ns):
+        self.clock = clock
+        self.stats = {phase: PhaseStats() for phase in BATTLE_PHASES}
+        self.started = clock()
+        self.last = self.started
+
+    def mark(self):
+        self.last = self.clock()
+
+    def lap(self, phase):
+        now = self.clock()
+        stats = self.stats.get(phase)
+        if stats is None:
+            stats = self.stats[phase] = PhaseStats()
+        stats.add(now - self.last)
+        self.last = now
+
+    def as_dict(self):
+        return {
+            phase: {"count": s.count, "total_ns": s.total, "max_ns": s.max,
+                    "buckets": {str(2 ** b): n for b, n in enumerate(s.buckets) if n}}
+            for phase, s in self.stats.items()
+        }
+
+    def report(self):
+        """Text table of every phase since the timer was installed"""
+        def us(ns):
+            return f"{ns / 1e3:.1f}"
+        elapsed = (self.clock() - self.started) / 1e9
+        lines = [f"Battle phases over {elapsed:.1f}s (µs)",
+                 f"{'Phase':<16} {'Count':>8} {'Mean':>9} {'p50':>9} {'p99':>9} {'Max':>9} {'Total ms':>10}"]
+        for phase, s in self.stats.items():
+            lines.append(f"{phase:<16} {s.count:>8} {us(s.mean):>9} {us(s.percentile(50)):>9} "
+                         f"{us(s.percentile(99)):>9} {us(s.max):>9} {s.total / 1e6:>10.1f}")
+        return "\n".join(lines)
+
+_phases = ContextVar("phase_timer", default=NullPhaseTimer())
+
+def get_phase_timer():
+    return _phases.get()
+
+def set_phase_timer(timer):
+    """Install a phase timer for the current context and return the previous one"""
+    previous = _phases.get()
+    _phases.set(timer)
+    return previous
+
+@contextmanager
+def using_phase_timer(timer):
+    previous = set_phase_timer(timer)
+    try:
+        yield timer
+    finally:
+        set_phase_timer(previous)
 
 def clamp(n, minn, maxn):
     return max(minn, min(n, maxn))
@@ -46,6 +304,9 @@ class Stance(Enum):
     DEFENSIVE = "Defensive"
     COUNTER = "Counter"
 
+CLASS_NAMES = ["Warrior", "Mage", "Rogue", "Berserker", "Assassin", "Paladin",
+               "Necromancer", "Monk", "Ranger", "Druid", "Samurai", "Warlock"]
+
 # Hybrid class combinations - ALL CLASSES
 HYBRID_CLASSES = {
     # Warrior Hybrids
@@ -595,13 +856,13 @@ LEGENDARY_WEAPONS = {
                        "Heals 10% max HP on kill"),
     "Mjolnir": Weapon("Mjolnir", WeaponType.HAMMER, 55, Element.LIGHTNING, 0.20,
                      "The hammer of thunder", "Legendary", None, 0, True,
-                     "Stuns all enemies for 1 turn"),
+                     "Critical hits stun all enemies for 1 turn"),
     "Frostmourne": Weapon("Frostmourne", WeaponType.SWORD, 60, Element.ICE, 0.30,
                          "The cursed runeblade", "Legendary", None, 0, True,
                          "Steals 20% damage as HP"),
     "Death's Scythe": Weapon("Death's Scythe", WeaponType.SCYTHE, 65, Element.DARK, 0.35,
                             "The reaper's tool", "Legendary", None, 0, True,
-                            "15% instant kill chance"),
+                            "15% instant kill chance (not bosses)"),
 }
 
 WEAPONS = {
@@ -699,6 +960,128 @@ ENCHANTMENTS = {
     "Chaos": {"damage_random": (5, 20)},
 }
 
+@dataclass(frozen=True)
+class EnemyTemplate:
+    name: str
+    hp: int
+    atk: int = 10
+    element: Element = Element.PHYSICAL
+    weakness: Optional[Element] = None
+    resistance: Optional[Element] = None
+    boss: bool = False
+
+class Enemy:
+    """Combat state of one enemy; its fixed stats live on a shared EnemyTemplate"""
+    __slots__ = ("template", "hp", "stunned", "poison", "burning", "cursed")
+
+    def __init__(self, template):
+        self.reset(template)
+
+    def reset(self, template):
+        self.template = template
+        self.hp = template.hp
+        self.stunned = 0
+        self.poison = 0
+        self.burning = 0
+        self.cursed = False
+        return self
+
+    name = property(lambda self: self.template.name)
+    max_hp = property(lambda self: self.template.hp)
+    atk = property(lambda self: self.template.atk)
+    element = property(lambda self: self.template.element)
+    weakness = property(lambda self: self.template.weakness)
+    resistance = property(lambda self: self.template.resistance)
+    boss = property(lambda self: self.template.boss)
+
+    def __repr__(self):
+        return f"Enemy({self.name!r}, hp={self.hp}/{self.max_hp})"
+
+class EnemyPool:
+    """Recycles Enemy objects between battles"""
+
+    def __init__(self):
+        self.free = []
+
+    def acquire(self, template):
+        if self.free:
+            return self.free.pop().reset(template)
+        return Enemy(template)
+
+    def release(self, enemies):
+        self.free.extend(enemies)
+
+ENEMY_POOL = EnemyPool()
+
+REGULAR_ENEMIES = (
+    # Basic enemies
+    EnemyTemplate("Goblin", 50, 8, Element.PHYSICAL),
+    EnemyTemplate("Wolf", 45, 12, Element.PHYSICAL),
+    EnemyTemplate("Skeleton", 60, 7, Element.DARK),
+    EnemyTemplate("Ogre", 80, 15, Element.PHYSICAL),
+
+    # Elemental enemies
+    EnemyTemplate("Fire Elemental", 55, 14, Element.FIRE, weakness=Element.ICE, resistance=Element.FIRE),
+    EnemyTemplate("Ice Wraith", 58, 13, Element.ICE, weakness=Element.FIRE, resistance=Element.ICE),
+    EnemyTemplate("Storm Spirit", 52, 16, Element.LIGHTNING, weakness=Element.PHYSICAL, resistance=Element.LIGHTNING),
+    EnemyTemplate("Shadow Beast", 65, 11, Element.DARK, weakness=Element.HOLY, resistance=Element.DARK),
+
+    # Undead
+    EnemyTemplate("Zombie", 70, 9, Element.DARK, weakness=Element.HOLY, resistance=Element.POISON),
+    EnemyTemplate("Ghoul", 62, 13, Element.DARK, weakness=Element.HOLY, resistance=Element.DARK),
+    EnemyTemplate("Wraith", 48, 15, Element.DARK, weakness=Element.HOLY),
+    EnemyTemplate("Death Knight", 85, 17, Element.DARK, weakness=Element.HOLY, resistance=Element.PHYSICAL),
+
+    # Beasts
+    EnemyTemplate("Dire Wolf", 65, 14, Element.PHYSICAL),
+    EnemyTemplate("Giant Spider", 55, 11, Element.POISON),
+    EnemyTemplate("Grizzly Bear", 90, 16, Element.PHYSICAL),
+    EnemyTemplate("Wyvern", 75, 18, Element.FIRE),
+
+    # Demons
+    EnemyTemplate("Imp", 40, 10, Element.FIRE),
+    EnemyTemplate("Hellhound", 68, 15, Element.FIRE, resistance=Element.FIRE),
+    EnemyTemplate("Demon Warrior", 82, 19, Element.DARK),
+
+    # Constructs
+    EnemyTemplate("Golem", 95, 13, Element.PHYSICAL, resistance=Element.PHYSICAL),
+    EnemyTemplate("Gargoyle", 72, 14, Element.PHYSICAL),
+
+    # Magic users
+    EnemyTemplate("Dark Mage", 50, 20, Element.DARK),
+    EnemyTemplate("Cultist", 45, 12, Element.DARK),
+    EnemyTemplate("Warlock", 58, 18, Element.DARK),
+)
+
+BOSSES = (
+    # Original bosses
+    EnemyTemplate("Dragon", 200, 25, Element.FIRE, weakness=Element.ICE, resistance=Element.FIRE, boss=True),
+    EnemyTemplate("Lich King", 180, 22, Element.DARK, weakness=Element.HOLY, resistance=Element.DARK, boss=True),
+
+    # New bosses
+    EnemyTemplate("Frost Titan", 220, 28, Element.ICE, weakness=Element.FIRE, resistance=Element.ICE, boss=True),
+    EnemyTemplate("Storm Lord", 190, 30, Element.LIGHTNING, weakness=Element.PHYSICAL, resistance=Element.LIGHTNING, boss=True),
+    EnemyTemplate("Demon Prince", 210, 27, Element.DARK, weakness=Element.HOLY, resistance=Element.FIRE, boss=True),
+    EnemyTemplate("Void Leviathan", 250, 32, Element.DARK, weakness=Element.HOLY, resistance=Element.DARK, boss=True),
+    EnemyTemplate("Phoenix King", 195, 29, Element.FIRE, weakness=Element.ICE, resistance=Element.FIRE, boss=True),
+    EnemyTemplate("Ancient Hydra", 240, 26, Element.POISON, weakness=Element.FIRE, resistance=Element.POISON, boss=True),
+    EnemyTemplate("Celestial Guardian", 205, 24, Element.HOLY, weakness=Element.DARK, resistance=Element.HOLY, boss=True),
+    EnemyTemplate("Shadow Dragon", 230, 31, Element.DARK, weakness=Element.HOLY, resistance=Element.DARK, boss=True),
+    EnemyTemplate("Kraken", 215, 28, Element.ICE, weakness=Element.LIGHTNING, resistance=Element.ICE, boss=True),
+    EnemyTemplate("Golem King", 260, 23, Element.PHYSICAL, weakness=Element.LIGHTNING, resistance=Element.PHYSICAL, boss=True),
+    EnemyTemplate("Necromancer Lord", 185, 26, Element.DARK, weakness=Element.HOLY, resistance=Element.DARK, boss=True),
+    EnemyTemplate("Crimson Behemoth", 270, 30, Element.FIRE, weakness=Element.ICE, resistance=Element.FIRE, boss=True),
+    EnemyTemplate("Arch Demon", 235, 33, Element.DARK, weakness=Element.HOLY, resistance=Element.FIRE, boss=True),
+    EnemyTemplate("Elder Wyrm", 245, 29, Element.POISON, weakness=Element.HOLY, resistance=Element.POISON, boss=True),
+
+    # Ultra bosses (rare)
+    EnemyTemplate("Primordial Chaos", 300, 35, Element.DARK, weakness=Element.HOLY, boss=True),
+    EnemyTemplate("World Eater", 320, 38, Element.PHYSICAL, boss=True),
+    EnemyTemplate("Death Itself", 280, 40, Element.DARK, weakness=Element.HOLY, resistance=Element.DARK, boss=True),
+)
+
+ENEMY_TEMPLATES = {template.name: template for template in REGULAR_ENEMIES + BOSSES}
+
 COMPANIONS_POOL = [
     Companion("Sir Reginald", "Knight", 1, 100, 100, 12, 5, "Shield Wall", 50, "defensive"),
     Companion("Aria", "Archer", 1, 70, 70, 15, 2, "Rapid Shot", 50, "aggressive"),
@@ -717,6 +1100,1007 @@ PETS_POOL = [
     Pet("Lucky Cat", "Cat", 1, 35, 35, 3, "luck", 10, 1, 0),
 ]
 
+# ── LOOT TABLES ──────────────────────────────────────────────────────────────
+# Every enemy template gets its own weighted drop table, compiled once into an
+# alias table (Walker/Vose), so picking a drop costs one uniform draw however
+# long the table is. A table holds the shared pool for the enemy's tier, the
+# material its element yields, and anything ENEMY_LOOT names for it. Luck
+# (get_luck_bonus) raises the chance that a roll drops anything at all.
+
+ARTIFACTS = {artifact.id: artifact for artifact in [
+    Artifact("ember_heart", "Ember Heart", "Still warm to the touch", "Rare", damage_bonus=3,
+             element=Element.FIRE),
+    Artifact("stone_ward", "Stone Ward", "A rune that hardens skin", "Rare", defense_bonus=2),
+    Artifact("troll_blood", "Troll Blood Vial", "Never quite stops bubbling", "Rare", hp_bonus=15),
+    Artifact("dragon_eye", "Dragon's Eye", "It watches your enemies", "Epic", damage_bonus=6),
+    Artifact("aegis_shard", "Aegis Shard", "A splinter of a god's shield", "Epic", defense_bonus=4,
+             hp_bonus=20),
+    Artifact("crown_of_ages", "Crown of Ages", "Worn by every king who fell", "Legendary",
+             damage_bonus=5, defense_bonus=3, hp_bonus=30),
+]}
+
+@dataclass(frozen=True)
+class Drop:
+    kind: str        # material, consumable, weapon or artifact
+    name: str        # key into MATERIALS, CONSUMABLES, WEAPONS or ARTIFACTS
+    count: int = 1
+
+class AliasTable:
+    """Weighted choice in O(1): one uniform draw picks a column, then its alias"""
+    __slots__ = ("outcomes", "prob", "alias")
+
+    def __init__(self, weighted):
+        self.outcomes = [outcome for outcome, _ in weighted]
+        n = len(weighted)
+        total = sum(weight for _, weight in weighted)
+        scaled = [weight * n / total for _, weight in weighted]
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+
+    def sample(self, rng):
+        u = rng.random() * len(self.outcomes)
+        i = int(u)
+        return self.outcomes[i] if u - i < self.prob[i] else self.outcomes[self.alias[i]]
+
+    def chances(self):
+        """Probability of each outcome, rebuilt from the columns"""
+        n = len(self.outcomes)
+        chance = {}
+        for i, outcome in enumerate(self.outcomes):
+            alias = self.outcomes[self.alias[i]]
+            chance[outcome] = chance.get(outcome, 0.0) + self.prob[i] / n
+            chance[alias] = chance.get(alias, 0.0) + (1 - self.prob[i]) / n
+        return chance
+
+def _weapons(rarity, weight):
+    return [(Drop("weapon", name), weight) for name, w in WEAPONS.items() if w.rarity == rarity]
+
+def _artifacts(rarity, weight):
+    return [(Drop("artifact", key), weight) for key, a in ARTIFACTS.items() if a.rarity == rarity]
+
+REGULAR_LOOT = [
+    (Drop("material", "Iron Ore"), 30),
+    (Drop("material", "Enchant Scroll"), 2),
+    (Drop("consumable", "Health Potion"), 25),
+    (Drop("consumable", "Super Potion"), 6),
+    (Drop("consumable", "Strength Elixir"), 4),
+    (Drop("consumable", "Defense Tonic"), 4),
+    (Drop("consumable", "Speed Boost"), 3),
+    *_weapons("Common", 1.5),
+    *_weapons("Rare", 0.4),
+    *_artifacts("Rare", 0.5),
+]
+
+BOSS_LOOT = [
+    (Drop("material", "Iron Ore", 3), 10),
+    (Drop("material", "Enchant Scroll"), 8),
+    (Drop("consumable", "Super Potion", 2), 15),
+    (Drop("consumable", "Max Potion"), 6),
+    (Drop("consumable", "Phoenix Down"), 3),
+    *_weapons("Rare", 2),
+    *_weapons("Epic", 0.8),
+    *_artifacts("Rare", 3),
+    *_artifacts("Epic", 1.5),
+    *_artifacts("Legendary", 0.3),
+]
+
+# What an enemy's element yields; the enchanting menu's materials
+ELEMENT_MATERIALS = {
+    Element.PHYSICAL: "Iron Ore",
+    Element.FIRE: "Dragon Scale",
+    Element.ICE: "Frost Crystal",
+    Element.LIGHTNING: "Lightning Shard",
+    Element.WIND: "Lightning Shard",
+    Element.DARK: "Dark Essence",
+    Element.POISON: "Dark Essence",
+    Element.HOLY: "Holy Water",
+}
+ELEMENT_WEIGHT = {False: 20, True: 40}   # regular, boss
+
+# Extra drops for particular enemies
+ENEMY_LOOT = {
+    "Skeleton": [(Drop("material", "Holy Water"), 6)],
+    "Zombie": [(Drop("material", "Holy Water"), 6)],
+    "Golem": [(Drop("material", "Iron Ore", 3), 20)],
+    "Wyvern": [(Drop("material", "Dragon Scale"), 10)],
+    "Dark Mage": [(Drop("material", "Enchant Scroll"), 10)],
+    "Dragon": [(Drop("material", "Dragon Scale", 2), 40), (Drop("weapon", "Dragon Slayer"), 4)],
+    "Lich King": [(Drop("material", "Holy Water", 2), 20)],
+    "Storm Lord": [(Drop("weapon", "Stormbringer"), 4)],
+    "Phoenix King": [(Drop("weapon", "Phoenix Bow"), 4)],
+    "Celestial Guardian": [(Drop("weapon", "Celestial Staff"), 4), (Drop("material", "Holy Water", 3), 30)],
+    "Kraken": [(Drop("material", "Lightning Shard", 2), 25)],
+    "Golem King": [(Drop("weapon", "Worldbreaker"), 4)],
+}
+
+LOOT_CHANCE = {False: 0.45, True: 1.0}   # chance each roll drops something
+LOOT_ROLLS = {False: 1, True: 2}
+
+class LootTable:
+    """The compiled drops of one enemy template"""
+    __slots__ = ("chance", "rolls", "table")
+
+    def __init__(self, template):
+        boss = template.boss
+        weighted = list(BOSS_LOOT if boss else REGULAR_LOOT)
+        weighted.append((Drop("material", ELEMENT_MATERIALS[template.element], 2 if boss else 1),
+                         ELEMENT_WEIGHT[boss]))
+        weighted += ENEMY_LOOT.get(template.name, ())
+        self.chance = LOOT_CHANCE[boss]
+        self.rolls = LOOT_ROLLS[boss]
+        self.table = AliasTable(weighted)
+
+    def roll(self, rng, luck=0.0):
+        """The drops from one kill"""
+        chance = self.chance + luck
+        return [self.table.sample(rng) for _ in range(self.rolls) if rng.random() < chance]
+
+LOOT_TABLES = {name: LootTable(template) for name, template in ENEMY_TEMPLATES.items()}
+
+def loot_table(template):
+    """Compiled table for a template; templates not in ENEMY_TEMPLATES compile on first use"""
+    table = LOOT_TABLES.get(template.name)
+    if table is None:
+        table = LOOT_TABLES[template.name] = LootTable(template)
+    return table
+
+def grant_drop(player, drop):
+    """Give a drop to the player; returns the message to show"""
+    if drop.kind == "material":
+        player.materials[drop.name] = player.materials.get(drop.name, 0) + drop.count
+    elif drop.kind == "consumable":
+        player.consumables[drop.name] = player.consumables.get(drop.name, 0) + drop.count
+    elif drop.kind == "weapon":
+        player.inventory_weapons.append(replace(WEAPONS[drop.name]))
+    elif drop.kind == "artifact":
+        artifact = ARTIFACTS[drop.name]
+        if any(a.id == artifact.id for a in player.artifacts):
+            return f"🔮 {artifact.name} (already owned)"
+        player.artifacts.append(replace(artifact))
+        return f"🔮 Found artifact: {artifact.name}!"
+    return f"🎁 Loot: {drop.name}" + (f" x{drop.count}" if drop.count > 1 else "")
+
+def roll_loot(player, enemy):
+    """Roll and hand out an enemy's drops; returns them"""
+    drops = loot_table(enemy.template).roll(get_game_context().loot, player.get_luck_bonus())
+    for drop in drops:
+        message = grant_drop(player, drop)
+        slowprint(message)
+    return drops
+
+# ── ENCOUNTERS ───────────────────────────────────────────────────────────────
+# Enemy stats grow with the player. Every ENCOUNTER_BRACKET_LEVELS levels (and
+# every prestige) moves the player up one bracket, capped at the last one;
+# each bracket is compiled once at import into its scaled templates and a
+# table of how many enemies each party size can meet. Scaled templates keep
+# their names, so loot tables and replays still find them. An
+# EncounterGenerator draws battles from those tables with one random pick per
+# choice and no per-battle copying; stream() yields them lazily for runs of
+# any length.
+
+ENCOUNTER_BRACKET_LEVELS = 5
+ENCOUNTER_BRACKETS = 12
+BRACKET_HP_SCALE = 0.25    # +25% enemy HP per bracket
+BRACKET_ATK_SCALE = 0.15   # +15% enemy attack per bracket
+BOSS_EVERY = 10            # every 10th battle is a boss fight
+MAX_ENEMIES = 3
+COMPOSITION_PARTY_SIZES = 6  # party sizes with a precompiled table; larger ones compile on use
+
+def scale_template(template, bracket):
+    """The template's stats at `bracket`; bracket 0 is the template itself"""
+    if bracket == 0:
+        return template
+    return replace(template, hp=int(template.hp * (1 + BRACKET_HP_SCALE * bracket)),
+                   atk=int(template.atk * (1 + BRACKET_ATK_SCALE * bracket)))
+
+def party_composition(party_size):
+    """Enemy counts for a party, one entry per equally likely outcome"""
+    return tuple(min(count, MAX_ENEMIES) for count in range(1, party_size + 1))
+
+class EncounterBracket:
+    """Scaled templates and composition tables for one bracket"""
+    __slots__ = ("index", "regulars", "bosses", "templates", "compositions")
+
+    def __init__(self, index):
+        self.index = index
+        self.regulars = tuple(scale_template(t, index) for t in REGULAR_ENEMIES)
+        self.bosses = tuple(scale_template(t, index) for t in BOSSES)
+        self.templates = {t.name: t for t in self.regulars + self.bosses}
+        self.compositions = tuple(party_composition(size) for size in range(COMPOSITION_PARTY_SIZES + 1))
+
+    def composition(self, party_size):
+        if party_size < len(self.compositions):
+            return self.compositions[party_size]
+        return party_composition(party_size)
+
+BRACKETS = tuple(EncounterBracket(index) for index in range(ENCOUNTER_BRACKETS))
+
+def encounter_bracket(level, prestige=0):
+    index = (level - 1) // ENCOUNTER_BRACKET_LEVELS + prestige
+    return BRACKETS[clamp(index, 0, ENCOUNTER_BRACKETS - 1)]
+
+def player_bracket(player):
+    return encounter_bracket(player.level, player.prestige_level)
+
+class EncounterGenerator:
+    """Draws encounters from the bracket tables.
+
+    With a seed it owns its stream, seeded like GameContext(seed).encounters;
+    without one it draws from the current game context's encounters stream.
+    """
+
+    def __init__(self, seed=None):
+        self._rng = None if seed is None else random.Random(f"{seed}:encounters")
+
+    @property
+    def rng(self):
+        return self._rng or get_game_context().encounters
+
+    def roll(self, bracket, party_size, battle_count):
+        """Templates for one battle: a boss every BOSS_EVERY battles, else up to MAX_ENEMIES regulars"""
+        rng = self.rng
+        if battle_count % BOSS_EVERY == 0:
+            return (rng.choice(bracket.bosses),)
+        regulars = bracket.regulars
+        return tuple(rng.choice(regulars) for _ in range(rng.choice(bracket.composition(party_size))))
+
+    def roll_for(self, player, battle_count):
+        return self.roll(player_bracket(player), len(player.active_companions) + 1, battle_count)
+
+    def stream(self, player, start=1, stop=None):
+        """(battle_count, templates) for battles start..stop-1, endless without stop.
+
+        Each battle is drawn when it is asked for, so level-ups and new
+        companions from the battles before it count.
+        """
+        battle_count = start
+        while stop is None or battle_count < stop:
+            yield battle_count, self.roll_for(player, battle_count)
+            battle_count += 1
+
+    def sequence(self, level, prestige=0, party_size=1, start=1, stop=None):
+        """Like stream() for a fixed level, prestige and party size"""
+        bracket = encounter_bracket(level, prestige)
+        battle_count = start
+        while stop is None or battle_count < stop:
+            yield battle_count, self.roll(bracket, party_size, battle_count)
+            battle_count += 1
+
+ENCOUNTERS = EncounterGenerator()
+
+# ── STATUS EFFECTS ───────────────────────────────────────────────────────────
+# Enemy damage over time lives in per-enemy turn counters (enemy.poison,
+# enemy.burning). Player buffs live in player.active_buffs as the buff_clock
+# turn they expire on, and sit in a timer wheel keyed by that turn. A turn then
+# touches only enemies that are actually burning or poisoned and the buffs
+# that tick or expire on it. Buffs change stats through modifiers read by
+# compute_damage() and compute_defense(), never by editing base stats, so
+# nothing has to be undone on expiry.
+
+@dataclass(frozen=True)
+class StatusEffect:
+    name: str
+    stacking: str = "replace"   # replace | refresh (keep the longer) | stack (durations add)
+    max_turns: int = 0          # cap for stacking effects, 0 for none
+    tick_damage: int = 0        # per turn, enemy effects
+    tick_heal: int = 0          # per turn, player buffs
+    tick_message: str = ""
+    base_defense: int = 0       # added before the stance multiplier
+    defense: int = 0            # added after it
+    damage: int = 0
+    cooldown_rate: int = 0      # extra cooldown ticks per turn
+
+    def stack(self, current, turns):
+        """Duration after applying `turns` on top of `current` remaining turns"""
+        if self.stacking == "stack":
+            turns += current
+        elif self.stacking == "refresh":
+            turns = max(current, turns)
+        return min(turns, self.max_turns) if self.max_turns else turns
+
+STATUS_EFFECTS = {effect.name: effect for effect in [
+    # Enemy effects, ticked in this order
+    StatusEffect("poison", "stack", tick_damage=5, tick_message="  ☠️ {name} takes poison damage!"),
+    StatusEffect("burning", tick_damage=7, tick_message="  🔥 {name} takes burn damage!"),
+    # Player buffs
+    StatusEffect("damage_buff", damage=10),
+    StatusEffect("defense_buff", defense=5),
+    StatusEffect("bear_form", base_defense=10),
+    StatusEffect("rejuvenation", tick_heal=15, tick_message="  🌿 Rejuvenation heals 15 HP!"),
+    StatusEffect("perfect_parry"),
+    StatusEffect("speed_buff", cooldown_rate=100),
+]}
+
+ENEMY_EFFECTS = ("poison", "burning")
+
+class StatusEngine:
+    """Applies, ticks and expires status effects for one player and their foes"""
+
+    def __init__(self, player):
+        self.player = player
+        self.wheel = {}       # buff_clock turn -> buff names that may expire then
+        self.ticking = set()  # active buffs with a per-turn effect
+        self.slots = {}       # id(enemy) -> position, so ticks follow the enemy order
+        self.afflicted = {}   # position -> enemy with a damage-over-time effect running
+
+    def begin(self, enemies):
+        """Start a battle: rebuild the wheel from active_buffs and forget old enemies"""
+        self.wheel.clear()
+        self.ticking.clear()
+        for name, expires in self.player.active_buffs.items():
+            self.wheel.setdefault(expires, []).append(name)
+            if STATUS_EFFECTS[name].tick_heal:
+                self.ticking.add(name)
+        self.slots = {id(enemy): i for i, enemy in enumerate(enemies)}
+        self.afflicted.clear()
+
+    def add_buff(self, name, turns):
+        player = self.player
+        effect = STATUS_EFFECTS[name]
+        clock = player.buff_clock
+        remaining = player.active_buffs.get(name, clock) - clock
+        expires = clock + max(effect.stack(remaining, turns), 1)
+        if player.active_buffs.get(name) != expires:
+            player.active_buffs[name] = expires
+            self.wheel.setdefault(expires, []).append(name)
+        if effect.tick_heal:
+            self.ticking.add(name)
+        if effect.cooldown_rate:
+            player.cooldowns.refresh_rate()
+
+    def afflict(self, enemy, name, turns):
+        turns = STATUS_EFFECTS[name].stack(getattr(enemy, name), turns)
+        setattr(enemy, name, turns)
+        if turns > 0:
+            slot = self.slots.setdefault(id(enemy), len(self.slots))
+            self.afflicted[slot] = enemy
+
+    def tick_enemies(self):
+        for slot in sorted(self.afflicted):
+            enemy = self.afflicted[slot]
+            lasting = False
+            for name in ENEMY_EFFECTS:
+                turns = getattr(enemy, name)
+                if turns > 0:
+                    effect = STATUS_EFFECTS[name]
+                    enemy.hp -= effect.tick_damage
+                    setattr(enemy, name, turns - 1)
+                    slowprint(lambda: effect.tick_message.format(name=enemy.name))
+                    lasting = lasting or turns > 1
+            if not lasting:
+                del self.afflicted[slot]
+
+    def tick_buffs(self):
+        player = self.player
+        player.buff_clock += 1
+        clock = player.buff_clock
+        for name in self.wheel.pop(clock, ()):
+            if player.active_buffs.get(name) == clock:
+                del player.active_buffs[name]
+                self.ticking.discard(name)
+                if STATUS_EFFECTS[name].cooldown_rate:
+                    player.cooldowns.refresh_rate()
+        for name in sorted(self.ticking):
+            effect = STATUS_EFFECTS[name]
+            player.heal(effect.tick_heal)
+            slowprint(effect.tick_message)
+
+# ── COOLDOWNS ────────────────────────────────────────────────────────────────
+# Cooldowns run on a clock of COOLDOWN_TICKS per battle turn. Each turn moves
+# player.cooldown_clock forward by the player's cooldown rate, and
+# cooldown_timers holds the clock value each ability is ready again at. The
+# rate is worked out when a battle starts and whenever a buff changes it. A heap
+# ordered by ready time moves abilities back into the ready set, so a turn only
+# touches abilities that come off cooldown.
+
+COOLDOWN_TICKS = 100
+
+def cooldown_rate(player):
+    """Cooldown ticks per turn: Swift Strike, Swift enchantments and Speed Boost"""
+    rate = COOLDOWN_TICKS + player.skill_bonus.swift_strike
+    for item in [player.weapon, *player.equipped_armor.values()]:
+        if item and item.enchantment:
+            rate -= ENCHANTMENTS.get(item.enchantment, {}).get("cooldown", 0)
+    if player.active_buffs:
+        rate += player.buff_bonus("cooldown_rate")
+    return rate
+
+class CooldownManager:
+    """Puts abilities on cooldown and indexes the ones that are ready"""
+
+    def __init__(self, player):
+        self.player = player
+        self.rate = COOLDOWN_TICKS
+        self.heap = []      # (ready at, ability)
+        self.ready = set()
+
+    def refresh_rate(self):
+        self.rate = cooldown_rate(self.player)
+
+    def begin(self):
+        """Start a battle: recompute the rate and rebuild the ready index"""
+        player = self.player
+        self.refresh_rate()
+        clock = player.cooldown_clock
+        self.heap = [(at, name) for name, at in player.cooldown_timers.items() if at > clock]
+        heapq.heapify(self.heap)
+        self.ready = {name for name in player.abilities if player.cooldown_timers.get(name, clock) <= clock}
+
+    def remaining(self, name):
+        """Turns left at the base rate, 0 when ready"""
+        left = self.player.cooldown_timers.get(name, 0) - self.player.cooldown_clock
+        return max(left, 0) / COOLDOWN_TICKS
+
+    def start(self, name, turns):
+        player = self.player
+        at = player.cooldown_clock + round(turns * COOLDOWN_TICKS)
+        player.cooldown_timers[name] = at
+        if at > player.cooldown_clock:
+            self.ready.discard(name)
+            heapq.heappush(self.heap, (at, name))
+
+    def tick(self):
+        player = self.player
+        player.cooldown_clock += self.rate
+        clock = player.cooldown_clock
+        heap = self.heap
+        while heap and heap[0][0] <= clock:
+            at, name = heapq.heappop(heap)
+            if player.cooldown_timers.get(name) == at and name in player.abilities:
+                self.ready.add(name)
+
+# ── SKILL TREE ───────────────────────────────────────────────────────────────
+# Compiled once at import. Every player carries a SkillBonuses vector, rebuilt
+# by Player.refresh_skills() whenever skill_levels changes, so the hot paths
+# read a skill bonus as a plain attribute (player.skill_bonus.iron_skin).
+
+@dataclass(frozen=True)
+class Skill:
+    name: str
+    attr: str                  # attribute on SkillBonuses
+    max_level: int
+    base_cost: int
+    desc: str
+    per_level: int             # bonus at level n is per_level * n + base_bonus
+    base_bonus: int = 0
+    scaling: Callable[[int], str] = None   # menu text for a level
+
+    def bonus(self, level):
+        return self.per_level * level + self.base_bonus if level > 0 else 0
+
+SKILL_TREE = {skill.name: skill for skill in [
+    Skill("Whirlwind Strike", "whirlwind_strike", 5, 1, "AOE attack hitting all enemies", 20,  # % damage
+          scaling=lambda lvl: f"Damage: {100 + (lvl * 20)}% | Targets: All"),
+    Skill("Life Drain", "life_drain", 5, 1, "Heal based on damage dealt", 5,  # % lifesteal
+          scaling=lambda lvl: f"Lifesteal: {10 + (lvl * 5)}%"),
+    Skill("Berserker Rage", "berserker_rage", 3, 2, "Boost damage when low HP", 15,  # % damage
+          scaling=lambda lvl: f"Damage: +{20 + (lvl * 15)}% when HP < 50%"),
+    Skill("Shadow Clone", "shadow_clone", 3, 2, "Summon a copy to fight", 20,  # % clone power
+          scaling=lambda lvl: f"Clone Power: {30 + (lvl * 20)}% | Duration: {lvl + 2} turns"),
+    Skill("Iron Skin", "iron_skin", 5, 1, "Permanent defense boost", 2, 2,  # flat defense
+          scaling=lambda lvl: f"Defense: +{2 + (lvl * 2)}"),
+    Skill("Swift Strike", "swift_strike", 5, 1, "Reduce ability cooldowns", 5,  # % cooldown speed
+          scaling=lambda lvl: f"Cooldown: -{5 + (lvl * 5)}%"),
+    Skill("Elemental Mastery", "elemental_mastery", 3, 2, "Boost elemental damage", 10,  # % damage
+          scaling=lambda lvl: f"Elemental Damage: +{15 + (lvl * 10)}%"),
+    Skill("Battle Trance", "battle_trance", 4, 1, "Gain HP per kill", 8,  # HP per kill
+          scaling=lambda lvl: f"HP per kill: {10 + (lvl * 8)}"),
+    Skill("Lucky Strike", "lucky_strike", 5, 1, "Increase critical hit chance", 2,  # % crit chance
+          scaling=lambda lvl: f"Crit Chance: +{3 + (lvl * 2)}%"),
+    Skill("Titan's Endurance", "titans_endurance", 5, 1, "Permanent HP boost", 10, 15,  # flat HP
+          scaling=lambda lvl: f"Max HP: +{15 + (lvl * 10)}"),
+]}
+
+class SkillBonuses:
+    """Current bonus of every skill, one attribute each"""
+    __slots__ = tuple(skill.attr for skill in SKILL_TREE.values())
+
+    def __init__(self, skill_levels):
+        for skill in SKILL_TREE.values():
+            setattr(self, skill.attr, skill.bonus(skill_levels.get(skill.name, 0)))
+
+def get_skill_bonus(player, skill_name):
+    """Get the current bonus from a skill"""
+    skill = SKILL_TREE.get(skill_name)
+    return getattr(player.skill_bonus, skill.attr) if skill else 0
+
+# ── PROGRESS TRACKING ────────────────────────────────────────────────────────
+# Achievements, bounties and quests each watch one counter: total_kills, the
+# kills of one enemy ("kills:Goblin"), crits, parries, bosses, prestige or
+# hybrid. ProgressEngine indexes the pending ones by that counter, with their
+# thresholds kept sorted, so an update only looks at the trackers of the
+# counter that moved and a bisect finds every one it just satisfied.
+
+# Counters read straight off the player; the engine keeps total_kills itself
+PLAYER_COUNTERS = {
+    "crits": lambda player: player.critical_hits,
+    "parries": lambda player: player.perfect_parries,
+    "bosses": lambda player: player.bosses_defeated,
+    "prestige": lambda player: player.prestige_level,
+    "hybrid": lambda player: 1 if player.hybrid_class_name else 0,
+}
+
+def counter_key(kind, target=None):
+    """Counter that an achievement requirement or quest objective watches"""
+    if kind in ("kill", "kills"):
+        return f"kills:{target}" if target and target != "any" else "total_kills"
+    return kind
+
+class Watchers:
+    """Pending trackers of one counter, sorted by the value that completes them"""
+    __slots__ = ("thresholds", "trackers")
+
+    def __init__(self):
+        self.thresholds = []
+        self.trackers = []
+
+    def add(self, threshold, tracker):
+        i = bisect.bisect_right(self.thresholds, threshold)
+        self.thresholds.insert(i, threshold)
+        self.trackers.insert(i, tracker)
+
+    def reached(self, value):
+        """Remove and return every tracker completed at this value"""
+        i = bisect.bisect_right(self.thresholds, value)
+        if not i:
+            return ()
+        done = self.trackers[:i]
+        del self.thresholds[:i]
+        del self.trackers[:i]
+        return done
+
+class ProgressEngine:
+    """Drives one player's achievements, bounties and quests"""
+
+    def __init__(self, player):
+        self.player = player
+        self.rebuild()
+
+    def rebuild(self):
+        """Index everything from scratch; call after replacing a tracker list"""
+        player = self.player
+        self.total_kills = sum(player.kills.values())
+        self.watchers = {}
+        self.quests = {}   # counter -> [(quest, counter value its count started from)]
+        for ach in player.achievements:
+            if not ach.unlocked:
+                self.watch(counter_key(ach.requirement_type), ach.requirement_value, ach)
+        for bounty in player.bounties:
+            self.add_bounty(bounty)
+        for quest in player.active_quests:
+            self.add_quest(quest)
+
+    def counter(self, key):
+        if key == "total_kills":
+            return self.total_kills
+        if key.startswith("kills:"):
+            return self.player.kills.get(key[6:], 0)
+        return PLAYER_COUNTERS[key](self.player)
+
+    def watch(self, key, threshold, tracker):
+        watchers = self.watchers.get(key)
+        if watchers is None:
+            watchers = self.watchers[key] = Watchers()
+        watchers.add(threshold, tracker)
+
+    def add_bounty(self, bounty):
+        """Bounties are paid for the next kill of their target"""
+        if not bounty.completed:
+            key = counter_key("kill", bounty.target)
+            self.watch(key, self.counter(key) + 1, bounty)
+
+    def add_quest(self, quest):
+        if not quest.completed:
+            key = counter_key(quest.objective_type, quest.objective_target)
+            self.quests.setdefault(key, []).append((quest, self.counter(key) - quest.current_count))
+
+    def record_kill(self, enemy_name):
+        self.player.kills[enemy_name] = self.player.kills.get(enemy_name, 0) + 1
+        self.total_kills += 1
+
+    def update(self, key):
+        """Complete whatever the counter's current value satisfies"""
+        watchers = self.watchers.get(key)
+        quests = self.quests.get(key)
+        if watchers is None and quests is None:
+            return
+        value = self.counter(key)
+        if watchers is not None:
+            for tracker in watchers.reached(value):
+                tracker_completed(self.player, tracker)
+        if quests:
+            for quest, base in list(quests):
+                quest.current_count = min(value - base, quest.objective_count)
+                if quest.current_count >= quest.objective_count:
+                    quests.remove((quest, base))
+                    tracker_completed(self.player, quest)
+
+    def check(self):
+        """Re-check the counters that are not tied to one enemy"""
+        self.update("total_kills")
+        for key in PLAYER_COUNTERS:
+            self.update(key)
+
+def tracker_completed(player, tracker):
+    """Unlock, pay out and announce one achievement, bounty or quest"""
+    if isinstance(tracker, Achievement):
+        tracker.unlocked = True
+        slowprint(lambda: f"\n🏆 ACHIEVEMENT UNLOCKED: {tracker.name}!")
+        slowprint(lambda: f"   {tracker.description}")
+        slowprint(lambda: f"   Reward: {tracker.reward}")
+        if "gold" in tracker.reward:
+            player.gold += int(tracker.reward.split()[0])
+    elif isinstance(tracker, Bounty):
+        tracker.completed = True
+        player.gold += tracker.reward
+        slowprint(lambda: f"\n💰 BOUNTY COMPLETED! Earned {tracker.reward} gold!")
+    else:
+        tracker.completed = True
+        player.active_quests.remove(tracker)
+        player.completed_quests.append(tracker.id)
+        slowprint(lambda: f"\n📜 QUEST COMPLETE: {tracker.name}!")
+        player.gold += tracker.reward_gold
+        if tracker.reward_item in CONSUMABLES:
+            player.consumables[tracker.reward_item] = player.consumables.get(tracker.reward_item, 0) + 1
+        elif tracker.reward_item in WEAPONS:
+            player.inventory_weapons.append(replace(WEAPONS[tracker.reward_item]))
+        if tracker.reward_xp:
+            gain_xp(player, tracker.reward_xp)
+
+# ── ABILITIES ────────────────────────────────────────────────────────────────
+# Abilities are data. cast_ability interprets an AbilitySpec against live
+# enemies, and simkernel reads the same specs for batched simulations.
+
+@dataclass(frozen=True)
+class AbilitySpec:
+    """What one ability does; every effect is optional"""
+    name: str
+    message: str = ""             # printed once: {target} {dmg} {heal} {cost} {element}
+    hit_message: str = ""         # printed per hit: {target} {dmg} {hit}
+    target: str = "enemy"         # enemy, all (up to max_targets) or self
+    max_targets: Optional[int] = None
+    multiplier: float = 1.0       # x compute_damage()
+    flat: int = 0
+    element: object = None        # an Element, "weapon", or None to skip the check
+    elements: tuple = ()          # pick one at random per cast
+    hits: int = 1                 # damage is split evenly across hits
+    low_hp_multiplier: float = 1.0
+    proc_chance: float = 0.0
+    proc_on_crit: bool = False    # roll the player's crit chance instead
+    proc_multiplier: float = 1.0
+    proc_damage: int = 0
+    proc_poison: int = 0
+    proc_message: str = ""
+    execute_chance: float = 0.0
+    stun: int = 0
+    poison: int = 0
+    burn: int = 0
+    burn_chance: float = 1.0
+    heal: int = 0
+    heal_max_hp: float = 0.0      # fraction of max HP
+    lifesteal: float = 0.0        # fraction of damage dealt
+    hp_cost: int = 0
+    hp_cost_ratio: float = 0.0    # fraction of current HP
+    cost_damage: int = 0          # bonus damage per HP paid
+    min_hp: int = 0               # fizzles unless HP is above this
+    charge: int = 0
+    buff: Optional[str] = None
+    buff_turns: int = 0
+    dodge: bool = False
+    next_attack_boost: float = 0.0
+    berserk_on_kill: bool = False
+    kill_message: str = ""
+    variants: Dict[str, Dict] = field(default_factory=dict)  # hybrid -> overrides
+
+    @property
+    def deals_damage(self):
+        return self.target != "self"
+
+    def for_hybrid(self, hybrid_name):
+        """This spec with a hybrid class's overrides applied"""
+        overrides = self.variants.get(hybrid_name)
+        return replace(self, **overrides) if overrides else self
+
+ABILITY_SPECS = {spec.name: spec for spec in [
+    AbilitySpec("Power Strike", "⚔️  Power Strike hits {target} for {dmg} damage!",
+                multiplier=2, element="weapon", charge=10,
+                variants={"Duelist": {"proc_on_crit": True, "proc_multiplier": 1.5,
+                                      "proc_message": "  ⚡ DUELIST CRIT BONUS!"}}),
+    AbilitySpec("Shield Bash", "🛡️  Shield Bash! {target} stunned for 2 turns!", flat=5, stun=2,
+                variants={"Shadowknight": {"proc_chance": 0.4, "proc_poison": 2,
+                                           "proc_message": "  ☠️ Shadowknight poison applied!"}}),
+    AbilitySpec("Fireball", "🔥 Fireball burns {target} for {dmg} damage!",
+                flat=15, element=Element.FIRE, burn=3, burn_chance=0.3, charge=12,
+                variants={"Trickster": {"proc_chance": 0.25, "proc_multiplier": 2,
+                                        "proc_message": "  ✨ TRICKSTER SPELL CRIT!"}}),
+    AbilitySpec("Ice Barrier", "🧊 Ice Barrier restores {heal} HP!", target="self", heal=20),
+    AbilitySpec("Backstab", "🗡️  Backstab! {dmg} critical damage!", multiplier=2.5, charge=15,
+                variants={"Duelist": {"multiplier": 3.0}}),
+    AbilitySpec("Evasion", "💨 Evasion activated!", target="self", dodge=True),
+    AbilitySpec("Rage Strike", "😡 Rage Strike! {dmg} damage!", low_hp_multiplier=1.8),
+    AbilitySpec("Bloodlust", "🩸 Bloodlust! {dmg} damage, healed {heal} HP!", lifesteal=0.3,
+                variants={"Ravager": {"lifesteal": 0.5}}),
+    AbilitySpec("Poison Blade", "☠️  Poison Blade! {target} poisoned!", poison=3),
+    AbilitySpec("Shadow Step", "🌑 Shadow Step! Dodge + damage boost!", target="self",
+                dodge=True, next_attack_boost=1.5),
+    # Hybrid-specific abilities
+    AbilitySpec("Arcane Slash", "⚔️✨ Arcane Slash! {dmg} {element} damage!", multiplier=2,
+                elements=(Element.FIRE, Element.ICE, Element.LIGHTNING)),
+    AbilitySpec("Blood Sacrifice", "🩸 Blood Sacrifice! {cost} HP → {dmg} damage!",
+                hp_cost_ratio=0.3, cost_damage=2, min_hp=30),
+    AbilitySpec("Assassinate", "🗡️💀 Assassinate! {dmg} damage!", multiplier=4, execute_chance=0.2),
+    AbilitySpec("Harvest", "💀 Harvest! {dmg} damage!", multiplier=2,
+                berserk_on_kill=True, kill_message="  🔥 BERSERK MODE ACTIVATED!"),
+    # New class abilities
+    AbilitySpec("Holy Strike", "✨ Holy Strike! {dmg} damage + healed {heal} HP!",
+                flat=10, element=Element.HOLY, heal=5),
+    AbilitySpec("Divine Heal", "🙏 Divine Heal! Restored {heal} HP!", target="self", heal_max_hp=0.4),
+    AbilitySpec("Death Bolt", "💀 Death Bolt! {dmg} damage!", flat=12, element=Element.DARK,
+                proc_chance=0.3, proc_damage=10, proc_message="  💀 +10 curse damage!"),
+    AbilitySpec("Raise Undead", "💀 Raised a skeleton minion! (Companion for 5 turns)",
+                target="self", heal=20),
+    AbilitySpec("Chi Strike", hit_message="👊 Chi Strike {hit}! {dmg} damage!", hits=3),
+    AbilitySpec("Inner Peace", "🧘 Inner Peace! +{heal} HP and +20 ultimate charge!",
+                target="self", heal=25, charge=20),
+    AbilitySpec("Multi-Shot", hit_message="🏹 Multi-Shot hits {target} for {dmg}!",
+                target="all", max_targets=2),
+    AbilitySpec("Nature's Call", "🐺 Nature's Call! {dmg} damage + {heal} HP healed!", heal=15),
+    AbilitySpec("Bear Form", "🐻 Bear Form! +10 defense for 3 turns!", target="self",
+                buff="bear_form", buff_turns=3),
+    AbilitySpec("Rejuvenation", "🌿 Rejuvenation! Healing 15 HP per turn for 3 turns!",
+                target="self", buff="rejuvenation", buff_turns=3),
+    AbilitySpec("Iaijutsu", "⚔️ Iaijutsu! Swift {dmg} damage!", multiplier=2.2),
+    AbilitySpec("Perfect Parry", "🛡️ Perfect Parry stance! Next 2 attacks countered!",
+                target="self", buff="perfect_parry", buff_turns=2),
+    AbilitySpec("Eldritch Blast", "👁️ Eldritch Blast! {dmg} dark damage!", flat=8, element=Element.DARK),
+    AbilitySpec("Life Tap", "🩸 Life Tap! Sacrificed {cost} HP for {dmg} damage!",
+                flat=30, hp_cost=20, min_hp=20),
+]}
+
+def ability_element(player, spec):
+    """Element an ability hits with this cast, or None for no elemental check"""
+    if spec.elements:
+        return get_game_context().combat.choice(spec.elements)
+    if spec.element == "weapon":
+        return player.weapon.element if player.weapon else Element.PHYSICAL
+    return spec.element
+
+def cast_ability(player, spec, enemies):
+    """Apply an ability spec; enemies are the living enemies, first one targeted"""
+    if player.hp <= spec.min_hp:
+        return
+    cost = spec.hp_cost + int(player.hp * spec.hp_cost_ratio)
+    player.hp -= cost
+
+    if not spec.deals_damage:
+        targets = []
+    elif spec.target == "all":
+        targets = enemies[:spec.max_targets]
+    else:
+        targets = enemies[:1]
+
+    element = ability_element(player, spec)
+    total = 0
+    killed = False
+    for target in targets:
+        dmg = int(player.compute_damage() * spec.multiplier) + spec.flat + cost * spec.cost_damage
+        if spec.low_hp_multiplier != 1.0 and player.hp < player.compute_max_hp() / 2:
+            dmg = int(dmg * spec.low_hp_multiplier)
+
+        procced = False
+        if spec.proc_on_crit:
+            procced = check_critical_hit(player)
+        elif spec.proc_chance:
+            procced = get_game_context().combat.random() < spec.proc_chance
+        if procced:
+            dmg = int(dmg * spec.proc_multiplier)
+            slowprint(spec.proc_message)
+        if element is not None:
+            dmg = apply_elemental_damage(dmg, element, target)
+        if procced:
+            dmg += spec.proc_damage
+        if spec.execute_chance and get_game_context().combat.random() < spec.execute_chance:
+            dmg = target.hp  # Instant kill
+            slowprint("  💀 INSTANT KILL!")
+
+        per_hit = dmg // spec.hits if spec.hits > 1 else dmg
+        for hit in range(1, spec.hits + 1):
+            target.hp -= per_hit
+            if spec.hit_message:
+                slowprint(lambda: spec.hit_message.format(target=target.name, dmg=per_hit, hit=hit))
+        total += per_hit * spec.hits
+
+        if spec.stun:
+            target.stunned = spec.stun
+        player.status_engine.afflict(target, "poison", spec.poison + (spec.proc_poison if procced else 0))
+        if spec.burn and get_game_context().combat.random() < spec.burn_chance:
+            player.status_engine.afflict(target, "burning", spec.burn)
+        if spec.berserk_on_kill and target.hp <= 0:
+            player.berserk_mode = True
+            killed = True
+
+    heal = spec.heal + int(player.compute_max_hp() * spec.heal_max_hp) + int(total * spec.lifesteal)
+    if heal:
+        player.heal(heal)
+    player.total_damage_dealt += total
+    player.ultimate_charge += spec.charge
+
+    if spec.buff:
+        player.status_engine.add_buff(spec.buff, spec.buff_turns)
+    if spec.dodge:
+        player.cheat_flags["dodge_next"] = True
+    if spec.next_attack_boost:
+        player.cheat_flags["next_attack_boost"] = spec.next_attack_boost
+
+    if spec.message:
+        slowprint(lambda: spec.message.format(
+            target=targets[0].name if targets else player.name, dmg=total, heal=heal, cost=cost,
+            element=element.value if element else ""))
+    if killed:
+        slowprint(spec.kill_message)
+
+# ── CLASS REGISTRY ───────────────────────────────────────────────────────────
+# Everything that follows from a (primary, secondary) class choice is compiled
+# once into a frozen ClassProfile. A Player binds to its profile whenever its
+# classes change, so combat code never re-derives class data.
+
+# class -> (max_hp, base_damage, defense) added at character creation
+CLASS_BASE_STATS = {
+    "Warrior": (30, 3, 2),
+    "Mage": (-10, 12, 0),
+    "Rogue": (-5, 5, 0),
+    "Berserker": (10, 8, 0),
+    "Assassin": (-10, 6, 0),
+    "Paladin": (25, 4, 3),
+    "Necromancer": (-5, 10, 0),
+    "Monk": (5, 7, 2),
+    "Ranger": (10, 6, 0),
+    "Druid": (15, 5, 1),
+    "Samurai": (15, 8, 2),
+    "Warlock": (-5, 11, 0),
+}
+
+# (ability, cooldown, description); effects live in ABILITY_SPECS
+CLASS_ABILITIES = {
+    "Warrior": [("Power Strike", 3, "2x damage"),
+                ("Shield Bash", 4, "Damage + stun")],
+    "Mage": [("Fireball", 3, "High magic damage"),
+             ("Ice Barrier", 5, "Gain shield")],
+    "Rogue": [("Backstab", 2.5, "Double damage"),
+              ("Evasion", 4, "Dodge next attack")],
+    "Berserker": [("Rage Strike", 3, "Extra dmg when HP<50%"),
+                  ("Bloodlust", 5, "Deal dmg & heal")],
+    "Assassin": [("Poison Blade", 3, "Damage over time"),
+                 ("Shadow Step", 4, "Avoid next attack")],
+    "Paladin": [("Holy Strike", 3, "Holy damage"),
+                ("Divine Heal", 5, "Restore HP")],
+    "Necromancer": [("Death Bolt", 3, "Dark damage"),
+                    ("Raise Undead", 6, "Summon skeleton")],
+    "Monk": [("Chi Strike", 2, "Fast combo"),
+             ("Inner Peace", 5, "Heal & focus")],
+    "Ranger": [("Multi-Shot", 3, "Hit 2 enemies"),
+               ("Nature's Call", 5, "Summon beast")],
+    "Druid": [("Bear Form", 4, "Tank mode"),
+              ("Rejuvenation", 4, "Heal over time")],
+    "Samurai": [("Iaijutsu", 3, "Quick draw"),
+                ("Perfect Parry", 5, "Counter stance")],
+    "Warlock": [("Eldritch Blast", 2, "Dark bolt"),
+                ("Life Tap", 4, "HP to damage")],
+}
+
+# Ability a class teaches when taken as the secondary class
+SECONDARY_ABILITIES = {
+    "Warrior": ("Shield Bash", 4, "Stun"),
+    "Mage": ("Fireball", 3, "Fire dmg"),
+    "Rogue": ("Backstab", 2.5, "High crit dmg"),
+    "Berserker": ("Rage Strike", 3, "Berserk dmg"),
+    "Assassin": ("Poison Blade", 3, "Poison"),
+}
+
+HYBRID_ABILITIES = {
+    "Spellblade": ("Arcane Slash", 4, "Magic-enhanced strike"),
+    "Blood Mage": ("Blood Sacrifice", 5, "HP to damage"),
+    "Nightblade": ("Assassinate", 6, "Massive critical strike"),
+    "Reaper": ("Harvest", 5, "Kill for berserk extension"),
+}
+
+# Hybrid passives that feed the crit and parry rolls
+HYBRID_PASSIVES = {
+    "Duelist": {"crit_bonus": 0.10, "crit_multiplier": 3},
+    "Ravager": {"crit_bonus": 0.15},
+    "Nightblade": {"crit_bonus": 0.20, "crit_multiplier": 3.5, "parry_bonus": 0.15},
+}
+
+@dataclass(frozen=True)
+class ClassAbility:
+    name: str
+    cooldown: float
+    desc: str
+    spec: AbilitySpec
+
+@dataclass(frozen=True)
+class ClassProfile:
+    class_name: str
+    secondary_class: Optional[str] = None
+    hybrid_name: Optional[str] = None
+    special: str = ""
+    bonus_hp: int = 0
+    bonus_damage: int = 0
+    start_hp: int = 0
+    start_damage: int = 0
+    start_defense: int = 0
+    abilities: tuple = ()
+    crit_bonus: float = 0.0
+    crit_multiplier: float = 2
+    parry_bonus: float = 0.0
+
+    @property
+    def hybrid(self):
+        """Same shape as a HYBRID_CLASSES entry, or None"""
+        if not self.hybrid_name:
+            return None
+        return {"name": self.hybrid_name, "bonus_hp": self.bonus_hp,
+                "bonus_damage": self.bonus_damage, "special": self.special}
+
+class ClassRegistry:
+    """Compiled ClassProfile for every class and class pair"""
+
+    def __init__(self):
+        self.profiles = {}
+        for primary in CLASS_NAMES:
+            self.profiles[(primary, None)] = self.compile(primary, None)
+            for secondary in CLASS_NAMES:
+                if secondary != primary:
+                    self.profiles[(primary, secondary)] = self.compile(primary, secondary)
+
+    @staticmethod
+    def compile(primary, secondary):
+        hybrid = None
+        if secondary:
+            hybrid = HYBRID_CLASSES.get((primary, secondary)) or HYBRID_CLASSES.get((secondary, primary))
+
+        hybrid_name = hybrid["name"] if hybrid else None
+        entries = list(CLASS_ABILITIES.get(primary, []))
+        if secondary in SECONDARY_ABILITIES:
+            entries.append(SECONDARY_ABILITIES[secondary])
+        if hybrid_name in HYBRID_ABILITIES:
+            entries.append(HYBRID_ABILITIES[hybrid_name])
+        abilities = {}
+        for name, cooldown, desc in entries:
+            abilities[name] = ClassAbility(name, cooldown, desc, ABILITY_SPECS[name].for_hybrid(hybrid_name))
+
+        start_hp, start_damage, start_defense = CLASS_BASE_STATS.get(primary, (0, 0, 0))
+        return ClassProfile(
+            class_name=primary,
+            secondary_class=secondary,
+            hybrid_name=hybrid_name,
+            special=hybrid["special"] if hybrid else "",
+            bonus_hp=hybrid["bonus_hp"] if hybrid else 0,
+            bonus_damage=hybrid["bonus_damage"] if hybrid else 0,
+            start_hp=start_hp,
+            start_damage=start_damage,
+            start_defense=start_defense,
+            abilities=tuple(abilities.values()),
+            **HYBRID_PASSIVES.get(hybrid_name, {}),
+        )
+
+    def get(self, primary, secondary=None):
+        key = (primary, secondary)
+        profile = self.profiles.get(key)
+        if profile is None:
+            profile = self.profiles[key] = self.compile(primary, secondary)
+        return profile
+
+CLASS_REGISTRY = ClassRegistry()
+
 @dataclass
 class Player:
     name: str = "Hero"
@@ -748,7 +2132,8 @@ class Player:
     pets: List[Pet] = field(default_factory=list)
     active_pet: Optional[Pet] = None
 
-    cooldown_timers: Dict[str,float] = field(default_factory=dict)
+    cooldown_timers: Dict[str,int] = field(default_factory=dict)  # ability -> cooldown_clock it is ready at
+    cooldown_clock: int = 0  # COOLDOWN_TICKS per battle turn, faster with Swift Strike
     abilities: Dict[str, Dict] = field(default_factory=dict)
     talent_abilities: Dict[str, Dict] = field(default_factory=dict)
     ultimate_charge: int = 0
@@ -778,7 +2163,8 @@ class Player:
     perfect_parries: int = 0
     sacrifices_made: int = 0
 
-    active_buffs: Dict[str, int] = field(default_factory=dict)
+    active_buffs: Dict[str, int] = field(default_factory=dict)  # buff -> buff_clock turn it expires on
+    buff_clock: int = 0  # battle turns played, the clock buffs expire on
     berserk_mode: bool = False
     curse_active: bool = False
 
@@ -788,13 +2174,34 @@ class Player:
         "dodge_next": False, "next_attack_boost": 1.0
     })
 
+    profile: Optional[ClassProfile] = field(default=None, repr=False, compare=False)
+    status_engine: Optional[StatusEngine] = field(default=None, repr=False, compare=False)
+    cooldowns: Optional[CooldownManager] = field(default=None, repr=False, compare=False)
+    skill_bonus: Optional[SkillBonuses] = field(default=None, repr=False, compare=False)
+    progress: Optional[ProgressEngine] = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.bind_profile()
+        self.refresh_skills()
+        self.status_engine = StatusEngine(self)
+        self.cooldowns = CooldownManager(self)
+        self.progress = ProgressEngine(self)
+
+    def refresh_skills(self):
+        """Rebuild the skill bonus vector; call after changing skill_levels"""
+        self.skill_bonus = SkillBonuses(self.skill_levels)
+
+    def set_skill_level(self, skill_name, level):
+        self.skill_levels[skill_name] = level
+        self.refresh_skills()
+
+    def bind_profile(self):
+        """Look up the compiled profile for the current class choice"""
+        self.profile = CLASS_REGISTRY.get(self.class_name, self.secondary_class)
+
     def get_hybrid_info(self):
         """Get hybrid class bonuses if applicable"""
-        if self.secondary_class:
-            key1 = (self.class_name, self.secondary_class)
-            key2 = (self.secondary_class, self.class_name)
-            return HYBRID_CLASSES.get(key1) or HYBRID_CLASSES.get(key2)
-        return None
+        return self.profile.hybrid
 
     def compute_damage(self):
         dmg = self.base_damage
@@ -803,9 +2210,7 @@ class Player:
         dmg += self.prestige_bonuses.get('permanent_damage', 0)
 
         # Hybrid class bonus
-        hybrid = self.get_hybrid_info()
-        if hybrid:
-            dmg += hybrid["bonus_damage"]
+        dmg += self.profile.bonus_damage
 
         if self.weapon:
             dmg += self.weapon.damage
@@ -830,8 +2235,8 @@ class Player:
         elif self.stance == Stance.DEFENSIVE:
             dmg = int(dmg * 0.7)
 
-        if "damage_buff" in self.active_buffs:
-            dmg += 10
+        if self.active_buffs:
+            dmg += self.buff_bonus("damage")
 
         if self.berserk_mode:
             dmg = int(dmg * 1.4)
@@ -840,14 +2245,20 @@ class Player:
 
         return dmg
 
+    def buff_bonus(self, stat):
+        """Sum of one StatusEffect modifier over the active buffs"""
+        return sum(getattr(STATUS_EFFECTS[name], stat) for name in self.active_buffs)
+
     def compute_defense(self):
         defense = self.defense
+        if self.active_buffs:
+            defense += self.buff_bonus("base_defense")
 
         # Prestige bonuses
         defense += self.prestige_bonuses.get('permanent_defense', 0)
 
         # Skill tree bonus
-        defense += get_skill_bonus(self, "Iron Skin")
+        defense += self.skill_bonus.iron_skin
 
         # Warlord hybrid bonus
         if self.hybrid_class_name == "Warlord":
@@ -870,8 +2281,8 @@ class Player:
         elif self.stance == Stance.OFFENSIVE:
             defense = int(defense * 0.8)
 
-        if "defense_buff" in self.active_buffs:
-            defense += 5
+        if self.active_buffs:
+            defense += self.buff_bonus("defense")
 
         return defense
 
@@ -882,12 +2293,10 @@ class Player:
         hp += self.prestige_bonuses.get('permanent_hp', 0)
 
         # Skill tree bonus
-        hp += get_skill_bonus(self, "Titan's Endurance")
+        hp += self.skill_bonus.titans_endurance
 
         # Hybrid class bonus
-        hybrid = self.get_hybrid_info()
-        if hybrid:
-            hp += hybrid["bonus_hp"]
+        hp += self.profile.bonus_hp
 
         hp += sum(a.hp_bonus for a in self.artifacts)
         for armor in self.equipped_armor.values():
@@ -922,13 +2331,13 @@ class Player:
             if self.level == 10 and self.evolution_stage == 1:
                 self.evolution_stage = 2
                 class_display = self.hybrid_class_name or self.class_name
-                slowprint(f"\n🌟 EVOLUTION! {class_display} → Elite {class_display}")
+                slowprint(lambda: f"\n🌟 EVOLUTION! {class_display} → Elite {class_display}")
                 self.base_damage += 5
                 self.defense += 2
             elif self.level == 20 and self.evolution_stage == 2:
                 self.evolution_stage = 3
                 class_display = self.hybrid_class_name or self.class_name
-                slowprint(f"\n🌟 ULTIMATE EVOLUTION! Elite {class_display} → Master {class_display}")
+                slowprint(lambda: f"\n🌟 ULTIMATE EVOLUTION! Elite {class_display} → Master {class_display}")
                 self.base_damage += 10
                 self.defense += 5
                 self.max_hp += 50
@@ -974,446 +2383,99 @@ class Player:
             # Restore some skill levels (half of what you had)
             for skill, level in kept_skills.items():
                 self.skill_levels[skill] = max(1, level // 2)
+            self.refresh_skills()
 
             # Restore achievements
             self.achievements = kept_achievements + [a for a in self.achievements if not a.unlocked]
+            self.progress.rebuild()
 
-            slowprint(f"\n⭐ PRESTIGE {self.prestige_level}! ⭐")
+            slowprint(lambda: f"\n⭐ PRESTIGE {self.prestige_level}! ⭐")
             slowprint("="*50)
-            slowprint(f"✨ Permanent Bonuses Gained:")
-            slowprint(f"   💪 +{self.prestige_bonuses['permanent_damage']} Total Damage")
-            slowprint(f"   ❤️  +{self.prestige_bonuses['permanent_hp']} Total HP")
-            slowprint(f"   🛡️  +{self.prestige_bonuses['permanent_defense']} Total Defense")
-            slowprint(f"   ⚡ +{self.prestige_bonuses['crit_bonus']}% Crit Chance")
-            slowprint(f"\n🔄 Retained:")
-            slowprint(f"   • Hybrid Class: {self.hybrid_class_name}")
-            slowprint(f"   • Half of your skill levels")
-            slowprint(f"   • All achievements")
+            slowprint(lambda: f"✨ Permanent Bonuses Gained:")
+            slowprint(lambda: f"   💪 +{self.prestige_bonuses['permanent_damage']} Total Damage")
+            slowprint(lambda: f"   ❤️  +{self.prestige_bonuses['permanent_hp']} Total HP")
+            slowprint(lambda: f"   🛡️  +{self.prestige_bonuses['permanent_defense']} Total Defense")
+            slowprint(lambda: f"   ⚡ +{self.prestige_bonuses['crit_bonus']}% Crit Chance")
+            slowprint(lambda: f"\n🔄 Retained:")
+            slowprint(lambda: f"   • Hybrid Class: {self.hybrid_class_name}")
+            slowprint(lambda: f"   • Half of your skill levels")
+            slowprint(lambda: f"   • All achievements")
             slowprint("="*50)
         else:
             slowprint("❌ Must be level 30 to prestige!")
-            slowprint(f"   Current level: {self.level}/30")
+            slowprint(lambda: f"   Current level: {self.level}/30")
 
     def add_multiclass(self, class_name):
         if not self.secondary_class:
             self.secondary_class = class_name
+            self.bind_profile()
             hybrid = self.get_hybrid_info()
             if hybrid:
                 self.hybrid_class_name = hybrid["name"]
-                slowprint(f"\n✨ HYBRID CLASS UNLOCKED: {hybrid['name']}!")
-                slowprint(f"   Special: {hybrid['special']}")
-                slowprint(f"   Bonuses: +{hybrid['bonus_hp']} HP, +{hybrid['bonus_damage']} Damage")
+                slowprint(lambda: f"\n✨ HYBRID CLASS UNLOCKED: {hybrid['name']}!")
+                slowprint(lambda: f"   Special: {hybrid['special']}")
+                slowprint(lambda: f"   Bonuses: +{hybrid['bonus_hp']} HP, +{hybrid['bonus_damage']} Damage")
             else:
-                slowprint(f"You are now a {self.class_name}/{class_name}!")
+                slowprint(lambda: f"You are now a {self.class_name}/{class_name}!")
             self.init_class_abilities()
         else:
             slowprint("You already have a secondary class!")
 
     def init_class_abilities(self):
-        abilities = {}
-
-        if self.class_name == "Warrior":
-            abilities.update({
-                "Power Strike": {"cooldown": 3, "desc": "2x damage", "action": self.ability_power_strike},
-                "Shield Bash": {"cooldown": 4, "desc": "Damage + stun", "action": self.ability_shield_bash}
-            })
-        elif self.class_name == "Mage":
-            abilities.update({
-                "Fireball": {"cooldown": 3, "desc": "High magic damage", "action": self.ability_fireball},
-                "Ice Barrier": {"cooldown": 5, "desc": "Gain shield", "action": self.ability_ice_barrier}
-            })
-        elif self.class_name == "Rogue":
-            abilities.update({
-                "Backstab": {"cooldown": 2.5, "desc": "Double damage", "action": self.ability_backstab},
-                "Evasion": {"cooldown": 4, "desc": "Dodge next attack", "action": self.ability_evasion}
-            })
-        elif self.class_name == "Berserker":
-            abilities.update({
-                "Rage Strike": {"cooldown": 3, "desc": "Extra dmg when HP<50%", "action": self.ability_rage_strike},
-                "Bloodlust": {"cooldown": 5, "desc": "Deal dmg & heal", "action": self.ability_bloodlust}
-            })
-        elif self.class_name == "Assassin":
-            abilities.update({
-                "Poison Blade": {"cooldown": 3, "desc": "Damage over time", "action": self.ability_poison_blade},
-                "Shadow Step": {"cooldown": 4, "desc": "Avoid next attack", "action": self.ability_shadow_step}
-            })
-        elif self.class_name == "Paladin":
-            abilities.update({
-                "Holy Strike": {"cooldown": 3, "desc": "Holy damage", "action": self.ability_holy_strike},
-                "Divine Heal": {"cooldown": 5, "desc": "Restore HP", "action": self.ability_divine_heal}
-            })
-        elif self.class_name == "Necromancer":
-            abilities.update({
-                "Death Bolt": {"cooldown": 3, "desc": "Dark damage", "action": self.ability_death_bolt},
-                "Raise Undead": {"cooldown": 6, "desc": "Summon skeleton", "action": self.ability_raise_undead}
-            })
-        elif self.class_name == "Monk":
-            abilities.update({
-                "Chi Strike": {"cooldown": 2, "desc": "Fast combo", "action": self.ability_chi_strike},
-                "Inner Peace": {"cooldown": 5, "desc": "Heal & focus", "action": self.ability_inner_peace}
-            })
-        elif self.class_name == "Ranger":
-            abilities.update({
-                "Multi-Shot": {"cooldown": 3, "desc": "Hit 2 enemies", "action": self.ability_multishot},
-                "Nature's Call": {"cooldown": 5, "desc": "Summon beast", "action": self.ability_natures_call}
-            })
-        elif self.class_name == "Druid":
-            abilities.update({
-                "Bear Form": {"cooldown": 4, "desc": "Tank mode", "action": self.ability_bear_form},
-                "Rejuvenation": {"cooldown": 4, "desc": "Heal over time", "action": self.ability_rejuvenation}
-            })
-        elif self.class_name == "Samurai":
-            abilities.update({
-                "Iaijutsu": {"cooldown": 3, "desc": "Quick draw", "action": self.ability_iaijutsu},
-                "Perfect Parry": {"cooldown": 5, "desc": "Counter stance", "action": self.ability_perfect_parry}
-            })
-        elif self.class_name == "Warlock":
-            abilities.update({
-                "Eldritch Blast": {"cooldown": 2, "desc": "Dark bolt", "action": self.ability_eldritch_blast},
-                "Life Tap": {"cooldown": 4, "desc": "HP to damage", "action": self.ability_life_tap}
-            })
-
-        # Add secondary class abilities
-        if self.secondary_class:
-            if self.secondary_class == "Warrior":
-                abilities["Shield Bash"] = {"cooldown": 4, "desc": "Stun", "action": self.ability_shield_bash}
-            elif self.secondary_class == "Mage":
-                abilities["Fireball"] = {"cooldown": 3, "desc": "Fire dmg", "action": self.ability_fireball}
-            elif self.secondary_class == "Rogue":
-                abilities["Backstab"] = {"cooldown": 2.5, "desc": "High crit dmg", "action": self.ability_backstab}
-            elif self.secondary_class == "Berserker":
-                abilities["Rage Strike"] = {"cooldown": 3, "desc": "Berserk dmg", "action": self.ability_rage_strike}
-            elif self.secondary_class == "Assassin":
-                abilities["Poison Blade"] = {"cooldown": 3, "desc": "Poison", "action": self.ability_poison_blade}
-
-        # Add hybrid-specific abilities
-        if self.hybrid_class_name:
-            abilities.update(self.get_hybrid_abilities())
-
-        self.abilities = abilities
-        for name in self.abilities:
-            self.cooldown_timers.setdefault(name, 0.0)
-        self.cooldown_timers.setdefault("heal", 0.0)
-
-    def get_hybrid_abilities(self):
-        """Get special hybrid abilities"""
-        hybrid_abilities = {}
-
-        if self.hybrid_class_name == "Spellblade":
-            hybrid_abilities["Arcane Slash"] = {
-                "cooldown": 4,
-                "desc": "Magic-enhanced strike",
-                "action": self.ability_arcane_slash
-            }
-        elif self.hybrid_class_name == "Blood Mage":
-            hybrid_abilities["Blood Sacrifice"] = {
-                "cooldown": 5,
-                "desc": "HP to damage",
-                "action": self.ability_blood_sacrifice
-            }
-        elif self.hybrid_class_name == "Nightblade":
-            hybrid_abilities["Assassinate"] = {
-                "cooldown": 6,
-                "desc": "Massive critical strike",
-                "action": self.ability_assassinate
-            }
-        elif self.hybrid_class_name == "Reaper":
-            hybrid_abilities["Harvest"] = {
-                "cooldown": 5,
-                "desc": "Kill for berserk extension",
-                "action": self.ability_harvest
-            }
-
-        return hybrid_abilities
-
-    def ability_power_strike(self, enemies):
-        target = enemies[0]
-        dmg = self.compute_damage() * 2
-
-        # Duelist bonus
-        if self.hybrid_class_name == "Duelist" and check_critical_hit(self):
-            dmg = int(dmg * 1.5)
-            slowprint("  ⚡ DUELIST CRIT BONUS!")
-
-        dmg = apply_elemental_damage(dmg, self.weapon.element if self.weapon else Element.PHYSICAL, target)
-        target['hp'] -= dmg
-        self.total_damage_dealt += dmg
-        self.ultimate_charge += 10
-        slowprint(f"⚔️  Power Strike hits {target['name']} for {dmg} damage!")
-
-    def ability_shield_bash(self, enemies):
-        target = enemies[0]
-        dmg = self.compute_damage() + 5
-        target['hp'] -= dmg
-        target['stunned'] = 2
-
-        # Shadowknight bonus
-        if self.hybrid_class_name == "Shadowknight" and random.random() < 0.4:
-            target['poison'] = target.get('poison', 0) + 2
-            slowprint("  ☠️ Shadowknight poison applied!")
-
-        self.total_damage_dealt += dmg
-        slowprint(f"🛡️  Shield Bash! {target['name']} stunned for 2 turns!")
-
-    def ability_fireball(self, enemies):
-        target = enemies[0]
-        dmg = self.compute_damage() + 15
-
-        # Trickster: spells can crit
-        if self.hybrid_class_name == "Trickster" and random.random() < 0.25:
-            dmg = int(dmg * 2)
-            slowprint("  ✨ TRICKSTER SPELL CRIT!")
-
-        dmg = apply_elemental_damage(dmg, Element.FIRE, target)
-        target['hp'] -= dmg
-        if random.random() < 0.3:
-            target['burning'] = 3
-        self.total_damage_dealt += dmg
-        self.ultimate_charge += 12
-        slowprint(f"🔥 Fireball burns {target['name']} for {dmg} damage!")
-
-    def ability_ice_barrier(self, enemies):
-        self.heal(20)
-        slowprint("🧊 Ice Barrier restores 20 HP!")
-
-    def ability_backstab(self, enemies):
-        target = enemies[0]
-        multiplier = 2.5
-
-        # Duelist: enhanced crits
-        if self.hybrid_class_name == "Duelist":
-            multiplier = 3.0
-
-        dmg = int(self.compute_damage() * multiplier)
-        target['hp'] -= dmg
-        self.total_damage_dealt += dmg
-        self.ultimate_charge += 15
-        slowprint(f"🗡️  Backstab! {dmg} critical damage!")
-
-    def ability_evasion(self, enemies):
-        self.cheat_flags["dodge_next"] = True
-        slowprint("💨 Evasion activated!")
-
-    def ability_rage_strike(self, enemies):
-        target = enemies[0]
-        dmg = self.compute_damage()
-        if self.hp < self.compute_max_hp()/2:
-            dmg = int(dmg * 1.8)
-        target['hp'] -= dmg
-        self.total_damage_dealt += dmg
-        slowprint(f"😡 Rage Strike! {dmg} damage!")
-
-    def ability_bloodlust(self, enemies):
-        target = enemies[0]
-        dmg = self.compute_damage()
-        heal_amt = int(dmg * 0.3)
-
-        # Ravager: enhanced lifesteal
-        if self.hybrid_class_name == "Ravager":
-            heal_amt = int(dmg * 0.5)
-
-        target['hp'] -= dmg
-        self.heal(heal_amt)
-        self.total_damage_dealt += dmg
-        slowprint(f"🩸 Bloodlust! {dmg} damage, healed {heal_amt} HP!")
-
-    def ability_poison_blade(self, enemies):
-        target = enemies[0]
-        dmg = self.compute_damage()
-        target['hp'] -= dmg
-        target['poison'] = target.get('poison', 0) + 3
-        self.total_damage_dealt += dmg
-        slowprint(f"☠️  Poison Blade! {target['name']} poisoned!")
-
-    def ability_shadow_step(self, enemies):
-        self.cheat_flags["dodge_next"] = True
-        self.cheat_flags["next_attack_boost"] = 1.5
-        slowprint("🌑 Shadow Step! Dodge + damage boost!")
-
-    # Hybrid-specific abilities
-    def ability_arcane_slash(self, enemies):
-        target = enemies[0]
-        dmg = self.compute_damage() * 2
-        elements = [Element.FIRE, Element.ICE, Element.LIGHTNING]
-        element = random.choice(elements)
-        dmg = apply_elemental_damage(dmg, element, target)
-        target['hp'] -= dmg
-        self.total_damage_dealt += dmg
-        slowprint(f"⚔️✨ Arcane Slash! {dmg} {element.value} damage!")
-
-    def ability_blood_sacrifice(self, enemies):
-        if self.hp > 30:
-            sacrifice = int(self.hp * 0.3)
-            self.hp -= sacrifice
-            target = enemies[0]
-            dmg = self.compute_damage() + (sacrifice * 2)
-            target['hp'] -= dmg
-            self.total_damage_dealt += dmg
-            slowprint(f"🩸 Blood Sacrifice! {sacrifice} HP → {dmg} damage!")
-
-    def ability_assassinate(self, enemies):
-        target = enemies[0]
-        dmg = int(self.compute_damage() * 4)
-        if random.random() < 0.2:
-            dmg = target['hp']  # Instant kill
-            slowprint("  💀 INSTANT KILL!")
-        target['hp'] -= dmg
-        self.total_damage_dealt += dmg
-        slowprint(f"🗡️💀 Assassinate! {dmg} damage!")
-
-    def ability_harvest(self, enemies):
-        target = enemies[0]
-        dmg = self.compute_damage() * 2
-        target['hp'] -= dmg
-        self.total_damage_dealt += dmg
-        if target['hp'] <= 0:
-            self.berserk_mode = True
-            slowprint(f"💀 Harvest! {dmg} damage - BERSERK MODE ACTIVATED!")
-        else:
-            slowprint(f"💀 Harvest! {dmg} damage!")
-
-    # New class abilities
-    def ability_holy_strike(self, enemies):
-        target = enemies[0]
-        dmg = self.compute_damage() + 10
-        dmg = apply_elemental_damage(dmg, Element.HOLY, target)
-        target['hp'] -= dmg
-        self.heal(5)
-        self.total_damage_dealt += dmg
-        slowprint(f"✨ Holy Strike! {dmg} damage + healed 5 HP!")
-
-    def ability_divine_heal(self, enemies):
-        heal_amt = int(self.compute_max_hp() * 0.4)
-        self.heal(heal_amt)
-        slowprint(f"🙏 Divine Heal! Restored {heal_amt} HP!")
-
-    def ability_death_bolt(self, enemies):
-        target = enemies[0]
-        dmg = self.compute_damage() + 12
-        dmg = apply_elemental_damage(dmg, Element.DARK, target)
-        target['hp'] -= dmg
-        self.total_damage_dealt += dmg
-        if random.random() < 0.3:
-            target['hp'] -= 10
-            slowprint(f"💀 Death Bolt! {dmg} damage + 10 curse damage!")
-        else:
-            slowprint(f"💀 Death Bolt! {dmg} damage!")
-
-    def ability_raise_undead(self, enemies):
-        slowprint("💀 Raised a skeleton minion! (Companion for 5 turns)")
-        # Simplified - just heal player for now
-        self.heal(20)
-
-    def ability_chi_strike(self, enemies):
-        target = enemies[0]
-        dmg = self.compute_damage()
-        for i in range(3):
-            target['hp'] -= dmg // 3
-            slowprint(f"👊 Chi Strike {i+1}! {dmg // 3} damage!")
-        self.total_damage_dealt += dmg
-
-    def ability_inner_peace(self, enemies):
-        self.heal(25)
-        self.ultimate_charge += 20
-        slowprint("🧘 Inner Peace! +25 HP and +20 ultimate charge!")
-
-    def ability_multishot(self, enemies):
-        dmg = self.compute_damage()
-        targets = enemies[:2]
-        for target in targets:
-            if target['hp'] > 0:
-                target['hp'] -= dmg
-                slowprint(f"🏹 Multi-Shot hits {target['name']} for {dmg}!")
-        self.total_damage_dealt += dmg * len(targets)
-
-    def ability_natures_call(self, enemies):
-        target = enemies[0]
-        dmg = self.compute_damage()
-        target['hp'] -= dmg
-        self.heal(15)
-        slowprint(f"🐺 Nature's Call! {dmg} damage + 15 HP healed!")
-
-    def ability_bear_form(self, enemies):
-        self.active_buffs['bear_form'] = 3
-        self.defense += 10
-        slowprint("🐻 Bear Form! +10 defense for 3 turns!")
-
-    def ability_rejuvenation(self, enemies):
-        self.active_buffs['rejuvenation'] = 3
-        slowprint("🌿 Rejuvenation! Healing 15 HP per turn for 3 turns!")
-
-    def ability_iaijutsu(self, enemies):
-        target = enemies[0]
-        dmg = int(self.compute_damage() * 2.2)
-        target['hp'] -= dmg
-        self.total_damage_dealt += dmg
-        slowprint(f"⚔️ Iaijutsu! Swift {dmg} damage!")
-
-    def ability_perfect_parry(self, enemies):
-        self.active_buffs['perfect_parry'] = 2
-        slowprint("🛡️ Perfect Parry stance! Next 2 attacks countered!")
-
-    def ability_eldritch_blast(self, enemies):
-        target = enemies[0]
-        dmg = self.compute_damage() + 8
-        dmg = apply_elemental_damage(dmg, Element.DARK, target)
-        target['hp'] -= dmg
-        self.total_damage_dealt += dmg
-        slowprint(f"👁️ Eldritch Blast! {dmg} dark damage!")
-
-    def ability_life_tap(self, enemies):
-        if self.hp > 20:
-            sacrifice = 20
-            self.hp -= sacrifice
-            target = enemies[0]
-            dmg = self.compute_damage() + 30
-            target['hp'] -= dmg
-            self.total_damage_dealt += dmg
-            slowprint(f"🩸 Life Tap! Sacrificed {sacrifice} HP for {dmg} damage!")
+        self.bind_profile()
+        self.abilities = {
+            a.name: {"cooldown": a.cooldown, "desc": a.desc, "spec": a.spec}
+            for a in self.profile.abilities
+        }
 
 def get_current_weather():
-    return random.choice(list(Weather))
+    return get_game_context().weather.choice(list(Weather))
+
+# (weather, element) -> (damage multiplier, message)
+WEATHER_EFFECTS = {
+    (Weather.RAIN, Element.FIRE): (0.7, "  🌧️  Rain weakens fire!"),
+    (Weather.RAIN, Element.LIGHTNING): (1.3, "  ⚡ Storm amplifies lightning!"),
+    (Weather.STORM, Element.LIGHTNING): (1.5, "  ⚡ Storm empowers lightning!"),
+    (Weather.SNOW, Element.ICE): (1.3, "  ❄️  Snow strengthens ice!"),
+    (Weather.HEAT, Element.FIRE): (1.4, "  🔥 Heat empowers fire!"),
+    (Weather.HEAT, Element.ICE): (0.6, "  ❄️  Heat weakens ice!"),
+}
+
+WEAKNESS_MULTIPLIER = 1.5
+RESISTANCE_MULTIPLIER = 0.5
 
 def apply_weather_effects(weather, damage, element):
     """Weather affects elemental damage"""
-    if weather == Weather.RAIN:
-        if element == Element.FIRE:
-            damage = int(damage * 0.7)
-            slowprint("  🌧️  Rain weakens fire!")
-        elif element == Element.LIGHTNING:
-            damage = int(damage * 1.3)
-            slowprint("  ⚡ Storm amplifies lightning!")
-    elif weather == Weather.STORM:
-        if element == Element.LIGHTNING:
-            damage = int(damage * 1.5)
-            slowprint("  ⚡ Storm empowers lightning!")
-    elif weather == Weather.SNOW:
-        if element == Element.ICE:
-            damage = int(damage * 1.3)
-            slowprint("  ❄️  Snow strengthens ice!")
-    elif weather == Weather.HEAT:
-        if element == Element.FIRE:
-            damage = int(damage * 1.4)
-            slowprint("  🔥 Heat empowers fire!")
-        elif element == Element.ICE:
-            damage = int(damage * 0.6)
-            slowprint("  ❄️  Heat weakens ice!")
+    effect = WEATHER_EFFECTS.get((weather, element))
+    if effect:
+        damage = int(damage * effect[0])
+        slowprint(effect[1])
     return damage
 
 def apply_elemental_damage(base_dmg, element, enemy):
-    weakness = enemy.get('weakness', None)
-    resistance = enemy.get('resistance', None)
+    weakness = enemy.weakness
+    resistance = enemy.resistance
 
     if element == weakness:
-        base_dmg = int(base_dmg * 1.5)
-        slowprint(f"  💥 SUPER EFFECTIVE! ({element.value})")
+        base_dmg = int(base_dmg * WEAKNESS_MULTIPLIER)
+        slowprint(lambda: f"  💥 SUPER EFFECTIVE! ({element.value})")
     elif element == resistance:
-        base_dmg = int(base_dmg * 0.5)
-        slowprint(f"  🛡️  Resisted! ({element.value})")
+        base_dmg = int(base_dmg * RESISTANCE_MULTIPLIER)
+        slowprint(lambda: f"  🛡️  Resisted! ({element.value})")
 
     return base_dmg
 
-def check_critical_hit(player):
+def elemental_multiplier(element, enemy):
+    """The multiplier apply_elemental_damage() would use, without rounding"""
+    if element is None:
+        return 1.0
+    if element == enemy.weakness:
+        return WEAKNESS_MULTIPLIER
+    if element == enemy.resistance:
+        return RESISTANCE_MULTIPLIER
+    return 1.0
+
+def critical_chance(player):
     crit_chance = 0.10
     if player.weapon:
         crit_chance = player.weapon.crit_chance
@@ -1426,51 +2488,46 @@ def check_critical_hit(player):
     crit_chance += player.prestige_bonuses.get('crit_bonus', 0) / 100.0
 
     # Skill tree bonus
-    crit_chance += get_skill_bonus(player, "Lucky Strike") / 100.0
-
-    # Duelist bonus
-    if player.hybrid_class_name == "Duelist":
-        crit_chance += 0.10
+    crit_chance += player.skill_bonus.lucky_strike / 100.0
 
-    # Ravager bonus
-    if player.hybrid_class_name == "Ravager":
-        crit_chance += 0.15
-
-    # Nightblade bonus
-    if player.hybrid_class_name == "Nightblade":
-        crit_chance += 0.20
+    # Duelist, Ravager and Nightblade bonus
+    crit_chance += player.profile.crit_bonus
 
     crit_chance += player.get_luck_bonus()
+    return crit_chance
 
-    if random.random() < crit_chance:
+def check_critical_hit(player):
+    if get_game_context().combat.random() < critical_chance(player):
         player.critical_hits += 1
         return True
     return False
 
-def check_parry(player):
+def parry_chance(player):
     """Chance to parry an attack"""
-    parry_chance = 0.15 if player.stance == Stance.COUNTER else 0.05
+    chance = 0.15 if player.stance == Stance.COUNTER else 0.05
 
     # Nightblade enhanced evasion
-    if player.hybrid_class_name == "Nightblade":
-        parry_chance += 0.15
+    chance += player.profile.parry_bonus
+    return chance
 
-    if random.random() < parry_chance:
+def check_parry(player):
+    if get_game_context().combat.random() < parry_chance(player):
         player.perfect_parries += 1
         return True
     return False
 
 def capture_soul(player, enemy_name, enemy_element):
     """Capture soul from defeated enemy"""
-    if random.random() < 0.3 + player.get_luck_bonus():
-        power = random.randint(5, 15)
+    loot = get_game_context().loot
+    if loot.random() < 0.3 + player.get_luck_bonus():
+        power = loot.randint(5, 15)
         soul = Soul(enemy_name, power, enemy_element, "")
         player.souls.append(soul)
         player.materials["Soul Fragment"] = player.materials.get("Soul Fragment", 0) + 1
-        slowprint(f"✨ Captured {enemy_name}'s soul! (Power: {power})")
+        slowprint(lambda: f"✨ Captured {enemy_name}'s soul! (Power: {power})")
 
-def sacrifice_system(player):
-    """Sacrifice HP for power"""
+def show_sacrifice_menu(player):
+    """Render the blood sacrifice options"""
     slowprint("\n╔══════════ BLOOD SACRIFICE ══════════╗")
     slowprint(f"  Current HP: {player.hp}/{player.compute_max_hp()}")
     slowprint("  Sacrifice HP for temporary power:")
@@ -1484,21 +2541,22 @@ def sacrifice_system(player):
     slowprint("  4) Back")
     slowprint("╚═════════════════════════════════════╝")
 
-    choice = input("> ").strip()
+def sacrifice_system(player, choice):
+    """Sacrifice HP for power"""
     if choice == "1" and player.hp > 20:
         player.hp -= 20
-        player.active_buffs["damage_buff"] = 3
+        player.status_engine.add_buff("damage_buff", 3)
         player.sacrifices_made += 1
         slowprint("🩸 Sacrificed 20 HP! Damage increased!")
     elif choice == "2" and player.hp > 50:
         player.hp -= 50
-        player.active_buffs["damage_buff"] = 5
+        player.status_engine.add_buff("damage_buff", 5)
         player.base_damage += 15
         player.sacrifices_made += 1
         slowprint("🩸 Sacrificed 50 HP! Massive damage boost!")
     elif choice == "3" and player.hybrid_class_name == "Blood Mage" and player.hp > 30:
         player.hp -= 30
-        player.active_buffs["damage_buff"] = 4
+        player.status_engine.add_buff("damage_buff", 4)
         player.base_damage += 20
         player.sacrifices_made += 1
         slowprint("🩸💀 BLOOD MAGE SACRIFICE! Damage + Lifesteal!")
@@ -1533,7 +2591,7 @@ def blacksmith_menu(player):
         slowprint("  5) Back")
         slowprint("╚══════════════════════════════════╝")
 
-        choice = input("> ").strip()
+        choice = prompt("> ").strip()
 
         if choice == "1" and player.gold >= 100 and player.weapon:
             player.gold -= 100
@@ -1541,7 +2599,7 @@ def blacksmith_menu(player):
             slowprint(f"🔨 Weapon upgraded! Now deals {player.weapon.damage} damage!")
         elif choice == "2" and player.gold >= 80:
             if player.equipped_armor:
-                slot = random.choice(list(player.equipped_armor.keys()))
+                slot = get_game_context().loot.choice(list(player.equipped_armor.keys()))
                 player.gold -= 80
                 player.equipped_armor[slot].defense += 3
                 slowprint(f"🔨 {player.equipped_armor[slot].name} upgraded!")
@@ -1550,66 +2608,56 @@ def blacksmith_menu(player):
         elif choice == "5":
             break
 
+@dataclass(frozen=True)
+class EnchantOffer:
+    """One enchantment the blacksmith sells"""
+    enchantment: str     # key into ENCHANTMENTS
+    effect: str
+    materials: Dict[str, int]
+    cost: str            # how the menu spells out the materials
+    gold: int
+    message: str
+
+ENCHANT_SHOP = (
+    EnchantOffer("Fire", "+5 fire dmg", {"Dragon Scale": 1}, "1 Dragon Scale", 150,
+                 "🔥 Weapon enchanted with Fire!"),
+    EnchantOffer("Ice", "+5 ice dmg", {"Frost Crystal": 2}, "2 Frost Crystals", 150,
+                 "❄️  Weapon enchanted with Ice!"),
+    EnchantOffer("Lightning", "+7 lightning", {"Lightning Shard": 2}, "2 Lightning Shards", 150,
+                 "⚡ Weapon enchanted with Lightning!"),
+    EnchantOffer("Sharpness", "+10 dmg", {"Iron Ore": 3}, "3 Iron Ore", 150,
+                 "✨ Weapon enchanted with Sharpness!"),
+    EnchantOffer("Holy", "+6 holy dmg", {"Holy Water": 1}, "1 Holy Water", 150,
+                 "✨ Weapon enchanted with Holy!"),
+    EnchantOffer("Dark", "+6 dark dmg", {"Dark Essence": 1}, "1 Dark Essence", 150,
+                 "💀 Weapon enchanted with Dark!"),
+    EnchantOffer("Lifesteal", "15% heal", {"Soul Fragment": 2}, "2 Soul Fragments", 150,
+                 "🩸 Weapon enchanted with Lifesteal!"),
+    EnchantOffer("Vorpal", "+12 dmg, +5% crit", {"Dragon Scale": 1, "Enchant Scroll": 1},
+                 "1 Dragon Scale + 1 Enchant Scroll", 200, "⚔️ Weapon enchanted with Vorpal!"),
+)
+
 def enchant_weapon(player):
     if not player.weapon:
         slowprint("No weapon equipped!")
         return
 
     slowprint("\n╔════════════ ENCHANTMENTS ════════════╗")
-    slowprint("  1) Fire (+5 fire dmg) - 1 Dragon Scale")
-    slowprint("  2) Ice (+5 ice dmg) - 2 Frost Crystals")
-    slowprint("  3) Lightning (+7 lightning) - 2 Lightning Shards")
-    slowprint("  4) Sharpness (+10 dmg) - 3 Iron Ore")
-    slowprint("  5) Holy (+6 holy dmg) - 1 Holy Water")
-    slowprint("  6) Dark (+6 dark dmg) - 1 Dark Essence")
-    slowprint("  7) Lifesteal (15% heal) - 2 Soul Fragments")
-    slowprint("  8) Vorpal (+12 dmg, +5% crit) - 1 Dragon Scale + 1 Enchant Scroll")
-    slowprint("  9) Back")
+    for i, offer in enumerate(ENCHANT_SHOP, 1):
+        slowprint(f"  {i}) {offer.enchantment} ({offer.effect}) - {offer.cost}")
+    slowprint(f"  {len(ENCHANT_SHOP) + 1}) Back")
     slowprint("╚══════════════════════════════════════╝")
 
-    choice = input("> ").strip()
-
-    if choice == "1" and player.materials.get("Dragon Scale", 0) >= 1:
-        player.materials["Dragon Scale"] -= 1
-        player.gold -= 150
-        player.weapon.enchantment = "Fire"
-        slowprint("🔥 Weapon enchanted with Fire!")
-    elif choice == "2" and player.materials.get("Frost Crystal", 0) >= 2:
-        player.materials["Frost Crystal"] -= 2
-        player.gold -= 150
-        player.weapon.enchantment = "Ice"
-        slowprint("❄️  Weapon enchanted with Ice!")
-    elif choice == "3" and player.materials.get("Lightning Shard", 0) >= 2:
-        player.materials["Lightning Shard"] -= 2
-        player.gold -= 150
-        player.weapon.enchantment = "Lightning"
-        slowprint("⚡ Weapon enchanted with Lightning!")
-    elif choice == "4" and player.materials.get("Iron Ore", 0) >= 3:
-        player.materials["Iron Ore"] -= 3
-        player.gold -= 150
-        player.weapon.enchantment = "Sharpness"
-        slowprint("✨ Weapon enchanted with Sharpness!")
-    elif choice == "5" and player.materials.get("Holy Water", 0) >= 1:
-        player.materials["Holy Water"] -= 1
-        player.gold -= 150
-        player.weapon.enchantment = "Holy"
-        slowprint("✨ Weapon enchanted with Holy!")
-    elif choice == "6" and player.materials.get("Dark Essence", 0) >= 1:
-        player.materials["Dark Essence"] -= 1
-        player.gold -= 150
-        player.weapon.enchantment = "Dark"
-        slowprint("💀 Weapon enchanted with Dark!")
-    elif choice == "7" and player.materials.get("Soul Fragment", 0) >= 2:
-        player.materials["Soul Fragment"] -= 2
-        player.gold -= 150
-        player.weapon.enchantment = "Lifesteal"
-        slowprint("🩸 Weapon enchanted with Lifesteal!")
-    elif choice == "8" and player.materials.get("Dragon Scale", 0) >= 1 and player.materials.get("Enchant Scroll", 0) >= 1:
-        player.materials["Dragon Scale"] -= 1
-        player.materials["Enchant Scroll"] -= 1
-        player.gold -= 200
-        player.weapon.enchantment = "Vorpal"
-        slowprint("⚔️ Weapon enchanted with Vorpal!")
+    choice = prompt("> ").strip()
+    if not choice.isdigit() or not 1 <= int(choice) <= len(ENCHANT_SHOP):
+        return
+    offer = ENCHANT_SHOP[int(choice) - 1]
+    if all(player.materials.get(name, 0) >= count for name, count in offer.materials.items()):
+        for name, count in offer.materials.items():
+            player.materials[name] -= count
+        player.gold -= offer.gold
+        player.weapon.enchantment = offer.enchantment
+        slowprint(offer.message)
 
 def potion_shop(player):
     while True:
@@ -1622,7 +2670,7 @@ def potion_shop(player):
         slowprint("  6) Back")
         slowprint("╚══════════════════════════════════╝")
 
-        choice = input("> ").strip()
+        choice = prompt("> ").strip()
 
         if choice == "1" and player.gold >= 5:
             player.gold -= 5
@@ -1656,7 +2704,7 @@ def weapon_shop(player):
     slowprint(f"  {len(weapons_for_sale)+1}) Back")
     slowprint("╚════════════════════════════════╝")
 
-    choice = input("> ").strip()
+    choice = prompt("> ").strip()
     if choice.isdigit():
         idx = int(choice) - 1
         if 0 <= idx < len(weapons_for_sale):
@@ -1677,25 +2725,20 @@ def multiclass_trainer(player):
     slowprint(f"  Current Class: {player.class_name}")
     slowprint(f"  Cost: 500 gold")
     slowprint(f"  Your Gold: {player.gold}")
-    slowprint("\n  Choose Secondary Class:")
+    slowprint(f"\n  Choose Secondary Class:  (expected fight vs {FORECAST_BOSS.name})")
 
-    classes = ["Warrior", "Mage", "Rogue", "Berserker", "Assassin", "Paladin",
-               "Necromancer", "Monk", "Ranger", "Druid", "Samurai", "Warlock"]
-    classes = [c for c in classes if c != player.class_name]
+    classes = [c for c in CLASS_NAMES if c != player.class_name]
 
     for i, class_name in enumerate(classes, 1):
-        # Show potential hybrid
-        key1 = (player.class_name, class_name)
-        key2 = (class_name, player.class_name)
-        hybrid = HYBRID_CLASSES.get(key1) or HYBRID_CLASSES.get(key2)
-        if hybrid:
-            slowprint(f"  {i:2}) {class_name:<15} → {hybrid['name']}")
-        else:
-            slowprint(f"  {i:2}) {class_name}")
+        # Show potential hybrid and how the build would fare
+        profile = CLASS_REGISTRY.get(player.class_name, class_name)
+        label = f"{class_name:<15} → {profile.hybrid_name}" if profile.hybrid_name else class_name
+        preview = forecast(player, FORECAST_BOSS, profile=profile).summary()
+        slowprint(f"  {i:2}) {label:<34} {preview}")
     slowprint(f"  {len(classes)+1}) Back")
     slowprint("╚═══════════════════════════════════╝")
 
-    choice = input("> ").strip()
+    choice = prompt("> ").strip()
     if choice.isdigit():
         idx = int(choice) - 1
         if 0 <= idx < len(classes):
@@ -1705,79 +2748,107 @@ def multiclass_trainer(player):
             else:
                 slowprint("Not enough gold!")
 
+# Gambling den stakes and payouts. A payout is the gold handed back after the
+# bet is taken, so a push returns the bet and a loss pays 0. odds.py reads
+# these to work out each game's expected value and house edge.
+DICE_BET = 10
+DICE_WIN = 25
+CARD_BET = 20
+CARD_WIN = 80
+CARD_SUITS = ("♠️", "♥️", "♦️", "♣️")
+SLOTS_BET = 50
+SLOT_SYMBOLS = ("🍒", "🍋", "⭐", "💎", "7️⃣")
+SLOTS_JACKPOTS = {"7️⃣": 500, "💎": 300}   # three of these symbols
+SLOTS_TRIPLE = 150                        # three of any other symbol
+SLOTS_PAIR = 75                           # first two or last two reels match
+
+def dice_payout(player_roll, dealer_roll):
+    if player_roll > dealer_roll:
+        return DICE_WIN
+    if player_roll == dealer_roll:
+        return DICE_BET
+    return 0
+
+def card_payout(guess, actual):
+    return CARD_WIN if guess == actual else 0
+
+def slots_payout(reels):
+    first, second, third = reels
+    if first == second == third:
+        return SLOTS_JACKPOTS.get(first, SLOTS_TRIPLE)
+    if first == second or second == third:
+        return SLOTS_PAIR
+    return 0
+
 def gambling_den(player):
     slowprint("\n╔══════════ GAMBLING DEN ═══════════╗")
     slowprint(f"  Gold: {player.gold}")
-    slowprint("  1) Dice Game (Bet: 10g)")
-    slowprint("  2) Card Flip (Bet: 20g)")
-    slowprint("  3) Slots (Bet: 50g)")
+    slowprint(f"  1) Dice Game (Bet: {DICE_BET}g)")
+    slowprint(f"  2) Card Flip (Bet: {CARD_BET}g)")
+    slowprint(f"  3) Slots (Bet: {SLOTS_BET}g)")
     slowprint("  4) Back")
     slowprint("╚═══════════════════════════════════╝")
 
-    choice = input("> ").strip()
+    choice = prompt("> ").strip()
 
-    if choice == "1" and player.gold >= 10:
+    if choice == "1" and player.gold >= DICE_BET:
         dice_game(player)
-    elif choice == "2" and player.gold >= 20:
+    elif choice == "2" and player.gold >= CARD_BET:
         card_flip(player)
-    elif choice == "3" and player.gold >= 50:
+    elif choice == "3" and player.gold >= SLOTS_BET:
         slots(player)
 
 def dice_game(player):
-    player.gold -= 10
-    player_roll = random.randint(1, 6) + random.randint(1, 6)
-    dealer_roll = random.randint(1, 6) + random.randint(1, 6)
+    player.gold -= DICE_BET
+    dice = get_game_context().gambling
+    player_roll = dice.randint(1, 6) + dice.randint(1, 6)
+    dealer_roll = dice.randint(1, 6) + dice.randint(1, 6)
 
     slowprint(f"🎲 You rolled: {player_roll}")
     slowprint(f"🎲 Dealer rolled: {dealer_roll}")
 
+    winnings = dice_payout(player_roll, dealer_roll)
+    player.gold += winnings
     if player_roll > dealer_roll:
-        winnings = 25
-        player.gold += winnings
         slowprint(f"🎉 You win {winnings} gold!")
     elif player_roll == dealer_roll:
         slowprint("Push! Bet returned.")
-        player.gold += 10
     else:
         slowprint("😔 You lose!")
 
 def card_flip(player):
-    player.gold -= 20
-    cards = ["♠️", "♥️", "♦️", "♣️"]
-    guess = random.choice(cards)
-    actual = random.choice(cards)
+    player.gold -= CARD_BET
+    deck = get_game_context().gambling
+    guess = deck.choice(CARD_SUITS)
+    actual = deck.choice(CARD_SUITS)
 
     slowprint(f"Guess: {guess}")
     slowprint(f"Actual: {actual}")
 
-    if guess == actual:
-        winnings = 80
-        player.gold += winnings
+    winnings = card_payout(guess, actual)
+    player.gold += winnings
+    if winnings:
         slowprint(f"🎊 JACKPOT! Won {winnings} gold!")
     else:
         slowprint("😔 Wrong suit!")
 
 def slots(player):
-    player.gold -= 50
-    symbols = ["🍒", "🍋", "⭐", "💎", "7️⃣"]
-    result = [random.choice(symbols) for _ in range(3)]
+    player.gold -= SLOTS_BET
+    reels = get_game_context().gambling
+    result = [reels.choice(SLOT_SYMBOLS) for _ in range(3)]
 
     slowprint(f"🎰 {result[0]} | {result[1]} | {result[2]}")
 
+    winnings = slots_payout(result)
+    player.gold += winnings
     if result[0] == result[1] == result[2]:
         if result[0] == "7️⃣":
-            winnings = 500
             slowprint(f"🎊 MEGA JACKPOT! Won {winnings} gold!")
         elif result[0] == "💎":
-            winnings = 300
             slowprint(f"💎 Diamond win! {winnings} gold!")
         else:
-            winnings = 150
             slowprint(f"🎉 Three of a kind! {winnings} gold!")
-        player.gold += winnings
-    elif result[0] == result[1] or result[1] == result[2]:
-        winnings = 75
-        player.gold += winnings
+    elif winnings:
         slowprint(f"Two match! Won {winnings} gold!")
     else:
         slowprint("😔 No match!")
@@ -1793,30 +2864,10 @@ def init_achievements(player):
         Achievement("ach_hybrid", "Hybrid Warrior", "Unlock hybrid class", "hybrid", 1, False, "100 gold"),
     ]
     player.achievements = achievements
+    player.progress.rebuild()
 
 def check_achievements(player):
-    total_kills = sum(player.kills.values())
-
-    for ach in player.achievements:
-        if not ach.unlocked:
-            if ach.requirement_type == "total_kills" and total_kills >= ach.requirement_value:
-                ach.unlocked = True
-                slowprint(f"\n🏆 ACHIEVEMENT UNLOCKED: {ach.name}!")
-                slowprint(f"   {ach.description}")
-                slowprint(f"   Reward: {ach.reward}")
-                if "gold" in ach.reward:
-                    amount = int(ach.reward.split()[0])
-                    player.gold += amount
-            elif ach.requirement_type == "bosses" and player.bosses_defeated >= ach.requirement_value:
-                ach.unlocked = True
-                slowprint(f"\n🏆 ACHIEVEMENT: {ach.name}!")
-            elif ach.requirement_type == "crits" and player.critical_hits >= ach.requirement_value:
-                ach.unlocked = True
-                slowprint(f"\n🏆 ACHIEVEMENT: {ach.name}!")
-            elif ach.requirement_type == "hybrid" and player.hybrid_class_name:
-                ach.unlocked = True
-                slowprint(f"\n🏆 ACHIEVEMENT: {ach.name}!")
-                player.gold += 100
+    player.progress.check()
 
 def bounty_board(player):
     if not player.bounties:
@@ -1827,7 +2878,7 @@ def bounty_board(player):
         status = "✓" if bounty.completed else " "
         slowprint(f"  [{status}] {i}) {bounty.target} - {bounty.reward}g ({bounty.difficulty})")
     slowprint("╚═══════════════════════════════════╝")
-    input("Press Enter...")
+    prompt("Press Enter...")
 
 def init_bounties(player):
     bounties = [
@@ -1836,81 +2887,18 @@ def init_bounties(player):
         Bounty("Shadow Assassin", 300, "Medium", False),
     ]
     player.bounties = bounties
+    player.progress.rebuild()
 
 def check_bounty_completion(player, enemy_name):
-    for bounty in player.bounties:
-        if bounty.target == enemy_name and not bounty.completed:
-            bounty.completed = True
-            player.gold += bounty.reward
-            slowprint(f"\n💰 BOUNTY COMPLETED! Earned {bounty.reward} gold!")
+    player.progress.update(counter_key("kill", enemy_name))
+
+def accept_quest(player, quest):
+    player.active_quests.append(quest)
+    player.progress.add_quest(quest)
 
 def talent_menu(player):
     """Enhanced skill tree with multiple levels per skill"""
 
-    # Define all available skills with max levels
-    SKILL_TREE = {
-        "Whirlwind Strike": {
-            "max_level": 5,
-            "base_cost": 1,
-            "desc": "AOE attack hitting all enemies",
-            "scaling": lambda lvl: f"Damage: {100 + (lvl * 20)}% | Targets: All"
-        },
-        "Life Drain": {
-            "max_level": 5,
-            "base_cost": 1,
-            "desc": "Heal based on damage dealt",
-            "scaling": lambda lvl: f"Lifesteal: {10 + (lvl * 5)}%"
-        },
-        "Berserker Rage": {
-            "max_level": 3,
-            "base_cost": 2,
-            "desc": "Boost damage when low HP",
-            "scaling": lambda lvl: f"Damage: +{20 + (lvl * 15)}% when HP < 50%"
-        },
-        "Shadow Clone": {
-            "max_level": 3,
-            "base_cost": 2,
-            "desc": "Summon a copy to fight",
-            "scaling": lambda lvl: f"Clone Power: {30 + (lvl * 20)}% | Duration: {lvl + 2} turns"
-        },
-        "Iron Skin": {
-            "max_level": 5,
-            "base_cost": 1,
-            "desc": "Permanent defense boost",
-            "scaling": lambda lvl: f"Defense: +{2 + (lvl * 2)}"
-        },
-        "Swift Strike": {
-            "max_level": 5,
-            "base_cost": 1,
-            "desc": "Reduce ability cooldowns",
-            "scaling": lambda lvl: f"Cooldown: -{5 + (lvl * 5)}%"
-        },
-        "Elemental Mastery": {
-            "max_level": 3,
-            "base_cost": 2,
-            "desc": "Boost elemental damage",
-            "scaling": lambda lvl: f"Elemental Damage: +{15 + (lvl * 10)}%"
-        },
-        "Battle Trance": {
-            "max_level": 4,
-            "base_cost": 1,
-            "desc": "Gain HP per kill",
-            "scaling": lambda lvl: f"HP per kill: {10 + (lvl * 8)}"
-        },
-        "Lucky Strike": {
-            "max_level": 5,
-            "base_cost": 1,
-            "desc": "Increase critical hit chance",
-            "scaling": lambda lvl: f"Crit Chance: +{3 + (lvl * 2)}%"
-        },
-        "Titan's Endurance": {
-            "max_level": 5,
-            "base_cost": 1,
-            "desc": "Permanent HP boost",
-            "scaling": lambda lvl: f"Max HP: +{15 + (lvl * 10)}"
-        }
-    }
-
     while True:
         slowprint(f"\n╔{'═'*60}╗")
         slowprint(f"║{'SKILL TREE':^60}║")
@@ -1918,10 +2906,10 @@ def talent_menu(player):
         slowprint(f"╠{'═'*60}╣")
 
         skills_list = list(SKILL_TREE.items())
-        for i, (skill_name, skill_info) in enumerate(skills_list, 1):
+        for i, (skill_name, skill) in enumerate(skills_list, 1):
             current_level = player.skill_levels.get(skill_name, 0)
-            max_level = skill_info["max_level"]
-            cost = skill_info["base_cost"]
+            max_level = skill.max_level
+            cost = skill.base_cost
 
             # Show level progress
             level_bar = "█" * current_level + "░" * (max_level - current_level)
@@ -1930,14 +2918,14 @@ def talent_menu(player):
             # Show current and next level stats
             if current_level < max_level:
                 next_level = current_level + 1
-                scaling_text = skill_info["scaling"](next_level)
+                scaling_text = skill.scaling(next_level)
                 cost_text = f"Cost: {cost}"
                 slowprint(f"║ {i:2}) {skill_name:<20} {status:<15} {cost_text:<10}║")
-                slowprint(f"║     {skill_info['desc']:<55}║")
+                slowprint(f"║     {skill.desc:<55}║")
                 slowprint(f"║     Next: {scaling_text:<50}║")
             else:
                 slowprint(f"║ {i:2}) {skill_name:<20} {status:<15} ✓ MAXED    ║")
-                scaling_text = skill_info["scaling"](current_level)
+                scaling_text = skill.scaling(current_level)
                 slowprint(f"║     {scaling_text:<55}║")
 
             slowprint(f"╠{'─'*60}╣")
@@ -1946,34 +2934,33 @@ def talent_menu(player):
         slowprint(f"║ {len(skills_list)+2:2}) Save Points & Exit                                       ║")
         slowprint(f"╚{'═'*60}╝")
 
-        choice = input("> ").strip()
+        choice = prompt("> ").strip()
 
         if choice == str(len(skills_list)+1):
-            show_skill_stats(player, SKILL_TREE)
+            show_skill_stats(player)
             continue
         elif choice == str(len(skills_list)+2):
             break
         elif choice.isdigit():
             idx = int(choice) - 1
             if 0 <= idx < len(skills_list):
-                skill_name = skills_list[idx][0]
-                skill_info = skills_list[idx][1]
+                skill_name, skill = skills_list[idx]
                 current_level = player.skill_levels.get(skill_name, 0)
 
-                if current_level >= skill_info["max_level"]:
+                if current_level >= skill.max_level:
                     slowprint(f"❌ {skill_name} is already maxed!")
-                    input("Press Enter...")
-                elif player.skill_points >= skill_info["base_cost"]:
-                    player.skill_points -= skill_info["base_cost"]
-                    player.skill_levels[skill_name] = current_level + 1
+                    prompt("Press Enter...")
+                elif player.skill_points >= skill.base_cost:
+                    player.skill_points -= skill.base_cost
+                    player.set_skill_level(skill_name, current_level + 1)
                     apply_skill_bonus(player, skill_name, player.skill_levels[skill_name])
                     slowprint(f"✨ {skill_name} leveled up to {player.skill_levels[skill_name]}!")
-                    input("Press Enter...")
+                    prompt("Press Enter...")
                 else:
-                    slowprint(f"❌ Not enough skill points! Need {skill_info['base_cost']}")
-                    input("Press Enter...")
+                    slowprint(f"❌ Not enough skill points! Need {skill.base_cost}")
+                    prompt("Press Enter...")
 
-def show_skill_stats(player, skill_tree):
+def show_skill_stats(player):
     """Show all active skill bonuses"""
     slowprint(f"\n╔{'═'*50}╗")
     slowprint(f"║{'ACTIVE SKILL BONUSES':^50}║")
@@ -1984,12 +2971,12 @@ def show_skill_stats(player, skill_tree):
     else:
         for skill_name, level in player.skill_levels.items():
             if level > 0:
-                scaling = skill_tree[skill_name]["scaling"](level)
+                scaling = SKILL_TREE[skill_name].scaling(level)
                 slowprint(f"║ {skill_name:<25} Lv.{level:<2} {'':<20}║")
                 slowprint(f"║   → {scaling:<45}║")
 
     slowprint(f"╚{'═'*50}╝")
-    input("Press Enter...")
+    prompt("Press Enter...")
 
 def apply_skill_bonus(player, skill_name, level):
     """Apply the passive bonuses from skills"""
@@ -2004,27 +2991,6 @@ def apply_skill_bonus(player, skill_name, level):
         pass
     # Other skills are applied when their effects trigger
 
-def get_skill_bonus(player, skill_name):
-    """Get the current bonus from a skill"""
-    level = player.skill_levels.get(skill_name, 0)
-    if level == 0:
-        return 0
-
-    bonuses = {
-        "Whirlwind Strike": 20 * level,  # % damage per level
-        "Life Drain": 5 * level,  # % lifesteal per level
-        "Berserker Rage": 15 * level,  # % damage bonus per level
-        "Shadow Clone": 20 * level,  # % clone power per level
-        "Iron Skin": 2 * level + 2,  # flat defense per level
-        "Swift Strike": 5 * level,  # % cooldown reduction per level
-        "Elemental Mastery": 10 * level,  # % elemental damage per level
-        "Battle Trance": 8 * level,  # HP per kill per level
-        "Lucky Strike": 2 * level,  # % crit chance per level
-        "Titan's Endurance": 10 * level + 15,  # flat HP per level
-    }
-
-    return bonuses.get(skill_name, 0)
-
 def recruit_companion_menu(player):
     available = [c for c in COMPANIONS_POOL if c not in player.companions]
 
@@ -2039,7 +3005,7 @@ def recruit_companion_menu(player):
     slowprint(f"  {len(available)+1}) Back")
     slowprint("╚══════════════════════════════════╝")
 
-    choice = input("> ").strip()
+    choice = prompt("> ").strip()
     if choice.isdigit():
         idx = int(choice) - 1
         if 0 <= idx < len(available):
@@ -2062,10 +3028,748 @@ def manage_party(player):
             slowprint(f"    {i}) {comp.name} ({comp.class_type})")
     slowprint("╚══════════════════════════════════╝")
 
-def battle(player, enemies, battle_count, weather):
-    slowprint(f"\n⚔️  Battle {battle_count} - Weather: {weather.value}")
+# ── COMBAT EVENTS ────────────────────────────────────────────────────────────
+# Hybrid passives, skills, weapon enchantments and legendary weapons hook into a
+# basic attack by subscribing to events. combat_events() compiles the handler
+# lists once per build, so an attack only runs what that build actually has.
+#
+#   before_hit  damage is rolled; handlers may still change hit.dmg
+#   on_hit      the damage has been dealt
+#   on_crit     after on_hit, critical hits only
+#   on_kill     last, when the target died
+
+COMBAT_EVENTS = ("before_hit", "on_hit", "on_crit", "on_kill")
+
+class Hit:
+    """One basic attack, as seen by the event handlers"""
+    __slots__ = ("player", "target", "enemies", "dmg", "element", "crit")
+
+    def __init__(self, player, target, enemies, dmg, element, crit):
+        self.player = player
+        self.target = target
+        self.enemies = enemies
+        self.dmg = dmg
+        self.element = element
+        self.crit = crit
+
+class CombatEvents:
+    """Handler lists for one build, one list per event"""
+    __slots__ = COMBAT_EVENTS
+
+    def __init__(self):
+        for event in COMBAT_EVENTS:
+            setattr(self, event, [])
+
+    def subscribe(self, event, handler):
+        getattr(self, event).append(handler)
+
+def spellblade_edge(hit):
+    if hit.element != Element.PHYSICAL:
+        bonus = int(hit.dmg * 0.2)
+        hit.dmg += bonus
+        slowprint(lambda: f"  ⚔️✨ Spellblade bonus: +{bonus} elemental damage!")
+
+def shadowknight_strike(hit):
+    if get_game_context().combat.random() < 0.3:
+        hit.player.status_engine.afflict(hit.target, "poison", 2)
+        hit.target.stunned = 1
+        slowprint("  ⚔️🌑 Shadowknight: Poison + Stun!")
+
+def hexblade_curse(hit):
+    if get_game_context().combat.random() < 0.4:
+        hit.target.cursed = True
+        slowprint("  🌑 Hexblade curse applied!")
+
+def ravager_lifesteal(hit):
+    heal = int(hit.dmg * 0.3)
+    hit.player.heal(heal)
+    slowprint(lambda: f"  🩸 Ravager lifesteal: +{heal} HP!")
+
+def reaper_harvest(hit):
+    hit.player.berserk_mode = True
+    slowprint("  💀 REAPER HARVEST! Berserk mode extended!")
+
+def life_drain(hit):
+    heal = int(hit.dmg * (hit.player.skill_bonus.life_drain / 100))
+    hit.player.heal(heal)
+    slowprint(lambda: f"  💚 Life Drain: +{heal} HP!")
+
+def battle_trance(hit):
+    trance_bonus = hit.player.skill_bonus.battle_trance
+    hit.player.heal(trance_bonus)
+    slowprint(lambda: f"  ⚔️ Battle Trance: +{trance_bonus} HP!")
+
+def excalibur_heal(hit):
+    heal_amt = int(hit.player.compute_max_hp() * 0.1)
+    hit.player.heal(heal_amt)
+    slowprint(lambda: f"   ⚔️ {hit.player.weapon.name} heals {heal_amt} HP!")
+
+def mjolnir_thunder(hit):
+    for enemy in hit.enemies:
+        if enemy.hp > 0:
+            enemy.stunned = max(enemy.stunned, 1)
+    slowprint("   ⚡ Mjolnir's thunder stuns every enemy!")
+
+def frostmourne_steal(hit):
+    heal = int(hit.dmg * 0.2)
+    hit.player.heal(heal)
+    slowprint(lambda: f"   ❄️ Frostmourne steals {heal} HP!")
+
+def deaths_scythe_reap(hit):
+    if hit.target.hp > 0 and not hit.target.boss and get_game_context().combat.random() < 0.15:
+        hit.player.total_damage_dealt += hit.target.hp
+        hit.target.hp = 0
+        slowprint(lambda: f"   💀 Death's Scythe reaps {hit.target.name}!")
+
+def enchant_lifesteal(fraction):
+    def lifesteal(hit):
+        heal = int(hit.dmg * fraction)
+        hit.player.heal(heal)
+        slowprint(lambda: f"  🩸 {hit.player.weapon.enchantment}: +{heal} HP!")
+    return lifesteal
+
+# Keyed by skill name; subscribed only once the skill has a level
+SKILL_EVENTS = {
+    "Life Drain": (("on_hit", life_drain),),
+    "Battle Trance": (("on_kill", battle_trance),),
+}
+
+# Keyed by legendary weapon name
+LEGENDARY_EVENTS = {
+    "Excalibur": (("on_kill", excalibur_heal),),
+    "Mjolnir": (("on_crit", mjolnir_thunder),),
+    "Frostmourne": (("on_hit", frostmourne_steal),),
+    "Death's Scythe": (("on_hit", deaths_scythe_reap),),
+}
+
+HYBRID_EVENTS = {
+    "Spellblade": (("before_hit", spellblade_edge),),
+    "Shadowknight": (("before_hit", shadowknight_strike),),
+    "Hexblade": (("before_hit", hexblade_curse),),
+    "Ravager": (("on_crit", ravager_lifesteal),),
+    "Reaper": (("on_kill", reaper_harvest),),
+}
+
+def compile_combat_events(hybrid_name, legendary, enchantment, skills):
+    """Subscribe skills, then weapon effects, then the hybrid passive"""
+    events = CombatEvents()
+    subscriptions = [sub for skill in skills for sub in SKILL_EVENTS[skill]]
+    subscriptions += LEGENDARY_EVENTS.get(legendary, ())
+    lifesteal = ENCHANTMENTS.get(enchantment, {}).get("lifesteal")
+    if lifesteal:
+        subscriptions.append(("on_hit", enchant_lifesteal(lifesteal)))
+    subscriptions += HYBRID_EVENTS.get(hybrid_name, ())
+    for event, handler in subscriptions:
+        events.subscribe(event, handler)
+    return events
+
+_combat_events = {}
+
+def combat_events(player):
+    """Compiled handlers for the player's current build; rebuilt when the build changes"""
+    weapon = player.weapon
+    key = (player.hybrid_class_name,
+           weapon.name if weapon and weapon.is_legendary else None,
+           weapon.enchantment if weapon else None,
+           tuple(skill for skill in SKILL_EVENTS if player.skill_levels.get(skill, 0) > 0))
+    events = _combat_events.get(key)
+    if events is None:
+        events = _combat_events[key] = compile_combat_events(*key)
+    return events
+
+# ── BUILD FORECAST ───────────────────────────────────────────────────────────
+# Expected outcome of one build against one enemy, worked out from the numbers
+# battle_steps() rolls against instead of by playing fights. Turns follow
+# AutoPolicy: the ultimate when it is charged, else the first ready ability,
+# else a basic attack. The enemy's stun, poison and burning counters are kept
+# as probability distributions, so chance effects add up exactly; enemy HP is
+# the expected damage dealt so far, and the kill turn is the first turn that
+# reaches it. The player is taken to be at full HP with no companions or
+# consumables, so low-HP bonuses, healing and weapon on-hit effects are left
+# out. A forecast takes well under a millisecond, cheap enough for menus.
+
+FORECAST_TURNS = 100
+FORECAST_BOSS = BOSSES[0]  # reference enemy for menu previews
+
+@dataclass(frozen=True)
+class BuildForecast:
+    enemy: str
+    attack_damage: float            # expected damage of one basic attack
+    crit_chance: float
+    rotation: tuple                 # action taken each turn, up to the kill
+    damage_dealt: float             # expected, with damage over time and counters
+    damage_taken: float             # expected, from enemy attacks
+    hp_spent: float                 # HP paid for abilities
+    turns_to_kill: Optional[int]    # None when the enemy outlasts FORECAST_TURNS
+    max_hp: int
+
+    @property
+    def damage_per_turn(self):
+        return self.damage_dealt / len(self.rotation) if self.rotation else 0.0
+
+    @property
+    def survives(self):
+        return self.damage_taken + self.hp_spent < self.max_hp
+
+    def summary(self):
+        if self.turns_to_kill is None:
+            return f"no kill in {FORECAST_TURNS} turns"
+        return f"{self.turns_to_kill} turns, -{self.damage_taken:.0f} HP"
+
+def _set_counter(dist, chance, turns):
+    """Counter distribution after it is set to `turns` with probability `chance`"""
+    out = [p * (1 - chance) for p in dist]
+    out.extend([0.0] * (turns + 1 - len(out)))
+    out[turns] += chance
+    return out
+
+def _add_counter(dist, chance, turns):
+    """Counter distribution after `turns` are added with probability `chance`"""
+    out = [p * (1 - chance) for p in dist] + [0.0] * turns
+    for n, p in enumerate(dist):
+        out[n + turns] += p * chance
+    return out
+
+def _tick_counter(dist):
+    """(chance the counter was running, distribution one turn later)"""
+    if len(dist) == 1:
+        return 0.0, dist
+    out = dist[1:]
+    out[0] += dist[0]
+    return 1 - dist[0], out
+
+def _mix_counters(a, weight, b):
+    """weight * a + (1 - weight) * b"""
+    if len(a) < len(b):
+        a = a + [0.0] * (len(b) - len(a))
+    out = [p * weight for p in a]
+    for n, p in enumerate(b):
+        out[n] += p * (1 - weight)
+    return out
+
+def _ability_damage(spec, damage, crit, element_mults, max_hp, remaining):
+    """Expected damage of one cast on one target, and the chance it procs"""
+    if max_hp <= spec.min_hp:
+        return 0.0, 0.0
+    cost = spec.hp_cost + int(max_hp * spec.hp_cost_ratio)
+    dmg = int(damage * spec.multiplier) + spec.flat + cost * spec.cost_damage
+    proc = crit if spec.proc_on_crit else spec.proc_chance
+    expected = 0.0
+    for chance, procced in ((proc, True), (1 - proc, False)):
+        if chance <= 0:
+            continue
+        rolled = int(dmg * spec.proc_multiplier) if procced else dmg
+        for mult in element_mults:
+            hit = int(rolled * mult) if mult != 1.0 else rolled
+            if procced:
+                hit += spec.proc_damage
+            if spec.hits > 1:
+                hit = hit // spec.hits * spec.hits
+            expected += chance * hit / len(element_mults)
+    if spec.execute_chance:
+        expected += spec.execute_chance * (max(remaining, 0) - expected)
+    return expected, proc
+
+def expected_attack(damage, crit, crit_multiplier, element, template, weather=Weather.CLEAR,
+                    mastery=0, spellblade=False):
+    """Expected damage of one basic attack at full HP, with player_attack's rounding"""
+    weather_mult = WEATHER_EFFECTS.get((weather, element), (1.0,))[0]
+    element_mult = elemental_multiplier(element, template)
+    elemental = element != Element.PHYSICAL
+
+    def roll(dmg):
+        if weather_mult != 1.0:
+            dmg = int(dmg * weather_mult)
+        if element_mult != 1.0:
+            dmg = int(dmg * element_mult)
+        if elemental and mastery > 0:
+            dmg = int(dmg * (1 + mastery / 100))
+        if elemental and spellblade:
+            dmg += int(dmg * 0.2)
+        return dmg
+
+    return crit * roll(int(damage * crit_multiplier)) + (1 - crit) * roll(damage)
+
+def forecast(player, template, weather=Weather.CLEAR, profile=None):
+    """Expected fight of this build against one enemy template, without rolling.
+
+    `profile` forecasts the player as another class pair, e.g. the multiclass
+    trainer previewing a secondary class before it is bought.
+    """
+    saved = (player.profile, player.hybrid_class_name, player.hp, player.active_buffs)
+    if profile is not None:
+        player.profile, player.hybrid_class_name = profile, profile.hybrid_name
+    try:
+        max_hp = player.hp = player.compute_max_hp()
+        damage = player.compute_damage()
+        defense = player.compute_defense()
+        player.active_buffs = dict(saved[3], bear_form=player.buff_clock + 1)
+        bear_defense = player.compute_defense()
+        player.active_buffs = saved[3]
+        crit = critical_chance(player)
+        parry = parry_chance(player)
+        rate = cooldown_rate(player)
+        profile = player.profile
+    finally:
+        player.profile, player.hybrid_class_name, player.hp, player.active_buffs = saved
+    hybrid = profile.hybrid_name
+
+    element = player.weapon.element if player.weapon else Element.PHYSICAL
+    attack_damage = expected_attack(damage, crit, profile.crit_multiplier, element, template, weather,
+                                    player.skill_bonus.elemental_mastery, hybrid == "Spellblade")
+
+    abilities = []
+    for ability in profile.abilities:
+        spec = ability.spec
+        if spec.elements:
+            mults = tuple(elemental_multiplier(e, template) for e in spec.elements)
+        else:
+            mults = (elemental_multiplier(element if spec.element == "weapon" else spec.element, template),)
+        abilities.append((ability.name, round(ability.cooldown * COOLDOWN_TICKS), spec, mults))
+    clock = player.cooldown_clock
+    ready_at = {name: player.cooldown_timers.get(name, clock) for name, *_ in abilities}
+    charge = player.ultimate_charge
+    initiative = 0.50 if template.boss else 0.35
+
+    stun, poison, burning = [1.0], [1.0], [1.0]
+    cursed = 0.0          # chance the enemy is cursed
+    dodge = 1.0 if player.cheat_flags.get("dodge_next") else 0.0
+    buff_clock = 0
+    buffs = {}            # buff -> buff_clock turn it expires on
+    dealt = taken = spent = 0.0
+    rotation = []
+    turns_to_kill = None
+
+    def enemy_acts(stun, ambush):
+        """(expected damage taken, expected counter damage, stun afterwards)"""
+        act = stun[0]
+        if "perfect_parry" in buffs:
+            return 0.0, act * int(damage * 1.5), _tick_counter(stun)[1]
+        armor = bear_defense if "bear_form" in buffs else defense
+        hit = (cursed * max(0, int(template.atk * 0.7) - armor)
+               + (1 - cursed) * max(0, template.atk - armor))
+        lands = act * (1 - parry)
+        if ambush:
+            lands *= 1 - dodge
+        return lands * hit, act * parry * damage, _tick_counter(stun)[1]
+
+    for turn in range(1, FORECAST_TURNS + 1):
+        ambush_hit, ambush_counter, ambush_stun = enemy_acts(stun, True)
+        taken += initiative * ambush_hit
+        dealt += initiative * ambush_counter
+        if "perfect_parry" not in buffs:
+            dodge *= 1 - initiative * stun[0] * (1 - parry)
+        if dealt >= template.hp:
+            turns_to_kill = turn
+            break
+
+        ready = [entry for entry in abilities if ready_at[entry[0]] <= clock]
+        if charge >= player.ultimate_max:
+            action = "ultimate"
+            charge = 0
+            if profile.class_name == "Warrior":
+                dealt += damage * 3
+                stun, ambush_stun = _set_counter(stun, 1.0, 2), _set_counter(ambush_stun, 1.0, 2)
+            elif profile.class_name == "Mage":
+                dealt += damage * 2.5
+                burning = _set_counter(burning, 1.0, 3)
+            else:
+                dealt += damage * 4
+        elif ready:
+            action, cooldown, spec, mults = ready[0]
+            ready_at[action] = clock + cooldown
+            charge += spec.charge
+            cost = spec.hp_cost + int(max_hp * spec.hp_cost_ratio) if max_hp > spec.min_hp else 0
+            spent += cost
+            if spec.deals_damage:
+                dmg, proc = _ability_damage(spec, damage, crit, mults, max_hp, template.hp - dealt)
+                dealt += dmg
+                if spec.stun:
+                    stun, ambush_stun = _set_counter(stun, 1.0, spec.stun), _set_counter(ambush_stun, 1.0, spec.stun)
+                if spec.poison:
+                    poison = _add_counter(poison, 1.0, spec.poison)
+                if spec.proc_poison:
+                    poison = _add_counter(poison, proc, spec.proc_poison)
+                if spec.burn:
+                    burning = _set_counter(burning, spec.burn_chance, spec.burn)
+            if spec.buff:
+                buffs[spec.buff] = buff_clock + max(spec.buff_turns, 1)
+            if spec.dodge:
+                dodge = 1.0
+        else:
+            action = "attack"
+            charge += 5
+            dealt += attack_damage
+            if hybrid == "Shadowknight":
+                stun, ambush_stun = _set_counter(stun, 0.3, 1), _set_counter(ambush_stun, 0.3, 1)
+                poison = _add_counter(poison, 0.3, 2)
+            elif hybrid == "Hexblade":
+                cursed += (1 - cursed) * 0.4
+        rotation.append(action)
+        if dealt >= template.hp:
+            turns_to_kill = turn
+            break
+        if action == "ultimate":
+            # The ultimate ends the turn: no enemy phase and no upkeep
+            stun = _mix_counters(ambush_stun, initiative, stun)
+            continue
+
+        hit, counter, stun_after = enemy_acts(stun, False)
+        taken += (1 - initiative) * hit
+        dealt += (1 - initiative) * counter
+        stun = _mix_counters(ambush_stun, initiative, stun_after)
+
+        poisoned, poison = _tick_counter(poison)
+        burnt, burning = _tick_counter(burning)
+        dealt += poisoned * STATUS_EFFECTS["poison"].tick_damage + burnt * STATUS_EFFECTS["burning"].tick_damage
+        clock += rate
+        buff_clock += 1
+        buffs = {name: expires for name, expires in buffs.items() if expires > buff_clock}
+        if dealt >= template.hp:
+            turns_to_kill = turn
+            break
+
+    return BuildForecast(template.name, attack_damage, crit, tuple(rotation), dealt, taken, spent,
+                         turns_to_kill, max_hp)
+
+# ── BATTLE ENGINE ────────────────────────────────────────────────────────────
+# The rules live in battle_steps(), a generator that yields a Decision whenever
+# the player has to choose something and receives the answer via send().
+# A policy answers those decisions: InteractivePolicy asks the keyboard,
+# AutoPolicy plays on its own for simulations and balance checks.
+
+ACTIONS = {
+    "1": "attack",
+    "2": "ability",
+    "3": "item",
+    "4": "stance",
+    "5": "companions",
+    "6": "ultimate",
+    "7": "sacrifice",
+    "8": "flee",
+    "0": "cheat",
+}
+
+@dataclass
+class Decision:
+    kind: str
+    options: list = field(default_factory=list)
+
+@dataclass
+class BattleResult:
+    won: bool = False
+    turns: int = 0
+    damage_dealt: int = 0
+    damage_taken: int = 0
+    crits: int = 0
+    parries: int = 0
+    kills: List[str] = field(default_factory=list)
+    drops: List[Drop] = field(default_factory=list)
+    gold: int = 0
+    xp: int = 0
 
-    is_boss = any(e.get("boss", False) for e in enemies)
+class BattlePolicy:
+    """Answers the decisions yielded by battle_steps()"""
+
+    def decide(self, player, decision):
+        handler = getattr(self, "choose_" + decision.kind)
+        return handler(player, decision.options)
+
+    def choose_action(self, player, options):
+        return "attack"
+
+    def choose_target(self, player, enemies):
+        return 0
+
+    def choose_ability(self, player, abilities):
+        return None
+
+    def choose_item(self, player, items):
+        return None
+
+    def choose_stance(self, player, stances):
+        return None
+
+    def choose_sacrifice(self, player, options):
+        return None
+
+    def choose_cheat(self, player, options):
+        return ""
+
+class InteractivePolicy(BattlePolicy):
+    """Reads every decision from the keyboard.
+
+    Each decision is a show_<kind> that prints the menu and returns the prompt
+    text, and a parse_<kind> that turns the typed line into an answer, so
+    callers that read input some other way (server.py) can reuse the menus.
+    """
+
+    def decide(self, player, decision):
+        message = self.show(player, decision)
+        return self.parse(player, decision, prompt(message))
+
+    def show(self, player, decision):
+        return getattr(self, "show_" + decision.kind)(player, decision.options)
+
+    def parse(self, player, decision, line):
+        return getattr(self, "parse_" + decision.kind)(player, decision.options, line.strip())
+
+    def show_action(self, player, options):
+        slowprint("\n[1] Attack [2] Ability [3] Item [4] Stance")
+        slowprint("[5] Companions [6] Ultimate [7] Sacrifice [8] Flee [0] Cheat")
+        return "> "
+
+    def parse_action(self, player, options, choice):
+        return ACTIONS.get(choice)
+
+    def show_target(self, player, enemies):
+        return "Target enemy #: "
+
+    def parse_target(self, player, enemies, choice):
+        return int(choice) - 1 if choice.isdigit() else 0
+
+    def show_ability(self, player, abilities):
+        slowprint("\n✨ Abilities:")
+        for i, ability in enumerate(abilities, 1):
+            cd = player.cooldowns.remaining(ability)
+            status = f"CD: {cd:g}" if cd > 0 else "✓ Ready"
+            slowprint(f"  {i}) {ability} ({status})")
+        return "Select ability: "
+
+    def parse_ability(self, player, abilities, choice):
+        if choice.isdigit():
+            idx = int(choice) - 1
+            if 0 <= idx < len(abilities):
+                return abilities[idx]
+        return None
+
+    def show_item(self, player, items):
+        slowprint("\n╔════════ CONSUMABLES ════════╗")
+        for i, name in enumerate(items, 1):
+            slowprint(f"  {i}) {name} x{player.consumables[name]}")
+        slowprint("╚═════════════════════════════╝")
+        return "Use item: "
+
+    def parse_item(self, player, items, choice):
+        if choice.isdigit():
+            idx = int(choice) - 1
+            if 0 <= idx < len(items):
+                return items[idx]
+        return None
+
+    def show_stance(self, player, stances):
+        show_stance_menu()
+        return "> "
+
+    def parse_stance(self, player, stances, choice):
+        if choice.isdigit() and 1 <= int(choice) <= len(stances):
+            return stances[int(choice) - 1]
+        return None
+
+    def show_sacrifice(self, player, options):
+        show_sacrifice_menu(player)
+        return "> "
+
+    def parse_sacrifice(self, player, options, choice):
+        return choice
+
+    def show_cheat(self, player, options):
+        return "Cheat code: "
+
+    def parse_cheat(self, player, options, choice):
+        return choice
+
+class AutoPolicy(BattlePolicy):
+    """Simple greedy player used for headless battles"""
+
+    def __init__(self, heal_below=0.35):
+        self.heal_below = heal_below
+
+    def choose_action(self, player, options):
+        if player.ultimate_charge >= player.ultimate_max:
+            return "ultimate"
+        if player.hp < player.compute_max_hp() * self.heal_below and self._heal_item(player):
+            return "item"
+        if player.cooldowns.ready:
+            return "ability"
+        return "attack"
+
+    def choose_target(self, player, enemies):
+        return min(range(len(enemies)), key=lambda i: enemies[i].hp)
+
+    def choose_ability(self, player, abilities):
+        ready = player.cooldowns.ready
+        for name in abilities:
+            if name in ready:
+                return name
+        return None
+
+    def choose_item(self, player, items):
+        return self._heal_item(player)
+
+    def _heal_item(self, player):
+        for name, count in player.consumables.items():
+            if count > 0 and CONSUMABLES[name].effect_type == "heal":
+                return name
+        return None
+
+def player_attack(player, target, weather, enemies=()):
+    """Resolve a basic attack against one enemy"""
+    dmg = player.compute_damage()
+
+    is_crit = check_critical_hit(player)
+    if is_crit:
+        # Duelist and Nightblade enhanced crit
+        dmg = int(dmg * player.profile.crit_multiplier)
+        slowprint("⚡ CRITICAL HIT!")
+
+    element = player.weapon.element if player.weapon else Element.PHYSICAL
+    dmg = apply_weather_effects(weather, dmg, element)
+    dmg = apply_elemental_damage(dmg, element, target)
+
+    # Berserker Rage skill bonus
+    if player.hp < player.compute_max_hp() / 2:
+        rage_bonus = player.skill_bonus.berserker_rage
+        if rage_bonus > 0:
+            dmg = int(dmg * (1 + rage_bonus / 100))
+            slowprint(lambda: f"  😡 Berserker Rage: +{rage_bonus}% damage!")
+
+    # Elemental Mastery skill bonus
+    if element != Element.PHYSICAL:
+        elem_bonus = player.skill_bonus.elemental_mastery
+        if elem_bonus > 0:
+            dmg = int(dmg * (1 + elem_bonus / 100))
+            slowprint(lambda: f"  ✨ Elemental Mastery: +{elem_bonus}% damage!")
+
+    events = combat_events(player)
+    hit = Hit(player, target, enemies, dmg, element, is_crit)
+    for handler in events.before_hit:
+        handler(hit)
+    dmg = hit.dmg
+
+    target.hp -= dmg
+    player.total_damage_dealt += dmg
+    player.ultimate_charge += 5
+    slowprint(lambda: f"  💥 {dmg} damage to {target.name}!")
+
+    for handler in events.on_hit:
+        handler(hit)
+    if is_crit:
+        for handler in events.on_crit:
+            handler(hit)
+    if target.hp <= 0:
+        for handler in events.on_kill:
+            handler(hit)
+
+    return dmg
+
+def enemy_phase(player, enemies, result, ambush=False):
+    """Every living enemy acts once; ambushes also respect dodge and infinite health"""
+    for enemy in enemies:
+        if enemy.hp <= 0 or (ambush and player.hp <= 0):
+            continue
+        if enemy.stunned > 0:
+            enemy.stunned -= 1
+            if ambush:
+                slowprint(lambda: f"😵 {enemy.name} is stunned — can't act!")
+            else:
+                slowprint(lambda: f"😵 {enemy.name} is stunned!")
+            continue
+
+        if check_parry(player) or 'perfect_parry' in player.active_buffs:
+            if ambush:
+                slowprint(lambda: f"  🛡️ PERFECT PARRY! You counter {enemy.name}!")
+            else:
+                slowprint(lambda: f"  🛡️ PERFECT PARRY! Countered {enemy.name}!")
+            counter_dmg = player.compute_damage()
+            if 'perfect_parry' in player.active_buffs:
+                counter_dmg = int(counter_dmg * 1.5)
+            enemy.hp -= counter_dmg
+            if ambush:
+                slowprint(lambda: f"   ⚔️ Counter strike: {counter_dmg} damage!")
+            else:
+                slowprint(lambda: f"   ⚔️ Counter: {counter_dmg} damage!")
+            continue
+
+        if ambush and player.cheat_flags.get("dodge_next"):
+            player.cheat_flags["dodge_next"] = False
+            slowprint(lambda: f"💨 You dodge {enemy.name}'s early attack!")
+            continue
+
+        dmg = enemy.atk
+        # Hexblade curse effect
+        if enemy.cursed:
+            dmg = int(dmg * 0.7)
+            slowprint("  🌑 Curse weakens the attack!" if ambush else "  🌑 Curse weakens attack!")
+
+        dmg = max(0, dmg - player.compute_defense())
+        if ambush and player.cheat_flags.get("hehe", False):
+            player.hp = 9999
+        else:
+            player.hp -= dmg
+            result.damage_taken += dmg
+        if dmg > 0:
+            if ambush:
+                slowprint(lambda: f"💢 {enemy.name} hits you for {dmg}! (ambush)")
+            else:
+                slowprint(lambda: f"💢 {enemy.name} hits for {dmg}!")
+
+def end_of_turn(player, enemies):
+    """Status effects, cooldowns and buff decay"""
+    phases = get_phase_timer()
+    player.status_engine.tick_enemies()
+    phases.lap("status_effects")
+
+    player.cooldowns.tick()
+    phases.lap("cooldowns")
+
+    # Buff expiry and Rejuvenation healing
+    player.status_engine.tick_buffs()
+    phases.lap("buffs")
+
+def award_victory(player, enemies, result):
+    """Kills, gold, XP, souls, loot, bounties and achievements for a won fight"""
+    slowprint("\n🎉 VICTORY!")
+
+    total_gold = 0
+    total_xp = 0
+
+    for enemy in enemies:
+        player.progress.record_kill(enemy.name)
+        result.kills.append(enemy.name)
+
+        gold = get_game_context().loot.randint(20, 50) * (2 if enemy.boss else 1)
+        total_gold += gold
+        total_xp += 50 if enemy.boss else 20
+
+        if enemy.boss:
+            player.bosses_defeated += 1
+
+        enemy_element = enemy.element
+        capture_soul(player, enemy.name, enemy_element)
+        result.drops += roll_loot(player, enemy)
+
+        check_bounty_completion(player, enemy.name)
+
+    player.gold += total_gold
+    result.gold = total_gold
+    result.xp = total_xp
+    slowprint(lambda: f"💰 Earned {total_gold} gold, {total_xp} XP")
+
+    gain_xp(player, total_xp)
+    check_achievements(player)
+
+def battle_steps(player, enemies, weather, battle_count=0, result=None):
+    """Rules of one fight; yields a Decision for every player choice"""
+    if result is None:
+        result = BattleResult()
+    dealt_before = player.total_damage_dealt
+    crits_before = player.critical_hits
+    parries_before = player.perfect_parries
+
+    slowprint(lambda: f"\n⚔️  Battle {battle_count} - Weather: {weather.value}")
+
+    is_boss = any(e.boss for e in enemies)
 
     if is_boss:
         slowprint("="*50)
@@ -2073,307 +3777,187 @@ def battle(player, enemies, battle_count, weather):
         slowprint("="*50)
 
     for enemy in enemies:
-        slowprint(f"  {enemy['name']} (HP: {enemy['hp']})")
-        enemy['stunned'] = 0
-        enemy['poison'] = 0
-        enemy['burning'] = 0
-        enemy['cursed'] = False
+        slowprint(lambda: f"  {enemy.name} (HP: {enemy.hp})")
+        enemy.stunned = 0
+        enemy.poison = 0
+        enemy.burning = 0
+        enemy.cursed = False
+    player.status_engine.begin(enemies)
+    player.cooldowns.begin()
 
     turn = 0
+    phases = get_phase_timer()
 
-    while any(e['hp'] > 0 for e in enemies) and player.hp > 0:
+    while any(e.hp > 0 for e in enemies) and player.hp > 0:
+        phases.mark()
         turn += 1
-        slowprint(f"\n{'─'*50}")
-        slowprint(f"Turn {turn} | Stance: {player.stance.value}")
+        result.turns = turn
+        slowprint(lambda: f"\n{'─'*50}")
+        slowprint(lambda: f"Turn {turn} | Stance: {player.stance.value}")
 
         class_display = player.hybrid_class_name or player.class_name
-        slowprint(f"{player.name} ({class_display}) HP:{player.hp}/{player.compute_max_hp()} | Ultimate:{player.ultimate_charge}/{player.ultimate_max}")
+        slowprint(lambda: f"{player.name} ({class_display}) HP:{player.hp}/{player.compute_max_hp()} | Ultimate:{player.ultimate_charge}/{player.ultimate_max}")
 
         for i, enemy in enumerate(enemies, 1):
-            if enemy['hp'] > 0:
+            if enemy.hp > 0:
                 status = ""
-                if enemy.get('cursed'):
+                if enemy.cursed:
                     status = " [CURSED]"
-                slowprint(f"  [{i}] {enemy['name']} HP:{enemy['hp']}/{enemy['max_hp']}{status}")
+                slowprint(lambda: f"  [{i}] {enemy.name} HP:{enemy.hp}/{enemy.max_hp}{status}")
+        phases.lap("status")
 
         for comp in player.active_companions:
             if comp.hp > 0 and enemies:
-                alive_enemies = [e for e in enemies if e['hp'] > 0]
+                alive_enemies = [e for e in enemies if e.hp > 0]
                 if alive_enemies:
                     target = alive_enemies[0]
                     dmg = comp.damage
-                    target['hp'] -= dmg
-                    slowprint(f"🤝 {comp.name} attacks {target['name']} for {dmg}!")
+                    target.hp -= dmg
+                    slowprint(lambda: f"🤝 {comp.name} attacks {target.name} for {dmg}!")
+        phases.lap("companions")
 
         # ── INITIATIVE ROLL ──────────────────────────────────────────────────
         # 35% chance enemies ambush the player and attack BEFORE they can act.
         # Bosses are more aggressive: 50% chance to go first.
         initiative_threshold = 0.50 if is_boss else 0.35
-        enemy_goes_first = random.random() < initiative_threshold
-
-        if enemy_goes_first and any(e['hp'] > 0 for e in enemies):
-            slowprint(f"\n⚡ {'BOSS' if is_boss else 'Enemies'} strike first!")
-            for enemy in enemies:
-                if enemy['hp'] > 0 and player.hp > 0:
-                    if enemy['stunned'] > 0:
-                        enemy['stunned'] -= 1
-                        slowprint(f"😵 {enemy['name']} is stunned — can't act!")
-                        continue
-                    # Parry check still applies
-                    if check_parry(player) or 'perfect_parry' in player.active_buffs:
-                        slowprint(f"  🛡️ PERFECT PARRY! You counter {enemy['name']}!")
-                        counter_dmg = player.compute_damage()
-                        if 'perfect_parry' in player.active_buffs:
-                            counter_dmg = int(counter_dmg * 1.5)
-                        enemy['hp'] -= counter_dmg
-                        slowprint(f"   ⚔️ Counter strike: {counter_dmg} damage!")
-                        continue
-                    # Dodge check
-                    if player.cheat_flags.get("dodge_next"):
-                        player.cheat_flags["dodge_next"] = False
-                        slowprint(f"💨 You dodge {enemy['name']}'s early attack!")
-                        continue
-                    dmg = enemy.get('atk', 10)
-                    if enemy.get('cursed'):
-                        dmg = int(dmg * 0.7)
-                        slowprint("  🌑 Curse weakens the attack!")
-                    dmg = max(0, dmg - player.compute_defense())
-                    if player.cheat_flags.get("hehe", False):
-                        player.hp = 9999
-                    else:
-                        player.hp -= dmg
-                    if dmg > 0:
-                        slowprint(f"💢 {enemy['name']} hits you for {dmg}! (ambush)")
+        enemy_goes_first = get_game_context().combat.random() < initiative_threshold
+        phases.lap("initiative")
+
+        if enemy_goes_first and any(e.hp > 0 for e in enemies):
+            slowprint(lambda: f"\n⚡ {'BOSS' if is_boss else 'Enemies'} strike first!")
+            enemy_phase(player, enemies, result, ambush=True)
+            phases.lap("enemy")
             if player.hp <= 0:
                 break
         else:
             slowprint("\n✅ You have the initiative this turn!")
         # ────────────────────────────────────────────────────────────────────
 
-        slowprint("\n[1] Attack [2] Ability [3] Item [4] Stance")
-        slowprint("[5] Companions [6] Ultimate [7] Sacrifice [8] Flee [0] Cheat")
-        choice = input("> ").strip()
+        # Companions or a parry counter may already have finished the fight
+        if not any(e.hp > 0 for e in enemies):
+            break
 
-        if choice == "0":
-            code = input("Cheat code: ").strip()
+        choice = yield Decision("action", list(ACTIONS.values()))
+        phases.mark()
+
+        if choice == "cheat":
+            code = yield Decision("cheat")
             check_cheats(player, code)
             continue
 
-        if choice == "4":
-            change_stance(player)
+        if choice == "stance":
+            stance = yield Decision("stance", list(Stance))
+            phases.mark()
+            change_stance(player, stance)
+            phases.lap("action")
             continue
 
-        if choice == "7":
-            sacrifice_system(player)
+        if choice == "sacrifice":
+            option = yield Decision("sacrifice", ["1", "2", "3", "4"])
+            phases.mark()
+            sacrifice_system(player, option)
+            phases.lap("action")
             continue
 
-        if choice == "6" and player.ultimate_charge >= player.ultimate_max:
+        if choice == "ultimate" and player.ultimate_charge >= player.ultimate_max:
             use_ultimate(player, enemies)
             player.ultimate_charge = 0
+            phases.lap("action")
             continue
 
-        alive_enemies = [e for e in enemies if e['hp'] > 0]
+        alive_enemies = [e for e in enemies if e.hp > 0]
         if not alive_enemies:
             break
 
-        if choice == "1":
+        if choice == "attack":
             target_idx = 0
             if len(alive_enemies) > 1:
-                target_idx = int(input("Target enemy #: ").strip()) - 1
+                target_idx = yield Decision("target", alive_enemies)
+                phases.mark()
                 target_idx = clamp(target_idx, 0, len(alive_enemies) - 1)
+            player_attack(player, alive_enemies[target_idx], weather, enemies)
 
-            target = alive_enemies[target_idx]
-            dmg = player.compute_damage()
-
-            is_crit = check_critical_hit(player)
-            if is_crit:
-                crit_mult = 2
-                # Duelist enhanced crit
-                if player.hybrid_class_name == "Duelist":
-                    crit_mult = 3
-                # Nightblade enhanced crit
-                if player.hybrid_class_name == "Nightblade":
-                    crit_mult = 3.5
-                dmg = int(dmg * crit_mult)
-                slowprint("⚡ CRITICAL HIT!")
-
-            element = player.weapon.element if player.weapon else Element.PHYSICAL
-            dmg = apply_weather_effects(weather, dmg, element)
-            dmg = apply_elemental_damage(dmg, element, target)
-
-            # Berserker Rage skill bonus
-            if player.hp < player.compute_max_hp() / 2:
-                rage_bonus = get_skill_bonus(player, "Berserker Rage")
-                if rage_bonus > 0:
-                    dmg = int(dmg * (1 + rage_bonus / 100))
-                    slowprint(f"  😡 Berserker Rage: +{rage_bonus}% damage!")
-
-            # Elemental Mastery skill bonus
-            if element != Element.PHYSICAL:
-                elem_bonus = get_skill_bonus(player, "Elemental Mastery")
-                if elem_bonus > 0:
-                    dmg = int(dmg * (1 + elem_bonus / 100))
-                    slowprint(f"  ✨ Elemental Mastery: +{elem_bonus}% damage!")
-
-            # Spellblade bonus
-            if player.hybrid_class_name == "Spellblade" and player.weapon and player.weapon.element != Element.PHYSICAL:
-                bonus = int(dmg * 0.2)
-                dmg += bonus
-                slowprint(f"  ⚔️✨ Spellblade bonus: +{bonus} elemental damage!")
-
-            # Shadowknight chance
-            if player.hybrid_class_name == "Shadowknight" and random.random() < 0.3:
-                target['poison'] = target.get('poison', 0) + 2
-                target['stunned'] = 1
-                slowprint("  ⚔️🌑 Shadowknight: Poison + Stun!")
-
-            # Hexblade curse
-            if player.hybrid_class_name == "Hexblade" and random.random() < 0.4:
-                target['cursed'] = True
-                slowprint("  🌑 Hexblade curse applied!")
-
-            target['hp'] -= dmg
-            player.total_damage_dealt += dmg
-            player.ultimate_charge += 5
-            slowprint(f"  💥 {dmg} damage to {target['name']}!")
-
-            # Life Drain skill bonus
-            lifedrain_bonus = get_skill_bonus(player, "Life Drain")
-            if lifedrain_bonus > 0:
-                heal = int(dmg * (lifedrain_bonus / 100))
-                player.heal(heal)
-                slowprint(f"  💚 Life Drain: +{heal} HP!")
-
-            # Ravager lifesteal
-            if player.hybrid_class_name == "Ravager" and is_crit:
-                heal = int(dmg * 0.3)
-                player.heal(heal)
-                slowprint(f"  🩸 Ravager lifesteal: +{heal} HP!")
-
-            # Battle Trance - HP on kill
-            if target['hp'] <= 0:
-                trance_bonus = get_skill_bonus(player, "Battle Trance")
-                if trance_bonus > 0:
-                    player.heal(trance_bonus)
-                    slowprint(f"  ⚔️ Battle Trance: +{trance_bonus} HP!")
-
-            # Check for legendary weapon effects
-            if player.weapon and player.weapon.is_legendary:
-                if "Heals" in player.weapon.legendary_effect and target['hp'] <= 0:
-                    heal_amt = int(player.compute_max_hp() * 0.1)
-                    player.heal(heal_amt)
-                    slowprint(f"   ⚔️ {player.weapon.name} heals {heal_amt} HP!")
-
-            # Reaper harvest check
-            if player.hybrid_class_name == "Reaper" and target['hp'] <= 0:
-                player.berserk_mode = True
-                slowprint("  💀 REAPER HARVEST! Berserk mode extended!")
-
-        elif choice == "2":
-            use_ability(player, alive_enemies)
+        elif choice == "ability":
+            ability_name = yield Decision("ability", list(player.abilities.keys()))
+            phases.mark()
+            if ability_name:
+                use_ability(player, alive_enemies, ability_name)
 
-        elif choice == "3":
-            use_item(player)
+        elif choice == "item":
+            if not player.consumables:
+                slowprint("No consumables!")
+            else:
+                item_name = yield Decision("item", list(player.consumables.keys()))
+                phases.mark()
+                if item_name:
+                    use_item(player, item_name)
+        phases.lap("action")
 
-        if all(e['hp'] <= 0 for e in enemies):
+        if all(e.hp <= 0 for e in enemies):
             break
 
         # Enemy turn (only fires if enemies did NOT already go first this turn)
         if not enemy_goes_first:
-            for enemy in enemies:
-                if enemy['hp'] > 0:
-                    if enemy['stunned'] > 0:
-                        enemy['stunned'] -= 1
-                        slowprint(f"😵 {enemy['name']} is stunned!")
-                        continue
-
-                    if check_parry(player) or 'perfect_parry' in player.active_buffs:
-                        slowprint(f"  🛡️ PERFECT PARRY! Countered {enemy['name']}!")
-                        counter_dmg = player.compute_damage()
-                        if 'perfect_parry' in player.active_buffs:
-                            counter_dmg = int(counter_dmg * 1.5)
-                        enemy['hp'] -= counter_dmg
-                        slowprint(f"   ⚔️ Counter: {counter_dmg} damage!")
-                        continue
-
-                    dmg = enemy.get('atk', 10)
-
-                    # Hexblade curse effect
-                    if enemy.get('cursed'):
-                        dmg = int(dmg * 0.7)
-                        slowprint("  🌑 Curse weakens attack!")
-
-                    dmg = max(0, dmg - player.compute_defense())
-                    player.hp -= dmg
-                    if dmg > 0:
-                        slowprint(f"💢 {enemy['name']} hits for {dmg}!")
-
-        # Status effects
-        for enemy in enemies:
-            if enemy.get('poison', 0) > 0:
-                enemy['hp'] -= 5
-                enemy['poison'] -= 1
-                slowprint(f"  ☠️ {enemy['name']} takes poison damage!")
-            if enemy.get('burning', 0) > 0:
-                enemy['hp'] -= 7
-                enemy['burning'] -= 1
-                slowprint(f"  🔥 {enemy['name']} takes burn damage!")
-
-        # Cooldowns
-        for key in player.cooldown_timers:
-            if player.cooldown_timers[key] > 0:
-                reduction = 1.0
-                # Swift Strike skill bonus
-                swift_bonus = get_skill_bonus(player, "Swift Strike")
-                if swift_bonus > 0:
-                    reduction = 1.0 + (swift_bonus / 100)
-                player.cooldown_timers[key] -= reduction
-
-        # Buffs
-        for buff in list(player.active_buffs.keys()):
-            player.active_buffs[buff] -= 1
-            if player.active_buffs[buff] <= 0:
-                if buff == 'bear_form':
-                    player.defense -= 10
-                del player.active_buffs[buff]
-
-        # Rejuvenation healing
-        if 'rejuvenation' in player.active_buffs:
-            player.heal(15)
-            slowprint("  🌿 Rejuvenation heals 15 HP!")
-
-    if player.hp > 0:
-        slowprint("\n🎉 VICTORY!")
-
-        total_gold = 0
-        total_xp = 0
-
-        for enemy in enemies:
-            player.kills[enemy['name']] = player.kills.get(enemy['name'], 0) + 1
-
-            gold = random.randint(20, 50) * (2 if enemy.get('boss') else 1)
-            total_gold += gold
-            total_xp += 50 if enemy.get('boss') else 20
-
-            if enemy.get('boss'):
-                player.bosses_defeated += 1
+            enemy_phase(player, enemies, result)
+            phases.lap("enemy")
 
-            enemy_element = enemy.get('element', Element.PHYSICAL)
-            capture_soul(player, enemy['name'], enemy_element)
+        end_of_turn(player, enemies)
 
-            check_bounty_completion(player, enemy['name'])
+    result.damage_dealt = player.total_damage_dealt - dealt_before
+    result.crits = player.critical_hits - crits_before
+    result.parries = player.perfect_parries - parries_before
 
-        player.gold += total_gold
-        slowprint(f"💰 Earned {total_gold} gold, {total_xp} XP")
-
-        gain_xp(player, total_xp)
-        check_achievements(player)
-
-        return True
-    else:
-        return False
-
-def change_stance(player):
+    if player.hp > 0:
+        result.won = True
+        award_victory(player, enemies, result)
+    return result
+
+def run_battle(player, enemies, weather, policy, battle_count=0, result=None):
+    """Drive battle_steps() with a policy and return the BattleResult"""
+    result = result or BattleResult()
+    steps = battle_steps(player, enemies, weather, battle_count, result)
+    try:
+        decision = next(steps)
+        while True:
+            decision = steps.send(policy.decide(player, decision))
+    except StopIteration:
+        pass
+    return result
+
+def simulate_battle(player, enemies, weather, policy=None, battle_count=0):
+    """Headless battle: no prompts, no output"""
+    with muted_output():
+        return run_battle(player, enemies, weather, policy or AutoPolicy(), battle_count)
+
+def simulate_run(player, max_battles=50, policy=None, rest=True):
+    """Headless main() loop: fight until the player dies or max_battles; returns the BattleResults"""
+    policy = policy or AutoPolicy()
+    results = []
+    with muted_output():
+        for battle_count, templates in ENCOUNTERS.stream(player, 1, max_battles + 1):
+            if rest:
+                player.hp = player.compute_max_hp()
+            enemies = [ENEMY_POOL.acquire(template) for template in templates]
+            result = run_battle(player, enemies, get_current_weather(), policy, battle_count)
+            ENEMY_POOL.release(enemies)
+            results.append(result)
+            if not result.won:
+                break
+    return results
+
+def battle(player, enemies, battle_count, weather, record=True):
+    """Interactive battle, recorded under its own seed so it can be replayed"""
+    seed = get_game_context().combat.getrandbits(63)
+    result = BattleResult()
+    recorder = BattleRecorder(InteractivePolicy(), player, enemies, weather, battle_count, seed, result)
+    with using_game_context(GameContext(seed)):
+        run_battle(player, enemies, weather, recorder, battle_count, result)
+    recorder.finish()
+    if record:
+        recorder.save()
+    return result.won
+
+def show_stance_menu():
     slowprint("\n╔════════ CHANGE STANCE ═══════╗")
     slowprint("  1) Balanced (Normal)")
     slowprint("  2) Offensive (+30% dmg, -20% def)")
@@ -2381,15 +3965,9 @@ def change_stance(player):
     slowprint("  4) Counter (High parry chance)")
     slowprint("╚══════════════════════════════╝")
 
-    choice = input("> ").strip()
-    if choice == "1":
-        player.stance = Stance.BALANCED
-    elif choice == "2":
-        player.stance = Stance.OFFENSIVE
-    elif choice == "3":
-        player.stance = Stance.DEFENSIVE
-    elif choice == "4":
-        player.stance = Stance.COUNTER
+def change_stance(player, stance):
+    if stance is not None:
+        player.stance = stance
     slowprint(f"⚔️ Stance: {player.stance.value}")
 
 def use_ultimate(player, enemies):
@@ -2398,70 +3976,51 @@ def use_ultimate(player, enemies):
     if player.class_name == "Warrior":
         slowprint("⚔️  TITAN'S WRATH!")
         for enemy in enemies:
-            if enemy['hp'] > 0:
+            if enemy.hp > 0:
                 dmg = player.compute_damage() * 3
-                enemy['hp'] -= dmg
-                enemy['stunned'] = 2
-                slowprint(f"  💥 {dmg} damage to {enemy['name']}! Stunned!")
+                enemy.hp -= dmg
+                enemy.stunned = 2
+                slowprint(lambda: f"  💥 {dmg} damage to {enemy.name}! Stunned!")
 
     elif player.class_name == "Mage":
         slowprint("🔥 METEOR STORM!")
         for enemy in enemies:
-            if enemy['hp'] > 0:
+            if enemy.hp > 0:
                 dmg = player.compute_damage() * 2.5
-                enemy['hp'] -= dmg
-                enemy['burning'] = 3
-                slowprint(f"  🔥 {dmg} fire damage to {enemy['name']}!")
+                enemy.hp -= dmg
+                player.status_engine.afflict(enemy, "burning", 3)
+                slowprint(lambda: f"  🔥 {dmg} fire damage to {enemy.name}!")
 
     else:
-        target = [e for e in enemies if e['hp'] > 0][0]
+        target = [e for e in enemies if e.hp > 0][0]
         dmg = player.compute_damage() * 4
-        target['hp'] -= dmg
-        slowprint(f"  💥 {dmg} massive damage!")
-
-def use_ability(player, enemies):
-    abilities = list(player.abilities.keys())
-    slowprint("\n✨ Abilities:")
-    for i, ability in enumerate(abilities, 1):
-        cd = player.cooldown_timers.get(ability, 0)
-        status = f"CD: {cd}" if cd > 0 else "✓ Ready"
-        slowprint(f"  {i}) {ability} ({status})")
-
-    choice = input("Select ability: ").strip()
-    if choice.isdigit():
-        idx = int(choice) - 1
-        if 0 <= idx < len(abilities):
-            ability_name = abilities[idx]
-            if player.cooldown_timers.get(ability_name, 0) <= 0:
-                player.abilities[ability_name]['action'](enemies)
-                player.cooldown_timers[ability_name] = player.abilities[ability_name]['cooldown']
-
-def use_item(player):
-    if not player.consumables:
-        slowprint("No consumables!")
-        return
+        target.hp -= dmg
+        slowprint(lambda: f"  💥 {dmg} massive damage!")
+
+def use_ability(player, enemies, ability_name):
+    if ability_name in player.cooldowns.ready:
+        cast_ability(player, player.abilities[ability_name]['spec'], enemies)
+        player.cooldowns.start(ability_name, player.abilities[ability_name]['cooldown'])
+
+# Consumable effect type -> (StatusEffect it starts, message)
+ITEM_BUFFS = {
+    "buff_damage": ("damage_buff", "💪 Damage increased!"),
+    "buff_defense": ("defense_buff", "🛡️ Defense increased!"),
+    "buff_speed": ("speed_buff", "💨 Cooldowns speed up!"),
+}
 
-    slowprint("\n╔════════ CONSUMABLES ════════╗")
-    items = list(player.consumables.items())
-    for i, (name, count) in enumerate(items, 1):
-        slowprint(f"  {i}) {name} x{count}")
-    slowprint("╚═════════════════════════════╝")
+def use_item(player, item_name):
+    if player.consumables.get(item_name, 0) > 0:
+        consumable = CONSUMABLES[item_name]
+        player.consumables[item_name] -= 1
 
-    choice = input("Use item: ").strip()
-    if choice.isdigit():
-        idx = int(choice) - 1
-        if 0 <= idx < len(items):
-            item_name = items[idx][0]
-            if player.consumables[item_name] > 0:
-                consumable = CONSUMABLES[item_name]
-                player.consumables[item_name] -= 1
-
-                if consumable.effect_type == "heal":
-                    player.heal(consumable.power)
-                    slowprint(f"💚 Healed {consumable.power} HP!")
-                elif consumable.effect_type == "buff_damage":
-                    player.active_buffs["damage_buff"] = consumable.duration
-                    slowprint("💪 Damage increased!")
+        if consumable.effect_type == "heal":
+            player.heal(consumable.power)
+            slowprint(lambda: f"💚 Healed {consumable.power} HP!")
+        elif consumable.effect_type in ITEM_BUFFS:
+            buff, message = ITEM_BUFFS[consumable.effect_type]
+            player.status_engine.add_buff(buff, consumable.duration)
+            slowprint(message)
 
 def check_cheats(player, code):
     code = code.strip()
@@ -2500,16 +4059,29 @@ def gain_xp(player, amount):
         player.xp -= player.xp_to_next
         player.xp_to_next = int(player.xp_to_next * 1.2)
         player.level_up()
-        slowprint(f"🌟 LEVEL UP! Now level {player.level}!")
+        slowprint(lambda: f"🌟 LEVEL UP! Now level {player.level}!")
 
-def character_creation():
-    slowprint("="*60)
-    slowprint("  🗡️  DUNGEON RPG: ULTIMATE EDITION 🗡️")
-    slowprint("        ✨ NOW WITH HYBRID CLASSES! ✨")
-    slowprint("="*60)
+def create_player(name="Hero", class_name="Adventurer"):
+    """Build a fresh level 1 character of the given class"""
+    player = Player(name=name)
+    if class_name in CLASS_NAMES:
+        player.class_name = class_name
+
+    profile = CLASS_REGISTRY.get(player.class_name)
+    player.max_hp += profile.start_hp
+    player.hp = player.max_hp
+    player.base_damage += profile.start_damage
+    player.defense += profile.start_defense
 
-    name = input("\nHero name: ").strip() or "Hero"
+    player.weapon = WEAPONS["Rusty Sword"]
+    player.init_class_abilities()
+    init_achievements(player)
+    init_bounties(player)
+
+    player.consumables["Health Potion"] = 3
+    return player
 
+def show_class_menu():
     slowprint("\nChoose class:")
     slowprint("=" * 60)
     slowprint("1) Warrior - Tank with high HP and defense")
@@ -2526,70 +4098,20 @@ def character_creation():
     slowprint("12) Warlock - Demon pacts, cursed magic")
     slowprint("=" * 60)
 
-    choice = input("> ").strip()
-    player = Player(name=name)
+def character_creation():
+    slowprint("="*60)
+    slowprint("  🗡️  DUNGEON RPG: ULTIMATE EDITION 🗡️")
+    slowprint("        ✨ NOW WITH HYBRID CLASSES! ✨")
+    slowprint("="*60)
 
-    if choice == "1":
-        player.class_name = "Warrior"
-        player.max_hp += 30
-        player.hp = player.max_hp
-        player.base_damage += 3
-        player.defense += 2
-    elif choice == "2":
-        player.class_name = "Mage"
-        player.base_damage += 12
-        player.max_hp -= 10
-    elif choice == "3":
-        player.class_name = "Rogue"
-        player.base_damage += 5
-        player.max_hp -= 5
-    elif choice == "4":
-        player.class_name = "Berserker"
-        player.base_damage += 8
-        player.max_hp += 10
-    elif choice == "5":
-        player.class_name = "Assassin"
-        player.base_damage += 6
-        player.max_hp -= 10
-    elif choice == "6":
-        player.class_name = "Paladin"
-        player.max_hp += 25
-        player.base_damage += 4
-        player.defense += 3
-    elif choice == "7":
-        player.class_name = "Necromancer"
-        player.base_damage += 10
-        player.max_hp -= 5
-    elif choice == "8":
-        player.class_name = "Monk"
-        player.base_damage += 7
-        player.defense += 2
-        player.max_hp += 5
-    elif choice == "9":
-        player.class_name = "Ranger"
-        player.base_damage += 6
-        player.max_hp += 10
-    elif choice == "10":
-        player.class_name = "Druid"
-        player.base_damage += 5
-        player.max_hp += 15
-        player.defense += 1
-    elif choice == "11":
-        player.class_name = "Samurai"
-        player.base_damage += 8
-        player.max_hp += 15
-        player.defense += 2
-    elif choice == "12":
-        player.class_name = "Warlock"
-        player.base_damage += 11
-        player.max_hp -= 5
+    name = prompt("\nHero name: ").strip() or "Hero"
+    show_class_menu()
 
-    player.weapon = WEAPONS["Rusty Sword"]
-    player.init_class_abilities()
-    init_achievements(player)
-    init_bounties(player)
-
-    player.consumables["Health Potion"] = 3
+    choice = prompt("> ").strip()
+    class_name = "Adventurer"
+    if choice.isdigit() and 1 <= int(choice) <= len(CLASS_NAMES):
+        class_name = CLASS_NAMES[int(choice) - 1]
+    player = create_player(name, class_name)
 
     slowprint(f"\n✨ {name} the {player.class_name} is ready!")
     slowprint("\n💡 TIP: Visit the Multiclass Trainer in town to unlock hybrid classes!")
@@ -2630,115 +4152,464 @@ def prestige_menu(player):
     slowprint(f"║ 2) Back to Town{'':<45}║")
     slowprint(f"╚{'═'*60}╝")
 
-    choice = input("> ").strip()
+    choice = prompt("> ").strip()
 
     if choice == "1" and player.level >= 30:
         slowprint("\n⚠️  WARNING: You will reset to level 1!")
-        confirm = input("Type 'PRESTIGE' to confirm: ").strip()
+        confirm = prompt("Type 'PRESTIGE' to confirm: ").strip()
         if confirm == "PRESTIGE":
             player.prestige()
         else:
             slowprint("Prestige cancelled.")
-        input("Press Enter...")
+        prompt("Press Enter...")
+
+# ── SAVE / LOAD ──────────────────────────────────────────────────────────────
+# A save is a JSON snapshot of the Player plus a journal of small per-battle
+# deltas (one JSON object per line). The journal is folded into a fresh
+# snapshot every SaveJournal.compact_every entries.
+
+SAVE_VERSION = 3
+SAVE_DIR = "saves"
+
+# version -> function that upgrades a raw save dict from that version to the next
+SAVE_MIGRATIONS = {}
+
+# Derived from the class on load, never written to disk
+SAVE_SKIP_FIELDS = {"abilities", "talent_abilities", "profile", "status_engine", "cooldowns",
+                    "skill_bonus", "progress"}
+# Lists that only ever grow; the journal stores just the new tail
+SAVE_APPEND_FIELDS = {"souls", "completed_quests", "inventory_weapons", "inventory_armor"}
+# Flat str -> scalar dicts; the journal stores just the changed keys
+SAVE_DICT_FIELDS = {"kills", "materials", "consumables", "cooldown_timers", "skill_levels",
+                    "skill_branches", "prestige_bonuses", "active_buffs", "cheat_flags"}
+
+def encode_value(value):
+    """Turn dataclasses, enums and containers into plain JSON values"""
+    if isinstance(value, Enum):
+        return value.value
+    if is_dataclass(value):
+        return {f.name: encode_value(getattr(value, f.name)) for f in fields(value)}
+    if isinstance(value, dict):
+        return {k: encode_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode_value(v) for v in value]
+    return value
+
+def decode_value(data, tp):
+    """Inverse of encode_value, guided by the type annotation"""
+    if data is None:
+        return None
+    origin = get_origin(tp)
+    if origin is Union:
+        tp = next(t for t in get_args(tp) if t is not type(None))
+        origin = get_origin(tp)
+    if origin in (list, List):
+        (item_tp,) = get_args(tp)
+        return [decode_value(v, item_tp) for v in data]
+    if origin in (dict, Dict):
+        args = get_args(tp)
+        value_tp = args[1] if args else object
+        return {k: decode_value(v, value_tp) for k, v in data.items()}
+    if isinstance(tp, type) and issubclass(tp, Enum):
+        return tp(data)
+    if is_dataclass(tp):
+        hints = get_type_hints(tp)
+        known = {f.name for f in fields(tp)}
+        return tp(**{k: decode_value(v, hints[k]) for k, v in data.items() if k in known})
+    return data
+
+def player_to_dict(player):
+    return {f.name: encode_value(getattr(player, f.name))
+            for f in fields(player) if f.name not in SAVE_SKIP_FIELDS}
+
+def player_from_dict(data):
+    hints = get_type_hints(Player)
+    known = {f.name for f in fields(Player)} - SAVE_SKIP_FIELDS
+    player = Player(**{k: decode_value(v, hints[k]) for k, v in data.items() if k in known})
+    player.init_class_abilities()
+    return player
 
-def main():
-    player = character_creation()
-    battle_count = 0
-
-    regular_enemies = [
-        # Basic enemies
-        {"name": "Goblin", "hp": 50, "max_hp": 50, "atk": 8, "element": Element.PHYSICAL},
-        {"name": "Wolf", "hp": 45, "max_hp": 45, "atk": 12, "element": Element.PHYSICAL},
-        {"name": "Skeleton", "hp": 60, "max_hp": 60, "atk": 7, "element": Element.DARK},
-        {"name": "Ogre", "hp": 80, "max_hp": 80, "atk": 15, "element": Element.PHYSICAL},
-
-        # Elemental enemies
-        {"name": "Fire Elemental", "hp": 55, "max_hp": 55, "atk": 14, "element": Element.FIRE,
-         "weakness": Element.ICE, "resistance": Element.FIRE},
-        {"name": "Ice Wraith", "hp": 58, "max_hp": 58, "atk": 13, "element": Element.ICE,
-         "weakness": Element.FIRE, "resistance": Element.ICE},
-        {"name": "Storm Spirit", "hp": 52, "max_hp": 52, "atk": 16, "element": Element.LIGHTNING,
-         "weakness": Element.PHYSICAL, "resistance": Element.LIGHTNING},
-        {"name": "Shadow Beast", "hp": 65, "max_hp": 65, "atk": 11, "element": Element.DARK,
-         "weakness": Element.HOLY, "resistance": Element.DARK},
-
-        # Undead
-        {"name": "Zombie", "hp": 70, "max_hp": 70, "atk": 9, "element": Element.DARK,
-         "weakness": Element.HOLY, "resistance": Element.POISON},
-        {"name": "Ghoul", "hp": 62, "max_hp": 62, "atk": 13, "element": Element.DARK,
-         "weakness": Element.HOLY, "resistance": Element.DARK},
-        {"name": "Wraith", "hp": 48, "max_hp": 48, "atk": 15, "element": Element.DARK,
-         "weakness": Element.HOLY},
-        {"name": "Death Knight", "hp": 85, "max_hp": 85, "atk": 17, "element": Element.DARK,
-         "weakness": Element.HOLY, "resistance": Element.PHYSICAL},
-
-        # Beasts
-        {"name": "Dire Wolf", "hp": 65, "max_hp": 65, "atk": 14, "element": Element.PHYSICAL},
-        {"name": "Giant Spider", "hp": 55, "max_hp": 55, "atk": 11, "element": Element.POISON},
-        {"name": "Grizzly Bear", "hp": 90, "max_hp": 90, "atk": 16, "element": Element.PHYSICAL},
-        {"name": "Wyvern", "hp": 75, "max_hp": 75, "atk": 18, "element": Element.FIRE},
-
-        # Demons
-        {"name": "Imp", "hp": 40, "max_hp": 40, "atk": 10, "element": Element.FIRE},
-        {"name": "Hellhound", "hp": 68, "max_hp": 68, "atk": 15, "element": Element.FIRE,
-         "resistance": Element.FIRE},
-        {"name": "Demon Warrior", "hp": 82, "max_hp": 82, "atk": 19, "element": Element.DARK},
-
-        # Constructs
-        {"name": "Golem", "hp": 95, "max_hp": 95, "atk": 13, "element": Element.PHYSICAL,
-         "resistance": Element.PHYSICAL},
-        {"name": "Gargoyle", "hp": 72, "max_hp": 72, "atk": 14, "element": Element.PHYSICAL},
-
-        # Magic users
-        {"name": "Dark Mage", "hp": 50, "max_hp": 50, "atk": 20, "element": Element.DARK},
-        {"name": "Cultist", "hp": 45, "max_hp": 45, "atk": 12, "element": Element.DARK},
-        {"name": "Warlock", "hp": 58, "max_hp": 58, "atk": 18, "element": Element.DARK},
-    ]
+def migrate_save(data):
+    """Bring a raw save dict up to SAVE_VERSION"""
+    version = data.get("version", 1)
+    if version > SAVE_VERSION:
+        raise ValueError(f"Save version {version} is newer than this game ({SAVE_VERSION})")
+    while version < SAVE_VERSION:
+        data = SAVE_MIGRATIONS[version](data)
+        version += 1
+        data["version"] = version
+    return data
+
+def migrate_v1_buffs(data):
+    """v2: Bear Form is a defense modifier instead of +10 written into defense.
+    Buffs now store the buff_clock turn they expire on; the clock starts at 0,
+    so the old turns-left values carry over unchanged."""
+    player = data["player"]
+    if "bear_form" in player.get("active_buffs", {}):
+        player["defense"] -= 10
+    return data
+
+SAVE_MIGRATIONS[1] = migrate_v1_buffs
+
+def migrate_v2_cooldowns(data):
+    """v3: cooldown_timers hold the cooldown_clock tick an ability is ready at
+    instead of the turns left; the clock starts at 0."""
+    timers = data["player"].get("cooldown_timers", {})
+    for name, left in timers.items():
+        timers[name] = round(max(left, 0) * COOLDOWN_TICKS)
+    return data
+
+SAVE_MIGRATIONS[2] = migrate_v2_cooldowns
+
+def apply_delta(data, delta):
+    """Fold one journal entry into a raw save dict"""
+    player = data["player"]
+    player.update(delta.get("set", {}))
+    for name, changes in delta.get("dicts", {}).items():
+        target = player.setdefault(name, {})
+        for key, value in changes.items():
+            if value is None:
+                target.pop(key, None)
+            else:
+                target[key] = value
+    for name, items in delta.get("append", {}).items():
+        player.setdefault(name, []).extend(items)
+    data.setdefault("meta", {}).update(delta.get("meta", {}))
+
+def save_slug(name):
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", name).strip("_") or "hero"
+
+def save_paths(name, directory=SAVE_DIR):
+    base = os.path.join(directory, save_slug(name))
+    return base + ".json", base + ".journal"
+
+def list_saves(directory=SAVE_DIR):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(f[:-5] for f in os.listdir(directory) if f.endswith(".json"))
+
+def read_save(name, directory=SAVE_DIR):
+    """Load the raw snapshot, replay its journal and migrate it"""
+    snapshot_path, journal_path = save_paths(name, directory)
+    with open(snapshot_path, encoding="utf-8") as f:
+        data = json.load(f)
+    if os.path.exists(journal_path):
+        with open(journal_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    apply_delta(data, json.loads(line))
+    return migrate_save(data)
+
+def load_game(name, directory=SAVE_DIR):
+    """Returns (player, meta)"""
+    data = read_save(name, directory)
+    return player_from_dict(data["player"]), data.get("meta", {})
+
+class SaveJournal:
+    """Snapshot plus append-only deltas for one character"""
+
+    def __init__(self, player, directory=SAVE_DIR, compact_every=50, meta=None):
+        self.player = player
+        self.directory = directory
+        self.compact_every = compact_every
+        self.meta = dict(meta or {})
+        self.snapshot()
+
+    def snapshot(self, **meta):
+        """Write the whole character and start an empty journal"""
+        self.meta.update(meta)
+        os.makedirs(self.directory, exist_ok=True)
+        snapshot_path, journal_path = save_paths(self.player.name, self.directory)
+        state = player_to_dict(self.player)
+        tmp_path = snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": SAVE_VERSION, "player": state, "meta": self.meta}, f)
+        os.replace(tmp_path, snapshot_path)
+        open(journal_path, "w").close()
+        self.entries = 0
+        self._remember(state)
+
+    def _remember(self, state):
+        self.last = {}
+        for name, value in state.items():
+            if name in SAVE_APPEND_FIELDS:
+                self.last[name] = len(value)
+            elif name in SAVE_DICT_FIELDS:
+                self.last[name] = dict(value)
+            else:
+                self.last[name] = value
+
+    def delta(self):
+        """What changed since the last snapshot or journal entry"""
+        player = self.player
+        delta = {}
+        for f in fields(player):
+            name = f.name
+            if name in SAVE_SKIP_FIELDS:
+                continue
+            value = getattr(player, name)
+            if name in SAVE_APPEND_FIELDS:
+                seen = self.last[name]
+                if len(value) > seen:
+                    delta.setdefault("append", {})[name] = encode_value(value[seen:])
+                    self.last[name] = len(value)
+                elif len(value) < seen:
+                    delta.setdefault("set", {})[name] = encode_value(value)
+                    self.last[name] = len(value)
+            elif name in SAVE_DICT_FIELDS:
+                old = self.last[name]
+                changes = {k: v for k, v in value.items() if old.get(k, None) != v}
+                changes.update({k: None for k in old if k not in value})
+                if changes:
+                    delta.setdefault("dicts", {})[name] = encode_value(changes)
+                    self.last[name] = dict(value)
+            else:
+                encoded = encode_value(value)
+                if encoded != self.last[name]:
+                    delta.setdefault("set", {})[name] = encoded
+                    self.last[name] = encoded
+        return delta
+
+    def record(self, **meta):
+        """Append the changes since the last save; cheap enough to call after every battle"""
+        if self.entries >= self.compact_every:
+            self.snapshot(**meta)
+            return
+        delta = self.delta()
+        meta = {k: v for k, v in meta.items() if self.meta.get(k) != v}
+        if meta:
+            self.meta.update(meta)
+            delta["meta"] = meta
+        if not delta:
+            return
+        _, journal_path = save_paths(self.player.name, self.directory)
+        with open(journal_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(delta, separators=(",", ":")) + "\n")
+        self.entries += 1
+
+    def discard(self):
+        """Delete the save, e.g. when the character dies"""
+        for path in save_paths(self.player.name, self.directory):
+            if os.path.exists(path):
+                os.remove(path)
+
+def choose_character():
+    """Continue a saved character or create a new one; returns (player, meta)"""
+    saves = list_saves()
+    if saves:
+        slowprint("\n💾 Saved heroes:")
+        for i, name in enumerate(saves, 1):
+            slowprint(f"  {i}) {name}")
+        slowprint(f"  {len(saves)+1}) New hero")
+        choice = prompt("> ").strip()
+        if choice.isdigit() and 1 <= int(choice) <= len(saves):
+            player, meta = load_game(saves[int(choice) - 1])
+            slowprint(f"\n✨ Welcome back, {player.name}! (Level {player.level})")
+            return player, meta
+    return character_creation(), {}
+
+# ── REPLAYS ──────────────────────────────────────────────────────────────────
+# A replay is JSON lines: a header with the battle's seed, weather, encounter
+# bracket, enemies and the player's starting state (in the save format of
+# save_version, migrated on load like a save), then one line per turn with
+# the answers given and what changed by the next turn's first prompt (player
+# HP, crits, parries, and [index, hp, stunned, poison, burning, cursed] for
+# every enemy that changed). Feeding the answers back into battle_steps under
+# the same seed rebuilds the fight exactly.
+
+REPLAY_VERSION = 3
+REPLAY_DIR = "replays"
+REPLAY_KEEP = 20
+
+# version -> function that upgrades a replay header from that version to the next
+REPLAY_MIGRATIONS = {}
+
+def battle_snapshot(player, enemies):
+    return {
+        "hp": player.hp,
+        "crits": player.critical_hits,
+        "parries": player.perfect_parries,
+        "enemies": [[e.hp, e.stunned, e.poison, e.burning, e.cursed] for e in enemies],
+    }
 
-    bosses = [
-        # Original bosses
-        {"name": "Dragon", "hp": 200, "max_hp": 200, "atk": 25, "boss": True, "element": Element.FIRE,
-         "weakness": Element.ICE, "resistance": Element.FIRE},
-        {"name": "Lich King", "hp": 180, "max_hp": 180, "atk": 22, "boss": True, "element": Element.DARK,
-         "weakness": Element.HOLY, "resistance": Element.DARK},
-
-        # New bosses
-        {"name": "Frost Titan", "hp": 220, "max_hp": 220, "atk": 28, "boss": True, "element": Element.ICE,
-         "weakness": Element.FIRE, "resistance": Element.ICE},
-        {"name": "Storm Lord", "hp": 190, "max_hp": 190, "atk": 30, "boss": True, "element": Element.LIGHTNING,
-         "weakness": Element.PHYSICAL, "resistance": Element.LIGHTNING},
-        {"name": "Demon Prince", "hp": 210, "max_hp": 210, "atk": 27, "boss": True, "element": Element.DARK,
-         "weakness": Element.HOLY, "resistance": Element.FIRE},
-        {"name": "Void Leviathan", "hp": 250, "max_hp": 250, "atk": 32, "boss": True, "element": Element.DARK,
-         "weakness": Element.HOLY, "resistance": Element.DARK},
-        {"name": "Phoenix King", "hp": 195, "max_hp": 195, "atk": 29, "boss": True, "element": Element.FIRE,
-         "weakness": Element.ICE, "resistance": Element.FIRE},
-        {"name": "Ancient Hydra", "hp": 240, "max_hp": 240, "atk": 26, "boss": True, "element": Element.POISON,
-         "weakness": Element.FIRE, "resistance": Element.POISON},
-        {"name": "Celestial Guardian", "hp": 205, "max_hp": 205, "atk": 24, "boss": True, "element": Element.HOLY,
-         "weakness": Element.DARK, "resistance": Element.HOLY},
-        {"name": "Shadow Dragon", "hp": 230, "max_hp": 230, "atk": 31, "boss": True, "element": Element.DARK,
-         "weakness": Element.HOLY, "resistance": Element.DARK},
-        {"name": "Kraken", "hp": 215, "max_hp": 215, "atk": 28, "boss": True, "element": Element.ICE,
-         "weakness": Element.LIGHTNING, "resistance": Element.ICE},
-        {"name": "Golem King", "hp": 260, "max_hp": 260, "atk": 23, "boss": True, "element": Element.PHYSICAL,
-         "weakness": Element.LIGHTNING, "resistance": Element.PHYSICAL},
-        {"name": "Necromancer Lord", "hp": 185, "max_hp": 185, "atk": 26, "boss": True, "element": Element.DARK,
-         "weakness": Element.HOLY, "resistance": Element.DARK},
-        {"name": "Crimson Behemoth", "hp": 270, "max_hp": 270, "atk": 30, "boss": True, "element": Element.FIRE,
-         "weakness": Element.ICE, "resistance": Element.FIRE},
-        {"name": "Arch Demon", "hp": 235, "max_hp": 235, "atk": 33, "boss": True, "element": Element.DARK,
-         "weakness": Element.HOLY, "resistance": Element.FIRE},
-        {"name": "Elder Wyrm", "hp": 245, "max_hp": 245, "atk": 29, "boss": True, "element": Element.POISON,
-         "weakness": Element.HOLY, "resistance": Element.POISON},
-
-        # Ultra bosses (rare)
-        {"name": "Primordial Chaos", "hp": 300, "max_hp": 300, "atk": 35, "boss": True, "element": Element.DARK,
-         "weakness": Element.HOLY},
-        {"name": "World Eater", "hp": 320, "max_hp": 320, "atk": 38, "boss": True, "element": Element.PHYSICAL},
-        {"name": "Death Itself", "hp": 280, "max_hp": 280, "atk": 40, "boss": True, "element": Element.DARK,
-         "weakness": Element.HOLY, "resistance": Element.DARK},
-    ]
+def snapshot_diff(before, after):
+    diff = {}
+    for key in ("hp", "crits", "parries"):
+        if after[key] != before[key]:
+            diff[key] = after[key] - before[key]
+    changed = [[i] + new for i, (old, new) in enumerate(zip(before["enemies"], after["enemies"])) if old != new]
+    if changed:
+        diff["enemies"] = changed
+    return diff
+
+class BattleRecorder(BattlePolicy):
+    """Wraps another policy and logs its answers plus per-turn state changes"""
+
+    def __init__(self, policy, player, enemies, weather, battle_count, seed, result):
+        self.policy = policy
+        self.player = player
+        self.enemies = enemies
+        self.result = result
+        self.lines = [{
+            "version": REPLAY_VERSION,
+            "seed": seed,
+            "battle_count": battle_count,
+            "weather": weather.value,
+            "bracket": player_bracket(player).index,
+            "enemies": [e.name for e in enemies],
+            "save_version": SAVE_VERSION,
+            "player": player_to_dict(player),
+        }]
+        self.turn = 0
+        self.choices = []
+        self.start = None
+
+    def decide(self, player, decision):
+        if self.result.turns != self.turn:
+            self.end_turn()
+            self.turn = self.result.turns
+        answer = self.policy.decide(player, decision)
+        self.choices.append([decision.kind, answer.value if isinstance(answer, Stance) else answer])
+        return answer
+
+    def end_turn(self):
+        now = battle_snapshot(self.player, self.enemies)
+        if self.turn:
+            self.lines.append({"turn": self.turn, "choices": self.choices, **snapshot_diff(self.start, now)})
+        self.choices = []
+        self.start = now
+
+    def finish(self):
+        self.end_turn()
+        self.turn = 0
+        return self.lines
+
+    def dumps(self):
+        return "".join(json.dumps(line, separators=(",", ":")) + "\n" for line in self.lines)
+
+    def save(self, directory=REPLAY_DIR, keep=REPLAY_KEEP):
+        """Write the replay and drop this hero's oldest ones beyond keep"""
+        os.makedirs(directory, exist_ok=True)
+        slug = save_slug(self.player.name)
+        path = os.path.join(directory, f"{slug}-{self.lines[0]['battle_count']:05d}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.dumps())
+        mine = sorted(f for f in os.listdir(directory) if re.fullmatch(re.escape(slug) + r"-\d+\.jsonl", f))
+        for old in mine[:-keep]:
+            os.remove(os.path.join(directory, old))
+        return path
+
+class ReplayPolicy(BattlePolicy):
+    """Answers decisions from a recorded list of [kind, answer] pairs"""
+
+    def __init__(self, choices):
+        self.choices = iter(choices)
+
+    def decide(self, player, decision):
+        kind, answer = next(self.choices, (None, None))
+        if kind != decision.kind:
+            raise ValueError(f"Replay diverged: expected a {kind} answer, battle asked for {decision.kind}")
+        if kind == "stance" and answer is not None:
+            return Stance(answer)
+        return answer
+
+def migrate_replay(header):
+    """Bring a replay header up to REPLAY_VERSION"""
+    version = header.get("version")
+    if version not in REPLAY_MIGRATIONS and version != REPLAY_VERSION:
+        raise ValueError(f"Unsupported replay version {version}")
+    while version < REPLAY_VERSION:
+        header = REPLAY_MIGRATIONS[version](header)
+        version += 1
+        header["version"] = version
+    return header
+
+def migrate_v1_replay(header):
+    """v2: enemies are scaled to an encounter bracket. v1 battles predate
+    scaling, which is bracket 0: the unscaled templates and the same draws.
+
+    v1 headers don't say which battle rules recorded them, only the save
+    format of the player: buff_clock came with save v2 and cooldown_clock
+    with save v3. The status engine (save v2) landed right after the combat
+    event bus changed several weapons' on-hit effects, so a save v1 player
+    means the battle may have been fought under the old rules; those
+    replays are rejected rather than replayed wrong.
+    """
+    player = header["player"]
+    if "buff_clock" not in player:
+        raise ValueError("Version 1 replay may predate the combat event bus; it can't be replayed")
+    header["bracket"] = 0
+    header["save_version"] = 3 if "cooldown_clock" in player else 2
+    return header
+
+REPLAY_MIGRATIONS[1] = migrate_v1_replay
+
+def migrate_v2_save_version(header):
+    """v3: the header names the save version of the embedded player, which
+    replay_battle migrates before building it. v2 recorders wrote save v3;
+    v1 headers already had theirs worked out by migrate_v1_replay."""
+    header.setdefault("save_version", 3)
+    return header
+
+REPLAY_MIGRATIONS[2] = migrate_v2_save_version
+
+def read_replay(path):
+    """Returns (header, turns), with the header upgraded to REPLAY_VERSION"""
+    with open(path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    return migrate_replay(lines[0]), lines[1:]
+
+def replay_battle(path, until_turn=None, sink=None, verify=False):
+    """Rebuild a recorded battle with no output delay.
+
+    Stops at the first prompt of until_turn (or at the end) and returns
+    (player, enemies, result). With verify=True the state changes are checked
+    against the recording and a ValueError names the first turn that differs.
+    """
+    header, turns = read_replay(path)
+    state = migrate_save({"version": header["save_version"], "player": header["player"]})["player"]
+    player = player_from_dict(state)
+    templates = BRACKETS[header["bracket"]].templates
+    enemies = [Enemy(templates[name]) for name in header["enemies"]]
+    weather = Weather(header["weather"])
+    result = BattleResult()
+    policy = ReplayPolicy([choice for turn in turns for choice in turn["choices"]])
+    if verify:
+        policy = BattleRecorder(policy, player, enemies, weather, header["battle_count"], header["seed"], result)
+
+    with using_output(sink or NullSink()), using_game_context(GameContext(header["seed"])):
+        steps = battle_steps(player, enemies, weather, header["battle_count"], result)
+        try:
+            decision = next(steps)
+            while until_turn is None or result.turns < until_turn:
+                decision = steps.send(policy.decide(player, decision))
+        except StopIteration:
+            pass
+        finally:
+            steps.close()
+
+    if verify and until_turn is None:
+        for recorded, replayed in zip(turns, policy.finish()[1:]):
+            if recorded != replayed:
+                raise ValueError(f"Replay diverged on turn {recorded['turn']}")
+    return player, enemies, result
+
+def roll_encounter(player, battle_count):
+    """Pooled enemies for the next battle, scaled to the player's bracket"""
+    return [ENEMY_POOL.acquire(template) for template in ENCOUNTERS.roll_for(player, battle_count)]
+
+def show_game_over(player):
+    slowprint("\n💀 GAME OVER")
+    slowprint(f"Final Level: {player.level}")
+    if player.hybrid_class_name:
+        slowprint(f"Class: {player.hybrid_class_name}")
+    slowprint(f"Total Kills: {sum(player.kills.values())}")
+    slowprint(f"Gold Earned: {player.gold}")
+
+def main():
+    player, meta = choose_character()
+    battle_count = meta.get("battle_count", 0)
+    journal = SaveJournal(player, meta=meta)
 
     while player.hp > 0:
         battle_count += 1
@@ -2756,9 +4627,10 @@ def main():
         slowprint("  9) Hostel (Full heal)")
         slowprint(" 10) Multiclass Trainer ✨")
         slowprint(" 11) Prestige System ⭐")
+        slowprint(" 12) Save Game 💾")
         slowprint("╚═════════════════════════════╝")
 
-        choice = input("> ").strip()
+        choice = prompt("> ").strip()
 
         if choice == "2":
             blacksmith_menu(player)
@@ -2791,22 +4663,35 @@ def main():
         elif choice == "11":
             prestige_menu(player)
             continue
+        elif choice == "12":
+            journal.snapshot(battle_count=battle_count)
+            slowprint("💾 Game saved!")
+            continue
 
-        if battle_count % 10 == 0:
-            enemies = [dict(random.choice(bosses))]
+        enemies = roll_encounter(player, battle_count)
+        won = battle(player, enemies, battle_count, weather)
+        ENEMY_POOL.release(enemies)
+        if won:
+            journal.record(battle_count=battle_count)
         else:
-            party_size = len(player.active_companions) + 1
-            num_enemies = min(random.randint(1, party_size), 3)
-            enemies = [dict(random.choice(regular_enemies)) for _ in range(num_enemies)]
-
-        if not battle(player, enemies, battle_count, weather):
-            slowprint("\n💀 GAME OVER")
-            slowprint(f"Final Level: {player.level}")
-            if player.hybrid_class_name:
-                slowprint(f"Class: {player.hybrid_class_name}")
-            slowprint(f"Total Kills: {sum(player.kills.values())}")
-            slowprint(f"Gold Earned: {player.gold}")
+            journal.discard()
+            show_game_over(player)
             break
 
 if __name__ == "__main__":
-    main()
+    # RPG_OUTPUT=instant skips the typewriter effect, RPG_SEED replays a game,
+    # RPG_PHASES=1 times the battle loop (kill -USR1 <pid> prints the table)
+    set_output(OUTPUT_MODES.get(os.environ.get("RPG_OUTPUT", "animated"), AnimatedSink)())
+    if os.environ.get("RPG_SEED"):
+        set_game_context(GameContext(os.environ["RPG_SEED"]))
+    if os.environ.get("RPG_PHASES"):
+        timer = PhaseTimer()
+        set_phase_timer(timer)
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: print(timer.report(), file=sys.stderr))
+    try:
+        main()
+    finally:
+        get_output().flush()
+        if get_phase_timer().enabled:
+            print(get_phase_timer().report(), file=sys.stderr)
@@ -0,0 +1,39 @@
+"""Replay a recorded battle at full speed.
+
+    python replay.py replays/Hero-00012.jsonl             # the whole fight
+    python replay.py replays/Hero-00012.jsonl --turn 4    # stop at turn 4's first prompt
+    python replay.py replays/Hero-00012.jsonl --verify    # check it still plays the same
+"""
+import argparse
+import sys
+
+from project import BufferedSink, NullSink, replay_battle
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded battle")
+    parser.add_argument("replay")
+    parser.add_argument("--turn", type=int, default=None, help="stop at the first prompt of this turn")
+    parser.add_argument("--verify", action="store_true", help="compare every turn with the recording")
+    parser.add_argument("--quiet", action="store_true", help="only print the final state")
+    args = parser.parse_args()
+
+    sink = NullSink() if args.quiet else BufferedSink()
+    try:
+        player, enemies, result = replay_battle(args.replay, args.turn, sink, args.verify)
+    except ValueError as exc:
+        sink.flush()
+        print(f"\n❌ {exc}")
+        sys.exit(1)
+    sink.flush()
+
+    print(f"\n── turn {result.turns} ──")
+    print(f"{player.name}: HP {player.hp}/{player.compute_max_hp()}, "
+          f"crits {player.critical_hits}, parries {player.perfect_parries}")
+    for enemy in enemies:
+        print(f"{enemy.name}: HP {enemy.hp}/{enemy.max_hp} stunned={enemy.stunned} "
+              f"poison={enemy.poison} burning={enemy.burning} cursed={enemy.cursed}")
+    if args.verify:
+        print("✅ Replay matches the recording")
+
+if __name__ == "__main__":
+    main()
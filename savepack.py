@@ -0,0 +1,282 @@
+"""Compact binary archive of saved characters for bulk analytics.
+
+Layout (little endian):
+
+    header   magic, version, record count, section offsets
+    stats    one fixed-width row per character (STAT_FIELDS)
+    records  per character: packed (string id, count) arrays for kills,
+             materials and consumables, then the remaining state as compact JSON
+    strings  interned string table (names of items, enemies, classes...)
+    index    offset of every variable-length record
+
+Every stats row has the same size, so PackReader can pull one field of one
+character, or a whole column, straight out of the memory map without
+decoding anything else.
+
+    python savepack.py pack saves/ characters.pack
+    python savepack.py column characters.pack prestige_level
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+
+from project import Stance, list_saves, player_from_dict, read_save
+
+MAGIC = b"RPGP"
+PACK_VERSION = 2
+HEADER = struct.Struct("<4sHIQQQQ")
+NO_STRING = 0xFFFFFFFF
+STRING_SIZE = struct.Struct("<H")
+MAX_STRING = 0xFFFF   # longest string, in UTF-8 bytes, the table can hold
+
+# (field, struct code) for the fixed-width stats row
+STAT_FIELDS = [
+    ("name", "I"),
+    ("class_name", "I"),
+    ("secondary_class", "I"),
+    ("hybrid_class_name", "I"),
+    ("level", "i"),
+    ("prestige_level", "i"),
+    ("xp", "q"),
+    ("xp_to_next", "q"),
+    ("hp", "i"),
+    ("max_hp", "i"),
+    ("base_damage", "i"),
+    ("defense", "i"),
+    ("gold", "q"),
+    ("skill_points", "i"),
+    ("talent_points", "i"),
+    ("ultimate_charge", "i"),
+    ("ultimate_max", "i"),
+    ("stance", "B"),
+    ("evolution_stage", "B"),
+    ("berserk_mode", "?"),
+    ("curse_active", "?"),
+    ("total_damage_dealt", "d"),   # Mage ultimates deal fractional damage
+    ("critical_hits", "i"),
+    ("bosses_defeated", "i"),
+    ("perfect_parries", "i"),
+    ("sacrifices_made", "i"),
+]
+STRING_FIELDS = {"name", "class_name", "secondary_class", "hybrid_class_name"}
+FLOAT_FIELDS = {name for name, code in STAT_FIELDS if code == "d"}
+STANCES = list(Stance)
+STATS = struct.Struct("<" + "".join(code for _, code in STAT_FIELDS))
+
+def _field_offsets():
+    offsets = {}
+    position = 0
+    for name, code in STAT_FIELDS:
+        codec = struct.Struct("<" + code)
+        offsets[name] = (position, codec)
+        position += codec.size
+    return offsets
+
+FIELD_OFFSETS = _field_offsets()
+
+COUNTER_FIELDS = ["kills", "materials", "consumables"]
+PACKED_FIELDS = {name for name, _ in STAT_FIELDS} | set(COUNTER_FIELDS)
+PAIR = struct.Struct("<II")
+COUNT = struct.Struct("<I")
+
+class StringTable:
+    """Interns strings to small integer ids"""
+
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def intern(self, text):
+        if text is None:
+            return NO_STRING
+        if text not in self.ids:
+            size = len(text.encode("utf-8"))
+            if size > MAX_STRING:
+                raise ValueError(f"String of {size} bytes is too long to pack (limit {MAX_STRING}): {text[:40]!r}...")
+            self.ids[text] = len(self.strings)
+            self.strings.append(text)
+        return self.ids[text]
+
+    def encode(self):
+        parts = [COUNT.pack(len(self.strings))]
+        for text in self.strings:
+            raw = text.encode("utf-8")
+            parts.append(STRING_SIZE.pack(len(raw)))
+            parts.append(raw)
+        return b"".join(parts)
+
+def _stat_value(name, value, strings):
+    if name in STRING_FIELDS:
+        return strings.intern(value)
+    if name == "stance":
+        return STANCES.index(Stance(value))
+    if name in FLOAT_FIELDS:
+        return float(value)
+    if value != int(value):
+        raise ValueError(f"{name} must be a whole number to pack, got {value!r}")
+    return int(value)
+
+def write_pack(states, path):
+    """Pack raw player dicts (player_to_dict format) into one archive"""
+    strings = StringTable()
+    stats = []
+    records = []
+    for state in states:
+        stats.append(STATS.pack(*(_stat_value(name, state[name], strings) for name, _ in STAT_FIELDS)))
+        parts = []
+        for name in COUNTER_FIELDS:
+            counts = state.get(name, {})
+            parts.append(COUNT.pack(len(counts)))
+            parts.extend(PAIR.pack(strings.intern(k), v) for k, v in counts.items())
+        rest = {k: v for k, v in state.items() if k not in PACKED_FIELDS}
+        blob = json.dumps(rest, separators=(",", ":")).encode("utf-8")
+        parts.append(COUNT.pack(len(blob)))
+        parts.append(blob)
+        records.append(b"".join(parts))
+
+    stats_offset = HEADER.size
+    records_offset = stats_offset + STATS.size * len(stats)
+    offsets = []
+    position = records_offset
+    for record in records:
+        offsets.append(position)
+        position += len(record)
+    strings_offset = position
+    string_blob = strings.encode()
+    index_offset = strings_offset + len(string_blob)
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, PACK_VERSION, len(states), stats_offset,
+                            records_offset, strings_offset, index_offset))
+        f.writelines(stats)
+        f.writelines(records)
+        f.write(string_blob)
+        f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+
+def pack_directory(directory, path):
+    """Pack every save in a save directory; returns the number of characters"""
+    states = [read_save(name, directory)["player"] for name in list_saves(directory)]
+    write_pack(states, path)
+    return len(states)
+
+class PackReader:
+    """Memory-mapped, lazy reader for a pack archive"""
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.count, self.stats_offset, self.records_offset,
+         self.strings_offset, self.index_offset) = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a character pack")
+        if version != PACK_VERSION:
+            raise ValueError(f"Unsupported pack version {version}")
+        self._strings = None
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def strings(self):
+        if self._strings is None:
+            strings = []
+            (n,) = COUNT.unpack_from(self.map, self.strings_offset)
+            position = self.strings_offset + COUNT.size
+            for _ in range(n):
+                (size,) = STRING_SIZE.unpack_from(self.map, position)
+                position += STRING_SIZE.size
+                strings.append(bytes(self.map[position:position + size]).decode("utf-8"))
+                position += size
+            self._strings = strings
+        return self._strings
+
+    def _string(self, sid):
+        return None if sid == NO_STRING else self.strings[sid]
+
+    def field(self, index, name):
+        """One stat of one character, read in place"""
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        offset, codec = FIELD_OFFSETS[name]
+        (value,) = codec.unpack_from(self.map, self.stats_offset + index * STATS.size + offset)
+        if name in STRING_FIELDS:
+            return self._string(value)
+        if name == "stance":
+            return STANCES[value].value
+        return value
+
+    def column(self, name):
+        """One stat for every character; a numpy array when numpy is installed"""
+        if name in STRING_FIELDS or name == "stance":
+            return [self.field(i, name) for i in range(self.count)]
+        try:
+            import numpy as np
+        except ImportError:
+            return [self.field(i, name) for i in range(self.count)]
+        offset, codec = FIELD_OFFSETS[name]
+        values = np.ndarray((self.count,), dtype="<" + codec.format[-1], buffer=self.map,
+                            offset=self.stats_offset + offset, strides=(STATS.size,))
+        return values.copy()
+
+    def state(self, index):
+        """Fully decode one character back into the player_to_dict format"""
+        row = STATS.unpack_from(self.map, self.stats_offset + index * STATS.size)
+        state = {}
+        for (name, _), value in zip(STAT_FIELDS, row):
+            if name in STRING_FIELDS:
+                value = self._string(value)
+            elif name == "stance":
+                value = STANCES[value].value
+            state[name] = value
+
+        (position,) = struct.unpack_from("<Q", self.map, self.index_offset + index * 8)
+        for name in COUNTER_FIELDS:
+            (n,) = COUNT.unpack_from(self.map, position)
+            position += COUNT.size
+            counts = {}
+            for _ in range(n):
+                sid, value = PAIR.unpack_from(self.map, position)
+                counts[self.strings[sid]] = value
+                position += PAIR.size
+            state[name] = counts
+        (size,) = COUNT.unpack_from(self.map, position)
+        position += COUNT.size
+        state.update(json.loads(bytes(self.map[position:position + size])))
+        return state
+
+    def player(self, index):
+        return player_from_dict(self.state(index))
+
+def main():
+    parser = argparse.ArgumentParser(description="Binary character archives")
+    sub = parser.add_subparsers(dest="command", required=True)
+    pack = sub.add_parser("pack", help="pack a save directory")
+    pack.add_argument("directory")
+    pack.add_argument("archive")
+    column = sub.add_parser("column", help="print one stat for every character")
+    column.add_argument("archive")
+    column.add_argument("field", choices=[name for name, _ in STAT_FIELDS])
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        count = pack_directory(args.directory, args.archive)
+        print(f"Packed {count} characters into {args.archive} ({os.path.getsize(args.archive)} bytes)")
+    else:
+        with PackReader(args.archive) as reader:
+            for i in range(len(reader)):
+                print(reader.field(i, "name"), reader.field(i, args.field))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Asyncio TCP server hosting one game session per connection.
+
+    python server.py --port 7777
+    nc localhost 7777
+
+Every connection runs in its own task with its own Player, battle generator,
+output sink and random streams (project keeps both in context variables, so
+setting them inside a session only affects that session). Prompts are awaited instead of calling
+input(): an idle session is just a coroutine parked on readline(). Output is
+buffered per connection and drained before every prompt, so a slow client
+only ever holds up its own session.
+
+With --phases every session charges its battle loop to one shared PhaseTimer;
+send SIGUSR1 to print the per-phase latency table without stopping the server.
+
+The town here offers battles, the hostel and saving. The shops, gambling den
+and trainers still read the keyboard directly and stay terminal-only.
+"""
+import argparse
+import asyncio
+import signal
+import sys
+
+from project import (CLASS_NAMES, ENEMY_POOL, SAVE_DIR, BattleResult, BufferedSink, GameContext,
+                     InteractivePolicy, PhaseTimer, SaveJournal, battle_steps, create_player,
+                     get_current_weather, list_saves, load_game, roll_encounter, save_slug,
+                     set_game_context, set_output, set_phase_timer, show_class_menu, show_game_over,
+                     slowprint)
+
+IDLE_TIMEOUT = 30 * 60   # seconds without input before a session is dropped
+MAX_LINE = 1024          # longest accepted input line
+WRITE_HIGH_WATER = 64 * 1024
+
+class Disconnected(Exception):
+    """The client went away, sent garbage or idled out"""
+
+class SessionStream:
+    """File-like adapter so a BufferedSink can write into a StreamWriter"""
+
+    def __init__(self, writer):
+        self.writer = writer
+
+    def write(self, text):
+        if not self.writer.is_closing():
+            self.writer.write(text.encode("utf-8"))
+
+    def flush(self):
+        pass
+
+class Session:
+    """One connected player"""
+
+    def __init__(self, server, reader, writer):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.stream = SessionStream(writer)
+        self.sink = BufferedSink(self.stream, limit=server.high_water)
+        self.policy = InteractivePolicy()
+        self.slug = None
+        writer.transport.set_write_buffer_limits(high=server.high_water)
+
+    async def ask(self, message=""):
+        """Send pending output and the prompt, then await one line of input"""
+        self.sink.flush()
+        self.stream.write(message)
+        await self.writer.drain()
+        try:
+            line = await asyncio.wait_for(self.reader.readline(), self.server.idle_timeout)
+        except (asyncio.TimeoutError, ValueError) as exc:
+            raise Disconnected from exc
+        if not line:
+            raise Disconnected
+        return line.decode("utf-8", "replace").strip()
+
+    async def run(self):
+        set_output(self.sink)
+        set_game_context(GameContext())
+        try:
+            player, meta = await self.choose_character()
+            await self.town(player, meta)
+            self.sink.flush()
+            await self.writer.drain()
+        except (Disconnected, ConnectionError):
+            pass
+        finally:
+            self.server.playing.discard(self.slug)
+            self.writer.close()
+
+    async def choose_character(self):
+        slowprint("=" * 60)
+        slowprint("  🗡️  DUNGEON RPG: ULTIMATE EDITION 🗡️")
+        slowprint("=" * 60)
+        while True:
+            name = await self.ask("\nHero name: ") or "Hero"
+            slug = save_slug(name)
+            if slug not in self.server.playing:
+                break
+            slowprint("That hero is already in the dungeon!")
+        self.slug = slug
+        self.server.playing.add(slug)
+
+        if slug in list_saves(self.server.save_dir):
+            player, meta = load_game(name, self.server.save_dir)
+            slowprint(f"\n✨ Welcome back, {player.name}! (Level {player.level})")
+            return player, meta
+
+        show_class_menu()
+        choice = await self.ask("> ")
+        class_name = "Adventurer"
+        if choice.isdigit() and 1 <= int(choice) <= len(CLASS_NAMES):
+            class_name = CLASS_NAMES[int(choice) - 1]
+        player = create_player(name, class_name)
+        slowprint(f"\n✨ {name} the {player.class_name} is ready!")
+        return player, {}
+
+    async def town(self, player, meta):
+        battle_count = meta.get("battle_count", 0)
+        journal = SaveJournal(player, self.server.save_dir, meta=meta)
+
+        while player.hp > 0:
+            slowprint("\n╔═══════════ TOWN ════════════╗")
+            slowprint("  1) Next Battle")
+            slowprint("  2) Hostel (Full heal)")
+            slowprint("  3) Save Game 💾")
+            slowprint("  4) Leave")
+            slowprint("╚═════════════════════════════╝")
+            choice = await self.ask("> ")
+
+            if choice == "2":
+                player.hp = player.compute_max_hp()
+                slowprint("💚 Fully healed!")
+                continue
+            elif choice == "3":
+                journal.snapshot(battle_count=battle_count)
+                slowprint("💾 Game saved!")
+                continue
+            elif choice == "4":
+                journal.snapshot(battle_count=battle_count)
+                slowprint("💾 Game saved. Farewell!")
+                return
+
+            battle_count += 1
+            enemies = roll_encounter(player, battle_count)
+            try:
+                won = (await self.battle(player, enemies, battle_count)).won
+            finally:
+                ENEMY_POOL.release(enemies)
+            if won:
+                journal.record(battle_count=battle_count)
+            else:
+                journal.discard()
+                show_game_over(player)
+
+    async def battle(self, player, enemies, battle_count):
+        """run_battle() with the prompts awaited"""
+        result = BattleResult()
+        steps = battle_steps(player, enemies, get_current_weather(), battle_count, result)
+        try:
+            decision = next(steps)
+            while True:
+                line = await self.ask(self.policy.show(player, decision))
+                decision = steps.send(self.policy.parse(player, decision, line))
+        except StopIteration:
+            pass
+        return result
+
+class GameServer:
+    """Accepts connections and runs a Session for each"""
+
+    def __init__(self, save_dir=SAVE_DIR, idle_timeout=IDLE_TIMEOUT, high_water=WRITE_HIGH_WATER,
+                 phases=None):
+        self.save_dir = save_dir
+        self.idle_timeout = idle_timeout
+        self.high_water = high_water
+        self.phases = phases
+        self.playing = set()
+
+    async def handle(self, reader, writer):
+        await Session(self, reader, writer).run()
+
+    def dump_phases(self):
+        print(self.phases.report(), file=sys.stderr)
+
+    async def serve(self, host="127.0.0.1", port=7777):
+        if self.phases:
+            # Sessions copy this context when their tasks start
+            set_phase_timer(self.phases)
+            if hasattr(signal, "SIGUSR1"):
+                asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, self.dump_phases)
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_LINE)
+        async with server:
+            await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Host the game over TCP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--save-dir", default=SAVE_DIR)
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT)
+    parser.add_argument("--phases", action="store_true", help="time the battle loop; SIGUSR1 prints it")
+    args = parser.parse_args()
+
+    server = GameServer(args.save_dir, args.idle_timeout, phases=PhaseTimer() if args.phases else None)
+    print(f"Serving on {args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server.phases:
+            server.dump_phases()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""Vectorized Monte Carlo combat kernel for balance sweeps.
+
+Holds N independent one-on-one battles as NumPy arrays and advances all of
+them one turn at a time, using the same damage math as project.py:
+compute_damage, compute_defense, check_critical_hit, check_parry,
+apply_weather_effects and apply_elemental_damage. The simulated player
+attacks, or uses its main damage ability (read from the same AbilitySpec the
+game casts) whenever it is off cooldown.
+
+    python simkernel.py --battles 5000 --level 10
+"""
+import argparse
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for simulations
+    np = None
+
+from project import (BOSSES, CLASS_NAMES, COOLDOWN_TICKS, HYBRID_CLASSES, REGULAR_ENEMIES,
+                     WEATHER_EFFECTS, Element, Stance, Weather, cooldown_rate, create_player,
+                     critical_chance, elemental_multiplier, get_skill_bonus, muted_output,
+                     parry_chance)
+
+STANCE_DAMAGE = {Stance.OFFENSIVE: 1.3, Stance.DEFENSIVE: 0.7}
+STANCE_DEFENSE = {Stance.DEFENSIVE: 1.5, Stance.OFFENSIVE: 0.8}
+WEATHERS = list(Weather)
+
+POISON_DAMAGE = 5
+BURN_DAMAGE = 7
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError("simkernel needs numpy: pip install numpy")
+
+def primary_ability(player):
+    """The ability the kernel casts: the build's first damaging ability.
+
+    Uses the same AbilitySpec that cast_ability interprets. The kernel models
+    damage, elements, hits, low-HP bonus, procs, stun, poison, burn and heals;
+    self-buffs, HP costs and executes are left to the full engine.
+    """
+    for ability in player.profile.abilities:
+        if ability.spec.deals_damage and ability.name in player.abilities:
+            return ability
+    return None
+
+def compile_build(player, enemy):
+    """Flatten a Player and an enemy template into the scalars the kernel needs"""
+    max_hp = player.compute_max_hp()
+    saved = (player.hp, player.stance)
+    player.hp, player.stance = max_hp, Stance.BALANCED
+    try:
+        # At full HP and in Balanced stance only the static terms remain
+        damage = player.compute_damage() - player.prestige_level * 2
+        defense = player.compute_defense()
+    finally:
+        player.hp, player.stance = saved
+
+    weapon_element = player.weapon.element if player.weapon else Element.PHYSICAL
+    hybrid = player.hybrid_class_name
+    crit_chance = critical_chance(player)
+    ability = primary_ability(player)
+    spec = ability.spec if ability else None
+    if spec:
+        ability_element = weapon_element if spec.element == "weapon" else spec.element
+        proc_chance = crit_chance if spec.proc_on_crit else spec.proc_chance
+
+    return {
+        "max_hp": max_hp,
+        "damage": damage,
+        "defense": defense,
+        "prestige": player.prestige_level * 2,
+        "stance_damage": STANCE_DAMAGE.get(player.stance, 1.0),
+        "stance_defense": STANCE_DEFENSE.get(player.stance, 1.0),
+        "berserker": player.class_name == "Berserker",
+        "warlord": hybrid == "Warlord",
+        "crit_chance": crit_chance,
+        "crit_mult": player.profile.crit_multiplier,
+        "parry_chance": parry_chance(player),
+        "weather": [WEATHER_EFFECTS.get((w, weapon_element), (1.0,))[0] for w in WEATHERS],
+        "element": elemental_multiplier(weapon_element, enemy),
+        "elemental_weapon": weapon_element != Element.PHYSICAL,
+        "rage": get_skill_bonus(player, "Berserker Rage"),
+        "mastery": get_skill_bonus(player, "Elemental Mastery"),
+        "life_drain": get_skill_bonus(player, "Life Drain"),
+        "swift": cooldown_rate(player),  # cooldown ticks per turn
+        "spellblade": hybrid == "Spellblade" and weapon_element != Element.PHYSICAL,
+        "shadowknight": hybrid == "Shadowknight",
+        "hexblade": hybrid == "Hexblade",
+        "ravager": hybrid == "Ravager",
+        "has_ability": spec is not None,
+        "ab_mult": spec.multiplier if spec else 0.0,
+        "ab_flat": spec.flat if spec else 0,
+        "ab_elem": elemental_multiplier(ability_element, enemy) if spec else 1.0,
+        "ab_hits": spec.hits if spec else 1,
+        "ab_low_hp": spec.low_hp_multiplier if spec else 1.0,
+        "ab_proc": proc_chance if spec else 0.0,
+        "ab_proc_mult": spec.proc_multiplier if spec else 1.0,
+        "ab_proc_damage": spec.proc_damage if spec else 0,
+        "ab_proc_poison": spec.proc_poison if spec else 0,
+        "ab_stun": spec.stun if spec else 0,
+        "ab_poison": spec.poison if spec else 0,
+        "ab_burn": spec.burn if spec else 0,
+        "ab_burn_chance": spec.burn_chance if spec and spec.burn else 0.0,
+        "ab_heal": spec.heal if spec else 0,
+        "ab_lifesteal": spec.lifesteal if spec else 0.0,
+        "ab_cooldown": ability.cooldown * COOLDOWN_TICKS if spec else 0.0,
+        "enemy_hp": enemy.hp,
+        "enemy_atk": enemy.atk,
+        "initiative": 0.50 if enemy.boss else 0.35,
+    }
+
+class BattleBatch:
+    """N independent battles stored as parallel arrays"""
+
+    def __init__(self, builds, battles_per_build, rng, weather=None):
+        require_numpy()
+        self.rng = rng
+        self.pairs = len(builds)
+        self.size = self.pairs * battles_per_build
+        self.pair = np.repeat(np.arange(self.pairs), battles_per_build)
+
+        def column(key, dtype):
+            return np.asarray([b[key] for b in builds], dtype=dtype)[self.pair]
+
+        for key in ("max_hp", "damage", "defense", "prestige", "rage", "mastery",
+                    "life_drain", "ab_flat", "ab_hits", "ab_stun", "ab_poison",
+                    "ab_burn", "ab_heal", "ab_proc_damage", "ab_proc_poison",
+                    "enemy_hp", "enemy_atk"):
+            setattr(self, key, column(key, np.int64))
+        for key in ("stance_damage", "stance_defense", "crit_chance", "crit_mult",
+                    "parry_chance", "element", "swift", "ab_mult", "ab_elem",
+                    "ab_burn_chance", "ab_low_hp", "ab_proc", "ab_proc_mult",
+                    "ab_lifesteal", "ab_cooldown", "initiative"):
+            setattr(self, key, column(key, np.float64))
+        for key in ("berserker", "warlord", "elemental_weapon", "spellblade",
+                    "shadowknight", "hexblade", "ravager", "has_ability"):
+            setattr(self, key, column(key, bool))
+
+        if weather is None:
+            weather_idx = rng.integers(0, len(WEATHERS), self.size)
+        else:
+            weather_idx = np.full(self.size, WEATHERS.index(weather))
+        weather_table = np.asarray([b["weather"] for b in builds], dtype=np.float64)
+        self.weather = weather_table[self.pair, weather_idx]
+
+        # Combat state
+        self.php = self.max_hp.copy()
+        self.ehp = self.enemy_hp.copy()
+        self.stun = np.zeros(self.size, np.int64)
+        self.poison = np.zeros(self.size, np.int64)
+        self.burn = np.zeros(self.size, np.int64)
+        self.cursed = np.zeros(self.size, bool)
+        self.cooldown = np.zeros(self.size, np.float64)
+        self.active = np.ones(self.size, bool)
+        self.won = np.zeros(self.size, bool)
+        self.turns = np.zeros(self.size, np.int64)
+
+    # ── Player stats that depend on current HP ──────────────────────────────
+    def player_damage(self):
+        dmg = self.damage.astype(np.float64)
+        low = self.php < self.max_hp / 2
+        dmg = np.where(self.berserker & low, np.floor(dmg * 1.5), dmg)
+        hp_percent = self.php / self.max_hp
+        dmg = np.where(self.warlord & (hp_percent < 0.5),
+                       np.floor(dmg * (1.0 + (0.5 - hp_percent))), dmg)
+        dmg = np.floor(dmg * self.stance_damage)
+        return dmg.astype(np.int64) + self.prestige
+
+    def player_defense(self):
+        hp_percent = self.php / self.max_hp
+        bonus = np.where(self.warlord & (hp_percent < 0.5),
+                         np.floor(5 * (0.5 - hp_percent) * 10), 0.0)
+        return np.floor((self.defense + bonus) * self.stance_defense).astype(np.int64)
+
+    def heal(self, mask, amount):
+        self.php = np.where(mask, np.minimum(self.php + amount, self.max_hp), self.php)
+
+    # ── Phases ──────────────────────────────────────────────────────────────
+    def enemy_phase(self, mask):
+        acting = mask & (self.ehp > 0) & (self.php > 0)
+        stunned = acting & (self.stun > 0)
+        self.stun[stunned] -= 1
+        acting &= ~stunned
+
+        parried = acting & (self.rng.random(self.size) < self.parry_chance)
+        counter = self.player_damage()
+        self.ehp[parried] -= counter[parried]
+
+        hit = acting & ~parried
+        atk = np.where(self.cursed, np.floor(self.enemy_atk * 0.7).astype(np.int64), self.enemy_atk)
+        dmg = np.maximum(0, atk - self.player_defense())
+        self.php[hit] -= dmg[hit]
+
+    def player_phase(self, mask):
+        rolls = self.rng.random((5, self.size))
+        base = self.player_damage()
+        use_ability = mask & self.has_ability & (self.cooldown <= 0)
+        attack = mask & ~use_ability
+
+        # Basic attack
+        crit = rolls[0] < self.crit_chance
+        dmg = np.where(crit, np.floor(base * self.crit_mult), base)
+        dmg = np.floor(dmg * self.weather)
+        dmg = np.floor(dmg * self.element)
+        low = self.php < self.max_hp / 2
+        dmg = np.where(low & (self.rage > 0), np.floor(dmg * (1 + self.rage / 100)), dmg)
+        dmg = np.where(self.elemental_weapon & (self.mastery > 0),
+                       np.floor(dmg * (1 + self.mastery / 100)), dmg)
+        dmg = np.where(self.spellblade, dmg + np.floor(dmg * 0.2), dmg).astype(np.int64)
+
+        shadow = attack & self.shadowknight & (rolls[1] < 0.3)
+        self.poison[shadow] += 2
+        self.stun[shadow] = 1
+        self.cursed |= attack & self.hexblade & (rolls[2] < 0.4)
+        self.ehp[attack] -= dmg[attack]
+        self.heal(attack & (self.life_drain > 0), np.floor(dmg * self.life_drain / 100).astype(np.int64))
+        self.heal(attack & self.ravager & crit, np.floor(dmg * 0.3).astype(np.int64))
+
+        # Ability, in cast_ability's order
+        ab = np.floor(base * self.ab_mult).astype(np.int64) + self.ab_flat
+        ab = np.where(low, np.floor(ab * self.ab_low_hp).astype(np.int64), ab)
+        proc = rolls[4] < self.ab_proc
+        ab = np.where(proc, np.floor(ab * self.ab_proc_mult).astype(np.int64), ab)
+        ab = np.floor(ab * self.ab_elem).astype(np.int64)
+        ab = np.where(proc, ab + self.ab_proc_damage, ab)
+        ab = (ab // self.ab_hits) * self.ab_hits
+        self.ehp[use_ability] -= ab[use_ability]
+        stuns = use_ability & (self.ab_stun > 0)
+        self.stun[stuns] = self.ab_stun[stuns]
+        self.poison[use_ability] += self.ab_poison[use_ability] + np.where(proc, self.ab_proc_poison, 0)[use_ability]
+        burns = use_ability & (self.ab_burn > 0) & (rolls[3] < self.ab_burn_chance)
+        self.burn[burns] = self.ab_burn[burns]
+        self.heal(use_ability, self.ab_heal + np.floor(ab * self.ab_lifesteal).astype(np.int64))
+        self.cooldown[use_ability] = self.ab_cooldown[use_ability]
+
+    def end_of_turn(self, mask):
+        poisoned = mask & (self.poison > 0)
+        self.ehp[poisoned] -= POISON_DAMAGE
+        self.poison[poisoned] -= 1
+        burning = mask & (self.burn > 0)
+        self.ehp[burning] -= BURN_DAMAGE
+        self.burn[burning] -= 1
+        cooling = mask & (self.cooldown > 0)
+        self.cooldown[cooling] -= self.swift[cooling]
+
+    def settle(self):
+        """Retire battles where someone died"""
+        won = self.active & (self.ehp <= 0) & (self.php > 0)
+        self.won |= won
+        self.active &= (self.ehp > 0) & (self.php > 0)
+
+    def step(self, turn):
+        mask = self.active
+        self.turns[mask] = turn
+        ambush = mask & (self.rng.random(self.size) < self.initiative)
+        self.enemy_phase(ambush)
+        self.settle()
+
+        mask = self.active
+        self.player_phase(mask)
+        self.settle()
+
+        mask = self.active
+        self.enemy_phase(mask & ~ambush)
+        self.end_of_turn(mask)
+        self.settle()
+
+    def run(self, max_turns=200):
+        turn = 0
+        while self.active.any() and turn < max_turns:
+            turn += 1
+            self.step(turn)
+        return self
+
+    def summary(self):
+        """Per build: battles, win rate, mean turns-to-kill over wins, timeouts"""
+        count = np.bincount(self.pair, minlength=self.pairs)
+        wins = np.bincount(self.pair, weights=self.won, minlength=self.pairs)
+        win_turns = np.bincount(self.pair, weights=np.where(self.won, self.turns, 0), minlength=self.pairs)
+        timeouts = np.bincount(self.pair, weights=self.active, minlength=self.pairs)
+        rows = []
+        for i in range(self.pairs):
+            rows.append({
+                "battles": int(count[i]),
+                "win_rate": wins[i] / count[i],
+                "turns_to_kill": win_turns[i] / wins[i] if wins[i] else float("nan"),
+                "timeouts": int(timeouts[i]),
+            })
+        return rows
+
+def class_builds(level=1, hybrids=True):
+    """Fresh characters for every base class and every hybrid pair"""
+    builds = []
+    with muted_output():
+        for class_name in CLASS_NAMES:
+            builds.append(create_player(class_name, class_name))
+        if hybrids:
+            for primary, secondary in HYBRID_CLASSES:
+                player = create_player(primary, primary)
+                player.add_multiclass(secondary)
+                builds.append(player)
+        for player in builds:
+            if level > 1:
+                player.level_up(level - 1)
+            player.hp = player.compute_max_hp()
+    return builds
+
+def sweep(players=None, enemies=None, battles=1000, seed=0, weather=None, max_turns=200):
+    """Win rate and turns-to-kill for every (build, enemy) pair"""
+    require_numpy()
+    players = class_builds() if players is None else players
+    enemies = BOSSES if enemies is None else enemies
+    pairs = [(p, e) for p in players for e in enemies]
+    batch = BattleBatch([compile_build(p, e) for p, e in pairs], battles,
+                        np.random.default_rng(seed), weather).run(max_turns)
+    rows = batch.summary()
+    for (player, enemy), row in zip(pairs, rows):
+        row["build"] = player.hybrid_class_name or player.class_name
+        row["enemy"] = enemy.name
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo balance sweep")
+    parser.add_argument("--battles", type=int, default=1000, help="battles per build/enemy pair")
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--regular", action="store_true", help="fight regular enemies instead of bosses")
+    parser.add_argument("--no-hybrids", action="store_true")
+    args = parser.parse_args()
+
+    players = class_builds(args.level, hybrids=not args.no_hybrids)
+    enemies = REGULAR_ENEMIES if args.regular else BOSSES
+    rows = sweep(players, enemies, args.battles, args.seed)
+
+    print(f"{'Build':<20} {'Enemy':<20} {'Win %':>7} {'TTK':>6}")
+    for row in rows:
+        print(f"{row['build']:<20} {row['enemy']:<20} {row['win_rate']*100:>6.1f}% {row['turns_to_kill']:>6.1f}")
+
+if __name__ == "__main__":
+    main()
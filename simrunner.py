@@ -0,0 +1,191 @@
+"""Spread headless battles and full runs over a process pool.
+
+Every job (one build against one enemy, or one build doing full runs) is cut
+into fixed-size shards, and each shard plays in a GameContext seeded from the
+master seed, the job and the shard number. The same seed therefore gives the same
+numbers with 1 worker or 32. Workers send back a small Tally per shard and the
+parent merges them.
+
+    python simrunner.py battles --battles 2000 --workers 8
+    python simrunner.py runs --runs 500 --max-battles 30
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
+from dataclasses import dataclass, field, fields
+
+from project import (BOSSES, CLASS_NAMES, CLASS_REGISTRY, ENEMY_TEMPLATES, HYBRID_CLASSES,
+                     REGULAR_ENEMIES, Enemy, GameContext, NullSink, create_player, get_current_weather, muted_output,
+                     set_output, simulate_battle, simulate_run, using_game_context)
+
+SHARD_SIZE = 250
+
+@dataclass(frozen=True)
+class Job:
+    """What to simulate; only names and numbers, so it pickles cheaply"""
+    class_name: str
+    secondary: str = None
+    level: int = 1
+    enemy: str = None     # battles against this enemy, or full runs when None
+    count: int = 1000     # battles, or runs
+    max_battles: int = 50
+
+    @property
+    def key(self):
+        return f"{self.class_name}/{self.secondary}/{self.level}/{self.enemy}/{self.max_battles}"
+
+    @property
+    def build(self):
+        return CLASS_REGISTRY.get(self.class_name, self.secondary).hybrid_name or self.class_name
+
+@dataclass
+class Tally:
+    """Summed battle results for one job"""
+    battles: int = 0
+    wins: int = 0
+    win_turns: int = 0
+    damage_dealt: int = 0
+    damage_taken: int = 0
+    crits: int = 0
+    parries: int = 0
+    gold: int = 0
+    xp: int = 0
+    drops: Counter = field(default_factory=Counter)   # (kind, name) -> quantity
+    runs: int = 0
+    deaths: int = 0
+    levels: int = 0
+
+    def add(self, result):
+        self.battles += 1
+        self.wins += result.won
+        self.win_turns += result.turns if result.won else 0
+        self.damage_dealt += result.damage_dealt
+        self.damage_taken += result.damage_taken
+        self.crits += result.crits
+        self.parries += result.parries
+        self.gold += result.gold
+        self.xp += result.xp
+        for drop in result.drops:
+            self.drops[drop.kind, drop.name] += drop.count
+
+    def merge(self, other):
+        for f in fields(self):
+            setattr(self, f.name, getattr(self, f.name) + getattr(other, f.name))
+        return self
+
+    @property
+    def win_rate(self):
+        return self.wins / self.battles if self.battles else 0.0
+
+    @property
+    def turns_to_kill(self):
+        return self.win_turns / self.wins if self.wins else float("nan")
+
+    def drops_by_kind(self):
+        """Total quantity dropped per kind: material, consumable, weapon, artifact"""
+        totals = Counter()
+        for (kind, _), count in self.drops.items():
+            totals[kind] += count
+        return totals
+
+    @property
+    def battles_per_run(self):
+        return self.battles / self.runs if self.runs else 0.0
+
+def make_player(job):
+    player = create_player(job.class_name, job.class_name)
+    if job.secondary:
+        player.add_multiclass(job.secondary)
+    if job.level > 1:
+        player.level_up(job.level - 1)
+    player.hp = player.compute_max_hp()
+    return player
+
+def shards(jobs, master_seed=0, shard_size=SHARD_SIZE):
+    """(job index, job, count, seed) for every shard of every job"""
+    for index, job in enumerate(jobs):
+        for shard, start in enumerate(range(0, job.count, shard_size)):
+            count = min(shard_size, job.count - start)
+            yield index, job, count, f"{master_seed}:{job.key}:{shard}"
+
+def run_shard(shard):
+    """Worker entry point: simulate one shard and return (job index, Tally)"""
+    index, job, count, seed = shard
+    tally = Tally()
+    with muted_output(), using_game_context(GameContext(seed)):
+        for _ in range(count):
+            player = make_player(job)
+            if job.enemy:
+                tally.add(simulate_battle(player, [Enemy(ENEMY_TEMPLATES[job.enemy])], get_current_weather()))
+            else:
+                results = simulate_run(player, job.max_battles)
+                for result in results:
+                    tally.add(result)
+                tally.runs += 1
+                tally.deaths += bool(results and not results[-1].won)
+                tally.levels += player.level
+    return index, tally
+
+def _init_worker():
+    set_output(NullSink())
+
+def run_jobs(jobs, master_seed=0, workers=None, shard_size=SHARD_SIZE):
+    """Simulate every job; returns one merged Tally per job, in order"""
+    work = list(shards(jobs, master_seed, shard_size))
+    tallies = [Tally() for _ in jobs]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = map(run_shard, work)
+        for index, tally in results:
+            tallies[index].merge(tally)
+        return tallies
+    with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+        chunksize = max(1, len(work) // (workers * 4))
+        for index, tally in pool.map(run_shard, work, chunksize=chunksize):
+            tallies[index].merge(tally)
+    return tallies
+
+def class_jobs(level=1, hybrids=True, **job):
+    """One job per base class and, optionally, per hybrid pair"""
+    jobs = [Job(class_name, level=level, **job) for class_name in CLASS_NAMES]
+    if hybrids:
+        jobs += [Job(primary, secondary, level, **job) for primary, secondary in HYBRID_CLASSES]
+    return jobs
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel balance simulations")
+    parser.add_argument("mode", choices=["battles", "runs"])
+    parser.add_argument("--battles", type=int, default=1000, help="battles per build/enemy pair")
+    parser.add_argument("--runs", type=int, default=200, help="full runs per build")
+    parser.add_argument("--max-battles", type=int, default=50, help="battle cap per run")
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--regular", action="store_true", help="fight regular enemies instead of bosses")
+    parser.add_argument("--no-hybrids", action="store_true")
+    args = parser.parse_args()
+    if args.max_battles < 1:
+        parser.error("--max-battles must be at least 1")
+
+    hybrids = not args.no_hybrids
+    if args.mode == "battles":
+        enemies = REGULAR_ENEMIES if args.regular else BOSSES
+        jobs = [job for enemy in enemies
+                for job in class_jobs(args.level, hybrids, enemy=enemy.name, count=args.battles)]
+    else:
+        jobs = class_jobs(args.level, hybrids, count=args.runs, max_battles=args.max_battles)
+    tallies = run_jobs(jobs, args.seed, args.workers)
+
+    if args.mode == "battles":
+        print(f"{'Build':<20} {'Enemy':<20} {'Win %':>7} {'TTK':>6}")
+        for job, tally in zip(jobs, tallies):
+            print(f"{job.build:<20} {job.enemy:<20} {tally.win_rate*100:>6.1f}% {tally.turns_to_kill:>6.1f}")
+    else:
+        print(f"{'Build':<20} {'Battles/run':>12} {'Level':>6} {'Deaths %':>9}")
+        for job, tally in zip(jobs, tallies):
+            print(f"{job.build:<20} {tally.battles_per_run:>12.1f} {tally.levels/tally.runs:>6.1f} "
+                  f"{tally.deaths/tally.runs*100:>8.1f}%")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""Exact win probabilities for one build against one enemy.
+
+Plays the same fight as simkernel (one enemy, basic attacks plus the build's
+main damage ability, the same compile_build() numbers) but as a Markov chain
+instead of by sampling. A state is everything the next turn depends on:
+player HP, enemy HP, the stun, poison and burn counters, the curse and the
+ability cooldown. Each turn pushes the probability of every live state through
+the initiative roll, the parry roll and the crit and proc rolls, and merges the
+states that come out equal. The branches leaving a state are worked out once
+and memoized, so the cost grows with the number of distinct states rather
+than with how unlikely an outcome is: a 1-in-a-million death shows up as
+1e-06 instead of as noise.
+
+    python solver.py --level 10
+    python solver.py --level 5 --weather Storm --regular
+"""
+import argparse
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import List
+
+from project import BOSSES, REGULAR_ENEMIES, Weather
+from simkernel import BURN_DAMAGE, POISON_DAMAGE, WEATHERS, class_builds, compile_build
+
+WON, LOST = "won", "lost"
+
+@dataclass
+class Solution:
+    """Outcome distribution of one fight; index t of a turn list is turn t"""
+    win_turns: List[float] = field(default_factory=list)
+    loss_turns: List[float] = field(default_factory=list)
+    timeout: float = 0.0
+    states: int = 0       # distinct states the chain visited
+
+    @property
+    def win_rate(self):
+        return sum(self.win_turns)
+
+    @property
+    def death_rate(self):
+        return sum(self.loss_turns)
+
+    @property
+    def turns_to_kill(self):
+        """Mean turns over won fights, like simkernel's summary"""
+        wins = self.win_rate
+        return sum(t * p for t, p in enumerate(self.win_turns)) / wins if wins else float("nan")
+
+    def won_by(self, turn):
+        """Chance the enemy is dead by the end of `turn`"""
+        return sum(self.win_turns[:turn + 1])
+
+    def add(self, other, weight):
+        for name in ("win_turns", "loss_turns"):
+            mine, theirs = getattr(self, name), getattr(other, name)
+            mine.extend([0.0] * (len(theirs) - len(mine)))
+            for t, p in enumerate(theirs):
+                mine[t] += p * weight
+        self.timeout += other.timeout * weight
+        self.states += other.states
+        return self
+
+class Fight:
+    """The turn rules of simkernel.BattleBatch for a single compiled build.
+
+    A state is (player HP, enemy HP, stun, poison, burn, cursed, cooldown).
+    """
+
+    def __init__(self, build, weather_mult):
+        self.b = build
+        self.weather = weather_mult
+        self.transitions = {}   # state -> ((probability, next state or WON/LOST), ...)
+        self._damage = {}
+        self._defense = {}
+
+    def start(self):
+        return (self.b["max_hp"], self.b["enemy_hp"], 0, 0, 0, False, 0.0)
+
+    # ── Player stats that depend on current HP ──────────────────────────────
+    def player_damage(self, php):
+        dmg = self._damage.get(php)
+        if dmg is None:
+            b = self.b
+            dmg = b["damage"]
+            if b["berserker"] and php < b["max_hp"] / 2:
+                dmg = int(dmg * 1.5)
+            hp_percent = php / b["max_hp"]
+            if b["warlord"] and hp_percent < 0.5:
+                dmg = int(dmg * (1.0 + (0.5 - hp_percent)))
+            dmg = self._damage[php] = int(dmg * b["stance_damage"]) + b["prestige"]
+        return dmg
+
+    def player_defense(self, php):
+        defense = self._defense.get(php)
+        if defense is None:
+            b = self.b
+            bonus = 0
+            hp_percent = php / b["max_hp"]
+            if b["warlord"] and hp_percent < 0.5:
+                bonus = int(5 * (0.5 - hp_percent) * 10)
+            defense = self._defense[php] = int((b["defense"] + bonus) * b["stance_defense"])
+        return defense
+
+    def heal(self, php, amount):
+        return min(php + amount, self.b["max_hp"])
+
+    # ── Phases: each maps a state to [(probability, state), ...] ─────────────
+    def enemy_phase(self, state):
+        php, ehp, stun, poison, burn, cursed, cooldown = state
+        if stun > 0:
+            return [(1.0, (php, ehp, stun - 1, poison, burn, cursed, cooldown))]
+        b = self.b
+        parry = b["parry_chance"]
+        atk = int(b["enemy_atk"] * 0.7) if cursed else b["enemy_atk"]
+        dmg = max(0, atk - self.player_defense(php))
+        counter = (php, ehp - self.player_damage(php), stun, poison, burn, cursed, cooldown)
+        hit = (php - dmg, ehp, stun, poison, burn, cursed, cooldown)
+        return [(p, s) for p, s in ((parry, counter), (1 - parry, hit)) if p > 0]
+
+    def player_phase(self, state):
+        if self.b["has_ability"] and state[6] <= 0:
+            return self.ability(state)
+        return self.attack(state)
+
+    def attack(self, state):
+        php, ehp, stun, poison, burn, cursed, cooldown = state
+        b = self.b
+        base = self.player_damage(php)
+        low = php < b["max_hp"] / 2
+        crit = b["crit_chance"]
+        shadow = 0.3 if b["shadowknight"] else 0.0
+        curse = 0.4 if b["hexblade"] and not cursed else 0.0
+        branches = []
+        for p_crit, is_crit in ((crit, True), (1 - crit, False)):
+            dmg = int(base * b["crit_mult"]) if is_crit else base
+            dmg = int(dmg * self.weather)
+            dmg = int(dmg * b["element"])
+            if low and b["rage"] > 0:
+                dmg = int(dmg * (1 + b["rage"] / 100))
+            if b["elemental_weapon"] and b["mastery"] > 0:
+                dmg = int(dmg * (1 + b["mastery"] / 100))
+            if b["spellblade"]:
+                dmg += int(dmg * 0.2)
+            hp = php
+            if b["life_drain"] > 0:
+                hp = self.heal(hp, int(dmg * b["life_drain"] / 100))
+            if b["ravager"] and is_crit:
+                hp = self.heal(hp, int(dmg * 0.3))
+            for p_shadow, shadowed in ((shadow, True), (1 - shadow, False)):
+                for p_curse, curses in ((curse, True), (1 - curse, False)):
+                    p = p_crit * p_shadow * p_curse
+                    if p > 0:
+                        branches.append((p, (hp, ehp - dmg, 1 if shadowed else stun,
+                                             poison + 2 if shadowed else poison, burn,
+                                             cursed or curses, cooldown)))
+        return branches
+
+    def ability(self, state):
+        php, ehp, stun, poison, burn, cursed, cooldown = state
+        b = self.b
+        ab = int(self.player_damage(php) * b["ab_mult"]) + b["ab_flat"]
+        if php < b["max_hp"] / 2:
+            ab = int(ab * b["ab_low_hp"])
+        proc = b["ab_proc"]
+        burn_chance = b["ab_burn_chance"] if b["ab_burn"] > 0 else 0.0
+        branches = []
+        for p_proc, procced in ((proc, True), (1 - proc, False)):
+            dmg = int(ab * b["ab_proc_mult"]) if procced else ab
+            dmg = int(dmg * b["ab_elem"])
+            if procced:
+                dmg += b["ab_proc_damage"]
+            dmg = dmg // b["ab_hits"] * b["ab_hits"]
+            hp = self.heal(php, b["ab_heal"] + int(dmg * b["ab_lifesteal"]))
+            stunned = b["ab_stun"] if b["ab_stun"] > 0 else stun
+            poisoned = poison + b["ab_poison"] + (b["ab_proc_poison"] if procced else 0)
+            for p_burn, burns in ((burn_chance, True), (1 - burn_chance, False)):
+                p = p_proc * p_burn
+                if p > 0:
+                    branches.append((p, (hp, ehp - dmg, stunned, poisoned, b["ab_burn"] if burns else burn,
+                                         cursed, b["ab_cooldown"])))
+        return branches
+
+    def end_of_turn(self, state):
+        php, ehp, stun, poison, burn, cursed, cooldown = state
+        if poison > 0:
+            ehp -= POISON_DAMAGE
+            poison -= 1
+        if burn > 0:
+            ehp -= BURN_DAMAGE
+            burn -= 1
+        if cooldown > 0:
+            cooldown -= self.b["swift"]
+        return (php, ehp, stun, poison, burn, cursed, cooldown)
+
+    @staticmethod
+    def settle(state):
+        """WON or LOST once someone is dead, else None"""
+        if state[0] <= 0:
+            return LOST
+        if state[1] <= 0:
+            return WON
+        return None
+
+    # ── One turn ─────────────────────────────────────────────────────────────
+    def turn(self, state):
+        """Memoized (probability, next state or outcome) pairs for one turn"""
+        branches = self.transitions.get(state)
+        if branches is not None:
+            return branches
+        out = defaultdict(float)
+        initiative = self.b["initiative"]
+        for p_ambush, ambush in ((initiative, True), (1 - initiative, False)):
+            for p1, s1 in self.enemy_phase(state) if ambush else [(1.0, state)]:
+                outcome = self.settle(s1)
+                if outcome:
+                    out[outcome] += p_ambush * p1
+                    continue
+                for p2, s2 in self.player_phase(s1):
+                    outcome = self.settle(s2)
+                    if outcome:
+                        out[outcome] += p_ambush * p1 * p2
+                        continue
+                    for p3, s3 in [(1.0, s2)] if ambush else self.enemy_phase(s2):
+                        s4 = self.end_of_turn(s3)
+                        out[self.settle(s4) or s4] += p_ambush * p1 * p2 * p3
+        branches = self.transitions[state] = tuple((q, nxt) for nxt, q in out.items())
+        return branches
+
+    def solve(self, max_turns=200):
+        solution = Solution([0.0], [0.0])
+        live = {self.start(): 1.0}
+        for _ in range(max_turns):
+            win = loss = 0.0
+            after = defaultdict(float)
+            for state, p in live.items():
+                for q, nxt in self.turn(state):
+                    if nxt == WON:
+                        win += p * q
+                    elif nxt == LOST:
+                        loss += p * q
+                    else:
+                        after[nxt] += p * q
+            solution.win_turns.append(win)
+            solution.loss_turns.append(loss)
+            live = after
+            if not live:
+                break
+        solution.timeout = sum(live.values())
+        solution.states = len(self.transitions)
+        return solution
+
+def solve(player, enemy, weather=None, max_turns=200):
+    """Exact outcome distribution of `player` fighting `enemy`.
+
+    With no weather given, every weather is equally likely, as in
+    simkernel.sweep().
+    """
+    build = compile_build(player, enemy)
+    if weather is not None:
+        return Fight(build, build["weather"][WEATHERS.index(weather)]).solve(max_turns)
+    solution = Solution()
+    for mult in build["weather"]:
+        solution.add(Fight(build, mult).solve(max_turns), 1 / len(WEATHERS))
+    return solution
+
+def main():
+    parser = argparse.ArgumentParser(description="Exact win probabilities for the boss table")
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--weather", choices=[w.value for w in Weather], default=None)
+    parser.add_argument("--regular", action="store_true", help="fight regular enemies instead of bosses")
+    parser.add_argument("--no-hybrids", action="store_true")
+    parser.add_argument("--max-turns", type=int, default=200)
+    args = parser.parse_args()
+
+    weather = Weather(args.weather) if args.weather else None
+    players = class_builds(args.level, hybrids=not args.no_hybrids)
+    enemies = REGULAR_ENEMIES if args.regular else BOSSES
+
+    print(f"{'Build':<20} {'Enemy':<20} {'Win %':>9} {'P(death)':>9} {'TTK':>6} {'States':>7}")
+    for player in players:
+        build = player.hybrid_class_name or player.class_name
+        for enemy in enemies:
+            s = solve(player, enemy, weather, args.max_turns)
+            print(f"{build:<20} {enemy.name:<20} {s.win_rate*100:>8.4f}% {s.death_rate:>9.2e} "
+                  f"{s.turns_to_kill:>6.2f} {s.states:>7}")
+
+if __name__ == "__main__":
+    main()